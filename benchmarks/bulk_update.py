@@ -0,0 +1,95 @@
+"""
+working directory: fastapi-efficient-sql/
+command: python -m benchmarks.bulk_update [--execute]
+
+Compares strategies of `SQLizer.bulk_update_from_dicts` by rendering time and statement size for various batch sizes.
+With `--execute`, statements are also executed against the test database configured in `tests/__init__.py`,
+on a temporary table inside one transaction which is rolled back, to find where server-side crossovers are.
+"""
+import sys
+from asyncio import get_event_loop
+from logging import WARNING, getLogger
+from time import perf_counter
+from timeit import repeat
+
+from tortoise.transactions import in_transaction
+
+from fastapi_esql import SQLizer
+
+BATCH_SIZES = [10, 50, 100, 500, 1000, 5000]
+TABLE = "bench_account"
+VARIANTS = [
+    ("join/VALUES ROW", "join", True),
+    ("join/UNION", "join", False),
+    ("case", "case", True),
+]
+
+
+def make_dicts(rows):
+    return [
+        {"id": idx, "active": idx % 2 == 0, "gender": idx % 3, "name": f"name-{idx}"}
+        for idx in range(rows)
+    ]
+
+
+def render(dicts, strategy, using_values):
+    return SQLizer.bulk_update_from_dicts(
+        TABLE,
+        dicts,
+        join_fields=["id"],
+        update_fields=["active", "gender", "name"],
+        using_values=using_values,
+        strategy=strategy,
+    )
+
+
+async def execute_all(statements):
+    from tests import TEST_CONN, init_tortoise
+
+    await init_tortoise()
+    costs = {}
+    try:
+        async with in_transaction(TEST_CONN) as conn:
+            await conn.execute_script(f"""
+    CREATE TEMPORARY TABLE {TABLE} (
+      id INT PRIMARY KEY, active BOOL, gender SMALLINT, name VARCHAR(32)
+    )""")
+            await conn.execute_query(
+                SQLizer.upsert_on_duplicate(TABLE, make_dicts(max(BATCH_SIZES)), ["id", "active", "gender", "name"])
+            )
+            for key, sql in statements.items():
+                st = perf_counter()
+                await conn.execute_query(sql)
+                costs[key] = perf_counter() - st
+            raise RuntimeError("Rollback")
+    except RuntimeError:
+        return costs
+
+
+def main():
+    # Statements are too large to log
+    getLogger("fastapi_esql.utils.sqlizer").setLevel(WARNING)
+    execute = "--execute" in sys.argv
+    statements = {}
+    print(f"{'strategy':<16} {'rows':>6} {'render ms':>10} {'bytes':>10}")
+    for rows in BATCH_SIZES:
+        dicts = make_dicts(rows)
+        for name, strategy, using_values in VARIANTS:
+            cost = min(repeat(lambda: render(dicts, strategy, using_values), number=1, repeat=5))
+            sql = render(dicts, strategy, using_values)
+            statements[(name, rows)] = sql
+            print(f"{name:<16} {rows:>6} {1000 * cost:>10.2f} {len(sql.encode()):>10,}")
+
+    if execute:
+        costs = get_event_loop().run_until_complete(execute_all(statements))
+        print(f"\n{'strategy':<16} {'rows':>6} {'execute ms':>10}")
+        for (name, rows), cost in costs.items():
+            print(f"{name:<16} {rows:>6} {1000 * cost:>10.2f}")
+    print(
+        f"\nStrategy `auto` picks `case` up to {SQLizer.case_max_rows} rows, "
+        f"or {SQLizer.case_max_rows_without_values} rows if `using_values` is False"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+working directory: fastapi-efficient-sql/
+command: python -m benchmarks.sqlize_value
+"""
+from datetime import datetime
+from decimal import Decimal
+from enum import IntEnum
+from json import dumps
+from timeit import repeat
+
+from fastapi_esql import SQLizer, orjson_dumps, set_json_dumps
+from fastapi_esql.utils.serializer import orjson
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+ROWS = 10000
+FIELDS = ["id", "active", "gender", "name", "score", "amount", "created_at", "extend"]
+
+
+class GenderEnum(IntEnum):
+    unknown = 0
+    male = 1
+    female = 2
+
+
+def legacy_sqlize_value(value, to_json=False) -> str:
+    """
+    SQLizer.sqlize_value before dispatching by type
+    """
+    if value is None:
+        return "NULL"
+    elif isinstance(value, (int, float, bool)):
+        return f"{value}"
+    elif isinstance(value, (dict, list, tuple)):
+        dumped = dumps(value, ensure_ascii=False)
+        if to_json:
+            return f"CAST('{dumped}' AS JSON)"
+        return f"'{dumped}'"
+    else:
+        return f"'{value}'"
+
+
+def make_dicts():
+    return [
+        {
+            "id": idx,
+            "active": idx % 2 == 0,
+            "gender": GenderEnum(idx % 3),
+            "name": f"name-{idx}",
+            "score": idx / 7,
+            "amount": Decimal(idx) / 100,
+            "created_at": datetime(2023, 1, 1, 12, 30),
+            "extend": {"rdm": idx, "tags": ["a", "b"]},
+        }
+        for idx in range(ROWS)
+    ]
+
+
+def bench(name, func, baseline=None):
+    cost = min(repeat(func, number=1, repeat=5))
+    speedup = f"  x{baseline / cost:.2f}" if baseline else ""
+    print(f"{name:<28} {1000 * cost:>9.2f} ms  {ROWS * len(FIELDS) / cost:>12,.0f} values/s{speedup}")
+    return cost
+
+
+def main():
+    dicts = make_dicts()
+    print(f"Rendering {ROWS} rows x {len(FIELDS)} fields")
+    baseline = bench("legacy isinstance chain", lambda: [
+        [legacy_sqlize_value(d.get(f)) for f in FIELDS] for d in dicts
+    ])
+    bench("SQLizer.sqlize_value", lambda: [
+        [SQLizer.sqlize_value(d.get(f)) for f in FIELDS] for d in dicts
+    ], baseline)
+    bench("SQLizer.sqlize_rows", lambda: SQLizer.sqlize_rows(dicts, FIELDS), baseline)
+    if np is not None:
+        columns = {f: [d[f] for d in dicts] for f in FIELDS}
+        for f in ["id", "active", "score"]:
+            columns[f] = np.array(columns[f])
+        bench("SQLizer.sqlize_rows(columns)", lambda: SQLizer.sqlize_rows(columns, FIELDS), baseline)
+    if orjson:
+        set_json_dumps(orjson_dumps)
+        bench("SQLizer.sqlize_rows(orjson)", lambda: SQLizer.sqlize_rows(dicts, FIELDS), baseline)
+        set_json_dumps()
+
+
+if __name__ == "__main__":
+    main()
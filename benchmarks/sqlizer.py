@@ -0,0 +1,200 @@
+"""
+working directory: fastapi-efficient-sql/
+command: python -m benchmarks.sqlizer [--quick] [--parameterized] [--filter NAME] [--save PATH] [--compare PATH]
+
+Measures SQL generation paths of `SQLizer` across batch sizes and column counts, without a database,
+since `Tortoise.init` never connects until the first query.
+Reports ops/sec, peak memory traced by `tracemalloc` and output bytes.
+With `--save`, results are stored as a baseline, and with `--compare`, results are compared against a stored baseline,
+which exits with 1 if any case is slower or larger than `--tolerance`, or renders different bytes.
+"""
+import json
+import sys
+import tracemalloc
+from argparse import ArgumentParser
+from datetime import datetime
+from logging import WARNING, getLogger
+from timeit import Timer
+
+from tortoise import run_async
+
+from examples.service.models.demo import Account
+from fastapi_esql import Q, SQLizer
+from tests import init_tortoise
+
+ROWS = [1, 10, 100, 1000, 10000, 100000]
+COLS = [2, 10, 50]
+QUICK_ROWS = [1, 10, 100, 1000]
+QUICK_COLS = [2, 10]
+TABLE = "bench_table"
+
+
+def make_fields(cols):
+    return [f"c{idx}" for idx in range(cols)]
+
+
+def make_dicts(rows, fields):
+    # Mixed types, like ints, strs, bools, floats, datetimes and JSON
+    values = [
+        lambda i: i,
+        lambda i: f"name-{i}",
+        lambda i: i % 2 == 0,
+        lambda i: i / 7,
+        lambda i: datetime(2023, 1, 1, 12, 30),
+        lambda i: {"rdm": i, "tags": ["a", "b"]},
+    ]
+    return [
+        {f: values[idx % len(values)](i) for idx, f in enumerate(fields)}
+        for i in range(rows)
+    ]
+
+
+def new_params(parameterized):
+    return [] if parameterized else None
+
+
+def wheres_cases(rows, parameterized):
+    """
+    `rows` is the length of the `IN` list
+    """
+    ids = list(range(rows))
+    forms = {
+        "str": f"id IN ({', '.join(map(str, ids))}) AND active=1",
+        "Q": Q(id__in=ids, active=True) | Q(gender=1),
+        "dict": {"id__in": ids, "active": True, "name__contains": "a"},
+        "list[Q]": [Q(id__in=ids), Q(active=True), Q(created_at__gte=datetime(2023, 1, 1))],
+    }
+    return {
+        f"resolve_wheres({name})": (lambda wheres=wheres: SQLizer.resolve_wheres(wheres, Account, new_params(parameterized)))
+        for name, wheres in forms.items()
+    }
+
+
+def row_cases(rows, cols, parameterized):
+    fields = make_fields(cols)
+    dicts = make_dicts(rows, fields)
+    join_fields, update_fields = fields[:1], fields[1:]
+    cases = {
+        "upsert_on_duplicate": lambda: SQLizer.upsert_on_duplicate(
+            TABLE, dicts, fields, upsert_fields=update_fields, params=new_params(parameterized),
+        ),
+        "build_fly_table(values)": lambda: SQLizer.build_fly_table(
+            dicts, fields, using_values=True, log_sql=False, params=new_params(parameterized),
+        ),
+        "build_fly_table(union)": lambda: SQLizer.build_fly_table(
+            dicts, fields, using_values=False, log_sql=False, params=new_params(parameterized),
+        ),
+    }
+    for strategy in ["join", "case"]:
+        cases[f"bulk_update_from_dicts({strategy})"] = lambda strategy=strategy: SQLizer.bulk_update_from_dicts(
+            TABLE, dicts, join_fields, update_fields, strategy=strategy, params=new_params(parameterized),
+        )
+    return cases
+
+
+def column_cases(cols, parameterized):
+    fields = make_fields(cols)
+    merge_dict = {f: idx if idx % 2 else f"value-{idx}" for idx, f in enumerate(fields)}
+    return {
+        "select_custom_fields": lambda: SQLizer.select_custom_fields(
+            TABLE, fields, "c0 > 0", orders=["-c0"], limit=10, params=new_params(parameterized),
+        ),
+        "update_json_field": lambda: SQLizer.update_json_field(
+            TABLE, "extend", "c0 = 1", merge_dict=merge_dict, params=new_params(parameterized),
+        ),
+    }
+
+
+def iter_cases(rows_grid, cols_grid, parameterized):
+    for cols in cols_grid:
+        for name, func in column_cases(cols, parameterized).items():
+            yield name, 1, cols, func
+    for rows in rows_grid:
+        for name, func in wheres_cases(rows, parameterized).items():
+            yield name, rows, 0, func
+    for rows in rows_grid:
+        for cols in cols_grid:
+            for name, func in row_cases(rows, cols, parameterized).items():
+                yield name, rows, cols, func
+
+
+def measure(func):
+    timer = Timer(func)
+    number, _ = timer.autorange()
+    cost = min(timer.repeat(repeat=3, number=number)) / number
+
+    tracemalloc.start()
+    try:
+        output = func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "ops": 1 / cost,
+        "peak": peak,
+        "bytes": len(output.encode()) if isinstance(output, str) else 0,
+    }
+
+
+def compare(result, baseline, tolerance):
+    """
+    Returns reasons of regression against the baseline
+    """
+    if baseline is None:
+        return ["new"]
+    reasons = []
+    if result["ops"] < baseline["ops"] * (1 - tolerance):
+        reasons.append(f"ops x{result['ops'] / baseline['ops']:.2f}")
+    if result["peak"] > baseline["peak"] * (1 + tolerance):
+        reasons.append(f"peak x{result['peak'] / baseline['peak']:.2f}")
+    if result["bytes"] != baseline["bytes"]:
+        reasons.append(f"bytes {baseline['bytes']:,} -> {result['bytes']:,}")
+    return reasons
+
+
+def main():
+    parser = ArgumentParser(description="Benchmarks SQL generation paths of SQLizer")
+    parser.add_argument("--quick", action="store_true", help=f"rows {QUICK_ROWS} and cols {QUICK_COLS} only")
+    parser.add_argument("--parameterized", action="store_true", help="send values apart from SQL")
+    parser.add_argument("--filter", default="", help="run cases whose name contains it")
+    parser.add_argument("--save", metavar="PATH", help="store results as a baseline")
+    parser.add_argument("--compare", metavar="PATH", help="compare results against a baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed ratio of slowdown and memory growth")
+    args = parser.parse_args()
+
+    # Statements are too large to log
+    getLogger("fastapi_esql.utils.sqlizer").setLevel(WARNING)
+    run_async(init_tortoise())
+    baselines = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baselines = json.load(f)
+
+    rows_grid, cols_grid = (QUICK_ROWS, QUICK_COLS) if args.quick else (ROWS, COLS)
+    results = {}
+    regressions = 0
+    print(f"{'case':<34} {'rows':>7} {'cols':>4} {'ops/s':>12} {'peak KiB':>10} {'bytes':>12}")
+    for name, rows, cols, func in iter_cases(rows_grid, cols_grid, args.parameterized):
+        if args.filter not in name:
+            continue
+        key = f"{name}|{rows}|{cols}"
+        result = results[key] = measure(func)
+        line = f"{name:<34} {rows:>7} {cols:>4} {result['ops']:>12,.1f} {result['peak'] / 1024:>10,.1f} {result['bytes']:>12,}"
+        if args.compare:
+            reasons = compare(result, baselines.get(key), args.tolerance)
+            if reasons and reasons != ["new"]:
+                regressions += 1
+            line += f"  {', '.join(reasons) or 'ok'}"
+        print(line, flush=True)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"\nSaved {len(results)} results to {args.save}")
+    if args.compare:
+        print(f"\n{regressions} regressions against {args.compare}")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
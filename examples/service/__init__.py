@@ -1,6 +1,16 @@
 from logging.config import dictConfig
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi_esql import (
+    CursorHandler,
+    SlowQueryLog,
+    add_flush_on_shutdown,
+    add_metrics_route,
+    add_slow_queries_route,
+    read_your_writes_session,
+    setup_sql_logging,
+    stop_sql_logging,
+)
 from tortoise.contrib.fastapi import register_tortoise
 
 from .routers import api_router
@@ -40,12 +50,29 @@ dictConfig({
         },
     }
 })
+setup_sql_logging(max_chars=4096, sample_limit=20)
+# Added before connections are closed on shutdown
+add_flush_on_shutdown(app)
+
+
+@app.middleware("http")
+async def read_your_writes(request: Request, call_next):
+    with read_your_writes_session():
+        return await call_next(request)
 
 
 @app.on_event("startup")
 async def startup():
     init_db(app)
     app.include_router(api_router, prefix="/api")
+    add_metrics_route(app)
+    CursorHandler.slow_query_log = SlowQueryLog(threshold=0.5)
+    add_slow_queries_route(app)
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    stop_sql_logging()
 
 
 def init_db(app: FastAPI):
@@ -6,3 +6,4 @@ from examples.service.models.demo.demo_meta import DemoMetaclass
 
 class AccountMgr(BaseManager, metaclass=DemoMetaclass):
     model = Account
+    read_your_writes_window = 1
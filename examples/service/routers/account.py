@@ -28,6 +28,7 @@ async def create_view():
 async def update_view(
     aid: int = Query(...),
 ):
+    # Read from `rw_conn` to modify and write back, since a replica may lag behind
     account = await AccountMgr.get_by_pk(pk=aid, conn=AccountMgr.rw_conn)
     if not account:
         return {"found": False, "ok": False}
@@ -1,5 +1,3 @@
-from logging.config import dictConfig
-
 from tortoise.converters import escape_string
 from tortoise.queryset import Q
 
@@ -13,12 +11,34 @@ from .orm import (
     BaseModel,
 )
 from .utils import (
+    BatchLoader,
+    ChunkedRowCnt,
     CursorHandler,
+    LRUCache,
     Cases,
+    MetricsRegistry,
     RawSQL,
+    ReplicaRouter,
+    ResultCache,
+    RowConverter,
     SQLizer,
+    SingleFlight,
     Singleton,
+    SlowQueryLog,
+    UpsertBuffer,
+    WriteBatch,
+    add_flush_on_shutdown,
+    add_metrics_route,
+    add_slow_queries_route,
     convert_dicts,
+    fingerprint_sql,
+    flush_all_buffers,
+    orjson_dumps,
+    read_your_writes_session,
+    register_encoder,
+    set_json_dumps,
+    setup_sql_logging,
+    stop_sql_logging,
     timing,
     wrap_backticks,
 )
@@ -31,47 +51,36 @@ __all__ = [
     "AppMetaclass",
     "BaseManager",
     "BaseModel",
+    "BatchLoader",
+    "ChunkedRowCnt",
     "CursorHandler",
     "Cases",
+    "LRUCache",
+    "MetricsRegistry",
     "Q",
     "RawSQL",
+    "ReplicaRouter",
+    "ResultCache",
+    "RowConverter",
     "SQLizer",
+    "SingleFlight",
     "Singleton",
+    "SlowQueryLog",
+    "UpsertBuffer",
+    "WriteBatch",
+    "add_flush_on_shutdown",
+    "add_metrics_route",
+    "add_slow_queries_route",
     "convert_dicts",
     "escape_string",
+    "fingerprint_sql",
+    "flush_all_buffers",
+    "orjson_dumps",
+    "read_your_writes_session",
+    "register_encoder",
+    "set_json_dumps",
+    "setup_sql_logging",
+    "stop_sql_logging",
     "timing",
     "wrap_backticks",
 ]
-
-dictConfig({
-    "version": 1,
-    "disable_existing_loggers": False,
-    "formatters": {
-        "default": {
-            "format": "[%(asctime)s] %(levelname)s %(name)s:%(funcName)s:+%(lineno)d %(message)s",
-        },
-    },
-    "handlers": {
-        "console": {
-            "class": "logging.StreamHandler",
-            "formatter": "default",
-            "level": "DEBUG",
-        },
-    },
-    "loggers": {
-        "": {
-            "handlers": ["console"],
-            "level": "INFO",
-        },
-        "fastapi_esql.utils.sqlizer": {
-            "handlers": ["console"],
-            "level": "DEBUG",
-            "propagate": False,
-        },
-        "fastapi_esql.orm.base_manager": {
-            "handlers": ["console"],
-            "level": "INFO",
-            "propagate": False,
-        },
-    }
-})
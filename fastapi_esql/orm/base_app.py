@@ -1,4 +1,7 @@
 from abc import ABCMeta
+from typing import Optional
+
+from ..utils.replica_router import ReplicaRouter
 
 
 class AppMetaclass(ABCMeta):
@@ -16,11 +19,16 @@ class AppMetaclass(ABCMeta):
             attrs["table"] = model.Meta.table
         return super().__new__(cls, name, bases, attrs)
 
+    # Routes reads among replicas if given, see `ReplicaRouter`
+    replica_router: Optional[ReplicaRouter] = None
+
     @property
     def ro_conn(self):
         """
         return Tortoise.get_connection("ro_conn")
         """
+        if self.replica_router is not None:
+            return self.replica_router.pick(lambda: self.rw_conn)
         if not getattr(self, "get_ro_conn", None):
             raise NotImplementedError(f"Method `get_ro_conn()` was not implemented by {self.__class__.__name__}!")
         return self.get_ro_conn()
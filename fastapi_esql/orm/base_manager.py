@@ -1,29 +1,268 @@
+import os
+import re
+from asyncio import get_event_loop
+from functools import wraps
 from logging import getLogger
-from typing import Any, Dict, List, Optional, Union
+from time import perf_counter
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, Iterable, Iterator, List, Mapping, Optional, Sequence, Set, Union
 
 from tortoise import BaseDBAsyncClient, Model
+from tortoise.fields import BooleanField, Field
+from tortoise.fields.data import CharEnumFieldInstance, IntEnumFieldInstance
 from tortoise.queryset import Q
 
 from .base_app import AppMetaclass
+from ..const.error import WrongParamsError
+from ..utils.batch_loader import BatchLoader
+from ..utils.columnar import dtype_of, to_arrow_table
+from ..utils.converter import RowConverter, convert_dicts, memoize, wrap_backticks
 from ..utils.cursor_handler import CursorHandler
+from ..utils.metrics import measure
+from ..utils.result_cache import ResultCache
+from ..utils.single_flight import SingleFlight
+from ..utils.serializer import parse_tsv_line, sqlize, write_tsv
+from ..utils.session import clear_write_mark, get_write_mark, mark_written
 from ..utils.sqlizer import SQLizer
+from ..utils.upsert_buffer import UpsertBuffer
+from ..utils.write_batch import WriteBatch
 
 logger = getLogger(__name__)
+# ER_NOT_ALLOWED_COMMAND, ER_CLIENT_LOCAL_FILES_DISABLED and CR_LOAD_DATA_LOCAL_INFILE_REJECTED
+LOCAL_INFILE_DISABLED_ERRNOS = {1148, 3948, 2068}
+# Returned by the driver already, so that converting them is only a type check
+IDENTITY_TYPES = (int, float, str, bytes)
+MEMOIZED_FIELDS = (BooleanField, CharEnumFieldInstance, IntEnumFieldInstance)
+SELECT_SHAPES = ("tuples", "namedtuples", "column", "scalar")
+
+
+def selected_columns(fields: List[str]) -> Optional[Set[str]]:
+    """
+    Returns names of columns in results of selected `fields`, or None if all columns are selected by `*`
+    """
+    names = set()
+    for f in fields:
+        name = re.split(r"\s+as\s+", f.strip(), flags=re.I)[-1].split(".")[-1].strip("` ")
+        if name == "*":
+            return None
+        names.add(name)
+    return names
+
+
+def _per_class(cls, attr: str, factory: Callable[[], Any]) -> Any:
+    # NOTE Looked up in the class itself, so that managers never share state by inheritance
+    value = cls.__dict__.get(attr)
+    if value is None:
+        value = factory()
+        setattr(cls, attr, value)
+    return value
+
+
+async def after_write(cls, table: str):
+    ResultCache.bump(table)
+    if cls.read_your_writes_window > 0:
+        gtid = await cls.fetch_gtid_executed() if cls.read_your_writes_gtid else None
+        mark_written(table, cls.read_your_writes_window, gtid)
+
+
+def track_writes(func):
+    """
+    Bumps the version of the written table after a write method, so that cached results of it are stale,
+    and marks the table written in the current session to read your writes.
+    Writes added to a `WriteBatch` are tracked after the batch is executed.
+    Write methods log failed statements and return, so nothing is tracked if they raise, like `WrongParamsError`,
+    which means nothing has been sent.
+    """
+    @wraps(func)
+    async def wrapper(cls, *args, **kwargs):
+        table = kwargs.get("to_table") or cls.table
+        batch = kwargs.get("batch")
+        if batch is not None:
+            result = await func(cls, *args, **kwargs)
+            batch.on_executed(lambda: after_write(cls, table))
+            return result
+        result = await func(cls, *args, **kwargs)
+        await after_write(cls, table)
+        return result
+
+    return wrapper
 
 
 class BaseManager(metaclass=AppMetaclass):
 
     model: Model = Model
+    # Opt-in cache of select results, which is bypassed if `conn` is given explicitly, like in a transaction
+    result_cache: Optional[ResultCache] = None
+    # Opt-in coalescing of identical reads in flight, which is also bypassed if `conn` is given explicitly
+    single_flight: Optional[SingleFlight] = None
+    # Seconds to collect pks for `load_by_pk`, pks are only collected within the same event loop tick if it is 0
+    pk_loader_window: float = 0
+    # Seconds to read from `rw_conn` after writes of the table in the current session, disabled if it is 0
+    read_your_writes_window: float = 0
+    # Reads from `ro_conn` within the window once it has applied GTID set of the writes
+    read_your_writes_gtid: bool = False
+    # Sends values apart from SQL to be bound by the driver, instead of inlining them as literals
+    parameterized: bool = False
+    # Seconds and rows to flush rows of `buffered_upsert`, and rows buffered or being flushed before callers wait
+    upsert_buffer_window: float = 0.05
+    upsert_buffer_rows: int = 1000
+    upsert_buffer_max_pending: int = 10000
+
+    @classmethod
+    def new_params(cls) -> Optional[List[Any]]:
+        return [] if cls.parameterized else None
+
+    @classmethod
+    def write_batch(cls, transaction: bool = False) -> WriteBatch:
+        """
+        Returns a batch on `rw_conn`, which collects writes of any manager sharing the connection by `batch=`
+        and sends them in one round trip, like
+        ```
+        async with AccountMgr.write_batch(transaction=True) as batch:
+            await AccountMgr.update_json_field(..., batch=batch)
+            await AccountMgr.upsert_on_duplicate(..., batch=batch)
+        batch.row_cnts
+        ```
+        """
+        return WriteBatch(cls.rw_conn, transaction=transaction)
+
+    @classmethod
+    async def execute_write(
+        cls,
+        sql: str,
+        params: Optional[List[Any]],
+        batch: Optional[WriteBatch] = None,
+    ) -> Optional[int]:
+        """
+        Executes a write on `rw_conn`, or adds it to `batch` and returns its index in the batch
+        """
+        if batch is not None:
+            return batch.add(sql, params, cls.rw_conn)
+        return await CursorHandler.sum_row_cnt(sql, cls.rw_conn, logger, params)
+
+    @classmethod
+    def build_converters(cls, convert_fields: Optional[List[str]] = None) -> Optional[RowConverter]:
+        """
+        Compiles converters of fields once per manager and fields.
+        Identity conversions of native types are skipped, and conversions of enums and bools are memoized.
+        """
+        if not convert_fields:
+            return None
+        key = tuple(convert_fields)
+        compiled = _per_class(cls, "_row_converters", dict)
+        converter = compiled.get(key)
+        if converter is None:
+            converters = {}
+            for f in convert_fields:
+                if f not in cls.model._meta.db_fields:
+                    continue
+                field = cls.model._meta.fields_map[f]
+                if type(field).to_python_value is Field.to_python_value and field.field_type in IDENTITY_TYPES:
+                    continue
+                converters[f] = field.to_python_value
+                if isinstance(field, MEMOIZED_FIELDS):
+                    converters[f] = memoize(converters[f])
+            converter = compiled[key] = RowConverter(converters)
+        return converter or None
+
+    @classmethod
+    async def fetch_gtid_executed(cls) -> Optional[str]:
+        one = await CursorHandler.fetch_one("SELECT @@GLOBAL.gtid_executed gtid", cls.rw_conn, logger)
+        return one.get("gtid") if one else None
+
+    @classmethod
+    async def get_read_conn(cls) -> BaseDBAsyncClient:
+        """
+        Returns `rw_conn` within the window after writes of the table in the current session, otherwise `ro_conn`
+        """
+        mark = get_write_mark(cls.table)
+        if mark is None:
+            return cls.ro_conn
+        gtid = mark[1]
+        if gtid:
+            conn = cls.ro_conn
+            one = await CursorHandler.fetch_one(
+                f"SELECT GTID_SUBSET({sqlize(gtid)}, @@GLOBAL.gtid_executed) applied", conn, logger,
+            )
+            if one and one.get("applied"):
+                clear_write_mark(cls.table)
+                return conn
+        return cls.rw_conn
+
+    @classmethod
+    async def read_through(
+        cls,
+        key: Hashable,
+        fetch: Callable[[], Awaitable[Any]],
+        conn: Optional[BaseDBAsyncClient] = None,
+        bypass: bool = False,
+    ) -> Any:
+        """
+        Reads by `result_cache` and `single_flight` if they are set and not bypassed
+        """
+        if bypass:
+            return await fetch()
+        cache = cls.result_cache
+        if cache is not None:
+            result = cache.get(key, cls.table)
+            if result is not None:
+                return result
+            version = cache.version(cls.table)
+
+        if cls.single_flight is None:
+            result = await fetch()
+        else:
+            result = await cls.single_flight.do((getattr(conn, "connection_name", None), key), fetch)
+        # NOTE Failed results are not cached
+        if cache is not None and result is not None:
+            cache.put(key, version, result)
+        return result
 
     @classmethod
+    @measure
     async def get_by_pk(
         cls,
         pk: Any,
         conn: Optional[BaseDBAsyncClient] = None,
     ) -> Optional[Model]:
-        return await cls.model.get_or_none(pk=pk).using_db(conn)
+        if conn is not None:
+            return await cls.model.get_or_none(pk=pk).using_db(conn)
+        conn = await cls.get_read_conn()
+        if cls.single_flight is None:
+            return await cls.model.get_or_none(pk=pk).using_db(conn)
+        return await cls.single_flight.do(
+            (getattr(conn, "connection_name", None), "pk", cls.table, pk),
+            lambda: cls.model.get_or_none(pk=pk).using_db(conn),
+        )
+
+    @classmethod
+    def get_pk_loader(cls) -> BatchLoader:
+        return _per_class(cls, "_pk_loader", lambda: BatchLoader(cls.get_by_pks, window=cls.pk_loader_window))
+
+    @classmethod
+    @measure
+    async def get_by_pks(
+        cls,
+        pks: List[Any],
+        conn: Optional[BaseDBAsyncClient] = None,
+    ) -> Dict[Any, Model]:
+        objs = await cls.model.filter(pk__in=pks).using_db(conn or await cls.get_read_conn())
+        return {obj.pk: obj for obj in objs}
+
+    @classmethod
+    async def load_by_pk(cls, pk: Any) -> Optional[Model]:
+        """
+        Works like `get_by_pk`, but pks requested by concurrent callers within the same event loop tick,
+        or `pk_loader_window` seconds, are loaded by one `WHERE pk IN (...)` query
+        """
+        # NOTE Batches are loaded in the session of whoever dispatches them,
+        # so callers which have written the table read by themselves
+        if get_write_mark(cls.table) is not None:
+            return await cls.get_by_pk(pk)
+        return await cls.get_pk_loader().load(cls.model._meta.pk.to_python_value(pk))
 
     @classmethod
+    @measure
+    @track_writes
     async def create_from_dict(cls, params: Dict[str, Any]) -> Optional[Model]:
         try:
             return await cls.model.create(**params, using_db=cls.rw_conn)
@@ -32,6 +271,8 @@ class BaseManager(metaclass=AppMetaclass):
             return None
 
     @classmethod
+    @measure
+    @track_writes
     async def update_from_dict(cls, obj: Model, params: Dict[str, Any]) -> bool:
         try:
             await obj.update_from_dict(params).save(
@@ -44,6 +285,8 @@ class BaseManager(metaclass=AppMetaclass):
             return False
 
     @classmethod
+    @measure
+    @track_writes
     async def bulk_create_from_dicts(cls, dicts: List[Dict[str, Any]], **kwargs) -> bool:
         try:
             # NOTE Here is a bug in bulk_create. https://github.com/tortoise/tortoise-orm/issues/1281
@@ -58,6 +301,7 @@ class BaseManager(metaclass=AppMetaclass):
             return False
 
     @classmethod
+    @measure
     async def select_custom_fields(
         cls,
         fields: List[str],
@@ -72,6 +316,7 @@ class BaseManager(metaclass=AppMetaclass):
         convert_fields: Optional[List[str]] = None,
         conn: Optional[BaseDBAsyncClient] = None,
     ):
+        params = cls.new_params()
         sql = SQLizer.select_custom_fields(
             cls.table,
             fields,
@@ -83,15 +328,123 @@ class BaseManager(metaclass=AppMetaclass):
             offset=offset,
             limit=limit,
             model=cls.model,
+            params=params,
+        )
+        bypass = conn is not None
+        conn = conn or await cls.get_read_conn()
+        converters = cls.build_converters(convert_fields)
+        return await cls.read_through(
+            ("dicts", sql, tuple(params or ()), tuple(convert_fields or ())),
+            lambda: CursorHandler.fetch_dicts(sql, conn, logger, converters, params),
+            conn,
+            bypass,
+        )
+
+    @classmethod
+    @measure
+    async def stream_custom_fields(
+        cls,
+        fields: List[str],
+        wheres: Union[str, Q, Dict[str, Any], List[Q]],
+        *,
+        index: Optional[str] = None,
+        orders: Optional[List[str]] = None,
+        batch_size: int = 1000,
+        convert_fields: Optional[List[str]] = None,
+        conn: Optional[BaseDBAsyncClient] = None,
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Yields batches of one query read by a server-side cursor, see `CursorHandler.stream_dicts`
+        """
+        params = cls.new_params()
+        sql = SQLizer.select_custom_fields(
+            cls.table,
+            fields,
+            wheres,
+            index=index,
+            orders=orders,
+            model=cls.model,
+            params=params,
         )
-        conn = conn or cls.ro_conn
-        converters = {
-            f: cls.model._meta.fields_map[f].to_python_value
-            for f in convert_fields if f in cls.model._meta.db_fields
-        } if convert_fields else None
-        return await CursorHandler.fetch_dicts(sql, conn, logger, converters)
+        conn = conn or await cls.get_read_conn()
+        converters = cls.build_converters(convert_fields)
+        agen = CursorHandler.stream_dicts(sql, conn, logger, converters, params, batch_size)
+        try:
+            async for dicts in agen:
+                yield dicts
+        finally:
+            # NOTE Closed explicitly, so that the connection is released once the iteration breaks instead of by GC
+            await agen.aclose()
+
+    @classmethod
+    @measure
+    async def iter_custom_fields(
+        cls,
+        fields: List[str],
+        wheres: Union[str, Q, Dict[str, Any], List[Q]],
+        *,
+        index: Optional[str] = None,
+        keys: Optional[List[str]] = None,
+        batch_size: int = 1000,
+        convert_fields: Optional[List[str]] = None,
+        conn: Optional[BaseDBAsyncClient] = None,
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Yields batches by keyset pagination, which seeks rows after the last batch instead of `LIMIT offset, n`,
+        so the latency keeps flat from the first batch to the last.
+        `keys` should be unique in ordering, like `["-id"]` or `["created_at", "id"]`, and defaults to the primary key.
+        Exceptions of any batch are re-raised after logging, like `stream_custom_fields`,
+        since a truncated iteration looks the same as a complete one.
+        """
+        if batch_size <= 0:
+            raise WrongParamsError("Parameter `batch_size` should be positive")
+        keys = keys or [cls.model._meta.db_pk_column]
+        columns = [k.strip("-") for k in keys]
+        # Keys are selected for seeking, and removed from results if not required
+        selected = selected_columns(fields)
+        extra_columns = [] if selected is None else [c for c in columns if c not in selected]
+        fields = [*fields, *extra_columns]
+
+        base_params = cls.new_params()
+        where = SQLizer.resolve_wheres(wheres, cls.model, base_params)
+        conn = conn or await cls.get_read_conn()
+        converters = cls.build_converters(convert_fields)
+
+        last_values = None
+        while True:
+            params = None if base_params is None else list(base_params)
+            if last_values is None:
+                page_wheres = where
+            else:
+                page_wheres = f"({where}) AND {SQLizer.resolve_seek(keys, last_values, params)}"
+            sql = SQLizer.select_custom_fields(
+                cls.table,
+                fields,
+                page_wheres,
+                index=index,
+                orders=keys,
+                limit=batch_size,
+                params=params,
+            )
+            try:
+                dicts = await CursorHandler.query_dicts(sql, conn, params)
+            except Exception as e:
+                logger.exception(f"{e} SQL=>{sql}")
+                raise
+            if not dicts:
+                return
+            convert_dicts(dicts, converters)
+
+            last_values = [dicts[-1][c] for c in columns]
+            for c in extra_columns:
+                for d in dicts:
+                    d.pop(c, None)
+            yield dicts
+            if len(dicts) < batch_size:
+                return
 
     @classmethod
+    @measure
     async def select_one_record(
         cls,
         fields: List[str],
@@ -104,6 +457,7 @@ class BaseManager(metaclass=AppMetaclass):
         convert_fields: Optional[List[str]] = None,
         conn: Optional[BaseDBAsyncClient] = None,
     ):
+        params = cls.new_params()
         sql = SQLizer.select_custom_fields(
             cls.table,
             fields,
@@ -115,15 +469,173 @@ class BaseManager(metaclass=AppMetaclass):
             offset=0,
             limit=1,
             model=cls.model,
+            params=params,
+        )
+        bypass = conn is not None
+        conn = conn or await cls.get_read_conn()
+        converters = cls.build_converters(convert_fields)
+        return await cls.read_through(
+            ("one", sql, tuple(params or ()), tuple(convert_fields or ())),
+            lambda: CursorHandler.fetch_one(sql, conn, logger, converters, params),
+            conn,
+            bypass,
+        )
+
+    @classmethod
+    @measure
+    async def select_shaped(
+        cls,
+        shape: str,
+        fields: List[str],
+        wheres: Union[str, Q, Dict[str, Any], List[Q]],
+        *,
+        index: Optional[str] = None,
+        groups: Optional[List[str]] = None,
+        having: Optional[str] = None,
+        orders: Optional[List[str]] = None,
+        offset: Optional[int] = None,
+        limit: Optional[int] = None,
+        convert_fields: Optional[List[str]] = None,
+        conn: Optional[BaseDBAsyncClient] = None,
+    ):
+        """
+        Works like `select_custom_fields`, but returns rows in `shape` without building a dict per row,
+        which is one of `tuples`, `namedtuples`, `column`(values of the first field) and `scalar`
+        """
+        if shape not in SELECT_SHAPES:
+            raise WrongParamsError(f"Parameter `shape` should be one of {SELECT_SHAPES}")
+        params = cls.new_params()
+        sql = SQLizer.select_custom_fields(
+            cls.table,
+            fields,
+            wheres,
+            index=index,
+            groups=groups,
+            having=having,
+            orders=orders,
+            offset=offset,
+            limit=limit,
+            model=cls.model,
+            params=params,
+        )
+        bypass = conn is not None
+        conn = conn or await cls.get_read_conn()
+        converters = cls.build_converters(convert_fields)
+        fetch = getattr(CursorHandler, f"fetch_{shape}")
+        return await cls.read_through(
+            (shape, sql, tuple(params or ()), tuple(convert_fields or ())),
+            lambda: fetch(sql, conn, logger, converters, params),
+            conn,
+            bypass,
+        )
+
+    @classmethod
+    @measure
+    async def select_tuples(
+        cls,
+        fields: List[str],
+        wheres: Union[str, Q, Dict[str, Any], List[Q]],
+        **kwargs,
+    ) -> Optional[List[tuple]]:
+        return await cls.select_shaped("tuples", fields, wheres, **kwargs)
+
+    @classmethod
+    @measure
+    async def select_namedtuples(
+        cls,
+        fields: List[str],
+        wheres: Union[str, Q, Dict[str, Any], List[Q]],
+        **kwargs,
+    ) -> Optional[List[tuple]]:
+        return await cls.select_shaped("namedtuples", fields, wheres, **kwargs)
+
+    @classmethod
+    @measure
+    async def select_column(
+        cls,
+        field: str,
+        wheres: Union[str, Q, Dict[str, Any], List[Q]],
+        **kwargs,
+    ) -> Optional[List[Any]]:
+        return await cls.select_shaped("column", [field], wheres, **kwargs)
+
+    @classmethod
+    @measure
+    async def select_scalar(
+        cls,
+        field: str,
+        wheres: Union[str, Q, Dict[str, Any], List[Q]],
+        **kwargs,
+    ) -> Any:
+        """
+        Returns the value of `field` in the first row, like `COUNT(1)`, and `None` if no row or failed
+        """
+        # NOTE Only the first row from `offset` is read, whatever `limit` is given
+        kwargs["limit"] = 1
+        kwargs.setdefault("offset", 0)
+        return await cls.select_shaped("scalar", [field], wheres, **kwargs)
+
+    @classmethod
+    def build_dtypes(cls, fields: List[str], convert_fields: Optional[List[str]] = None) -> Dict[str, str]:
+        """
+        Infers NumPy dtypes of selected model fields, except converted ones which are kept as objects
+        """
+        dtypes = {}
+        for f in fields:
+            if f not in cls.model._meta.db_fields or (convert_fields and f in convert_fields):
+                continue
+            dtype = dtype_of(cls.model._meta.fields_map[f])
+            if dtype:
+                dtypes[f] = dtype
+        return dtypes
+
+    @classmethod
+    @measure
+    async def select_custom_fields_columnar(
+        cls,
+        fields: List[str],
+        wheres: Union[str, Q, Dict[str, Any], List[Q]],
+        *,
+        index: Optional[str] = None,
+        groups: Optional[List[str]] = None,
+        having: Optional[str] = None,
+        orders: Optional[List[str]] = None,
+        offset: Optional[int] = None,
+        limit: Optional[int] = None,
+        convert_fields: Optional[List[str]] = None,
+        arrow: bool = False,
+        conn: Optional[BaseDBAsyncClient] = None,
+    ):
+        """
+        Works like `select_custom_fields`, but returns values per field decoded from the cursor directly,
+        which are NumPy arrays with dtypes of model fields, or a `pyarrow.Table` if `arrow` is True.
+        Results are never cached, since arrays are mutable.
+        """
+        params = cls.new_params()
+        sql = SQLizer.select_custom_fields(
+            cls.table,
+            fields,
+            wheres,
+            index=index,
+            groups=groups,
+            having=having,
+            orders=orders,
+            offset=offset,
+            limit=limit,
+            model=cls.model,
+            params=params,
+        )
+        conn = conn or await cls.get_read_conn()
+        columns = await CursorHandler.fetch_columns(
+            sql, conn, logger, cls.build_converters(convert_fields), params, cls.build_dtypes(fields, convert_fields),
         )
-        conn = conn or cls.ro_conn
-        converters = {
-            f: cls.model._meta.fields_map[f].to_python_value
-            for f in convert_fields if f in cls.model._meta.db_fields
-        } if convert_fields else None
-        return await CursorHandler.fetch_one(sql, conn, logger, converters)
+        if columns is None or not arrow:
+            return columns
+        return to_arrow_table(columns)
 
     @classmethod
+    @measure
+    @track_writes
     async def update_json_field(
         cls,
         json_field: str,
@@ -134,7 +646,9 @@ class BaseManager(metaclass=AppMetaclass):
         remove_paths: Optional[List[str]] = None,
         json_type: type = dict,
         assign_field_dict: Dict[str, Any] = None,
+        batch: Optional[WriteBatch] = None,
     ):
+        params = cls.new_params()
         sql = SQLizer.update_json_field(
             cls.table,
             json_field,
@@ -145,30 +659,196 @@ class BaseManager(metaclass=AppMetaclass):
             json_type=json_type,
             assign_field_dict=assign_field_dict,
             model=cls.model,
+            params=params,
         )
-        return await CursorHandler.sum_row_cnt(sql, cls.rw_conn, logger)
+        return await cls.execute_write(sql, params, batch)
 
     @classmethod
+    @measure
+    @track_writes
     async def upsert_on_duplicate(
         cls,
-        dicts: List[Dict[str, Any]],
+        dicts: Union[List[Dict[str, Any]], Mapping[str, Sequence]],
         insert_fields: List[str],
         *,
         upsert_fields: Optional[List[str]] = None,
         merge_fields: Optional[List[str]] = None,
         using_values: bool = False,
+        ignore: bool = False,
+        chunk_rows: Optional[int] = None,
+        chunk_bytes: Optional[int] = None,
+        concurrency: int = 1,
+        batch: Optional[WriteBatch] = None,
     ):
-        sql = SQLizer.upsert_on_duplicate(
-            cls.table,
-            dicts,
+        """
+        `dicts` can also be columnar, like a mapping of column name to sequence or NumPy array, or a pandas/pyarrow-like table.
+        If `chunk_rows` or `chunk_bytes` is given, dicts are split into chunks bounded by them,
+        and a `ChunkedRowCnt` is returned instead of the row count.
+        Chunks run in one transaction if `concurrency` is 1, otherwise concurrently across `rw_conn` pool.
+        If `batch` is given, the statement is added to it instead, see `write_batch`.
+        """
+        def render(dicts):
+            params = cls.new_params()
+            sql = SQLizer.upsert_on_duplicate(
+                cls.table,
+                dicts,
+                insert_fields,
+                upsert_fields=upsert_fields,
+                merge_fields=merge_fields,
+                using_values=using_values,
+                ignore=ignore,
+                params=params,
+            )
+            return sql, params
+
+        if chunk_rows or chunk_bytes:
+            if batch is not None:
+                raise WrongParamsError("Parameter `batch` does not work with chunks")
+            statements = (
+                render(chunk)
+                for chunk in SQLizer.chunk_dicts(dicts, insert_fields, chunk_rows, chunk_bytes)
+            )
+            return await CursorHandler.sum_chunk_row_cnts(statements, cls.rw_conn, logger, concurrency)
+        sql, params = render(dicts)
+        return await cls.execute_write(sql, params, batch)
+
+    @classmethod
+    def get_upsert_buffer(
+        cls,
+        insert_fields: List[str],
+        *,
+        upsert_fields: Optional[List[str]] = None,
+        merge_fields: Optional[List[str]] = None,
+        using_values: bool = False,
+        ignore: bool = False,
+        key_fields: Optional[List[str]] = None,
+    ) -> UpsertBuffer:
+        """
+        Returns the buffer of a statement shape, which is created once per manager and shape.
+        Rows are collapsed by `key_fields`, which are the pk by default if it is inserted.
+        """
+        if key_fields is None:
+            pk = cls.model._meta.db_pk_column
+            key_fields = [pk] if pk in insert_fields else []
+        shape = (
+            tuple(insert_fields), tuple(upsert_fields or ()), tuple(merge_fields or ()),
+            using_values, ignore, tuple(key_fields),
+        )
+        buffers = _per_class(cls, "_upsert_buffers", dict)
+        buffer = buffers.get(shape)
+        if buffer is None:
+            async def flush_rows(dicts: List[Dict[str, Any]]):
+                return await cls.upsert_on_duplicate(
+                    dicts,
+                    insert_fields,
+                    upsert_fields=upsert_fields,
+                    merge_fields=merge_fields,
+                    using_values=using_values,
+                    ignore=ignore,
+                )
+
+            buffer = buffers[shape] = UpsertBuffer(
+                flush_rows,
+                key_fields,
+                update_fields=upsert_fields,
+                merge_fields=merge_fields,
+                window=cls.upsert_buffer_window,
+                max_rows=cls.upsert_buffer_rows,
+                max_pending=cls.upsert_buffer_max_pending,
+            )
+        return buffer
+
+    @classmethod
+    @measure
+    @track_writes
+    async def buffered_upsert(
+        cls,
+        dicts: List[Dict[str, Any]],
+        insert_fields: List[str],
+        *,
+        upsert_fields: Optional[List[str]] = None,
+        merge_fields: Optional[List[str]] = None,
+        using_values: bool = False,
+        ignore: bool = False,
+        key_fields: Optional[List[str]] = None,
+    ) -> Optional[int]:
+        """
+        Buffers rows to be upserted together with rows of concurrent callers by one statement, see `get_upsert_buffer`,
+        and returns the row count of the flush including them, which is `None` if the flush failed.
+        """
+        if not dicts:
+            raise WrongParamsError("Parameter `dicts` is required")
+        buffer = cls.get_upsert_buffer(
             insert_fields,
             upsert_fields=upsert_fields,
             merge_fields=merge_fields,
             using_values=using_values,
+            ignore=ignore,
+            key_fields=key_fields,
         )
-        return await CursorHandler.sum_row_cnt(sql, cls.rw_conn, logger)
+        return await buffer.add(dicts)
+
+    @classmethod
+    @measure
+    @track_writes
+    async def bulk_load_from_dicts(
+        cls,
+        dicts: Union[Iterable[Dict[str, Any]], Mapping[str, Sequence]],
+        insert_fields: List[str],
+        *,
+        mode: Optional[str] = None,
+        chunk_rows: int = 5000,
+        tmp_dir: Optional[str] = None,
+    ) -> Optional[int]:
+        """
+        Writes rows into a TSV temp file and loads it by `LOAD DATA LOCAL INFILE`,
+        which requires `local_infile` enabled on server and `"local_infile": True` in credentials of `rw_conn`.
+        `dicts` can be any iterable of dicts, or columnar like `upsert_on_duplicate`.
+        `mode` is `replace` or `ignore` for rows with duplicate keys, which are ignored by default.
+        If local infile is disabled, rows are inserted by chunks of `chunk_rows` in one transaction,
+        which are taken from `dicts` again, or read back from the file if `dicts` is a one-shot iterator.
+        The file is written in a thread, so that the event loop is not blocked by large loads.
+        """
+        loop = get_event_loop()
+        path = await loop.run_in_executor(None, write_tsv, SQLizer.iter_values(dicts, insert_fields), tmp_dir)
+        try:
+            sql = SQLizer.load_data_infile(cls.table, path, insert_fields, mode=mode)
+            st = perf_counter()
+            try:
+                row_cnt, _ = await cls.rw_conn.execute_query(sql)
+                CursorHandler.observe(sql, cls.rw_conn, st, affected=row_cnt)
+                return row_cnt
+            except Exception as e:
+                CursorHandler.observe(sql, cls.rw_conn, st, failed=True)
+                if CursorHandler.get_errno(e) not in LOCAL_INFILE_DISABLED_ERRNOS:
+                    logger.exception(f"{e} SQL=>{sql}")
+                    return None
+                logger.warning(f"Falling back to chunked inserts since local infile is disabled => {e}")
+
+            def render(dicts):
+                params = cls.new_params()
+                sql = SQLizer.upsert_on_duplicate(
+                    cls.table,
+                    dicts,
+                    insert_fields,
+                    upsert_fields=insert_fields if mode == "replace" else None,
+                    ignore=mode != "replace",
+                    params=params,
+                )
+                return sql, params
+
+            with open(path, encoding="utf-8", errors="surrogateescape", newline="\n") as tsv:
+                if isinstance(dicts, Iterator):
+                    dicts = (dict(zip(insert_fields, parse_tsv_line(line))) for line in tsv)
+                statements = (render(chunk) for chunk in SQLizer.chunk_dicts(dicts, insert_fields, chunk_rows))
+                result = await CursorHandler.sum_chunk_row_cnts(statements, cls.rw_conn, logger)
+            return None if result is None else result.row_cnt
+        finally:
+            os.remove(path)
 
     @classmethod
+    @measure
+    @track_writes
     async def insert_into_select(
         cls,
         wheres: Union[str, Q, Dict[str, Any], List[Q]],
@@ -176,7 +856,9 @@ class BaseManager(metaclass=AppMetaclass):
         remain_fields: List[str] = None,
         assign_field_dict: Dict[str, Any] = None,
         to_table: Optional[str] = None,
+        batch: Optional[WriteBatch] = None,
     ):
+        params = cls.new_params()
         sql = SQLizer.insert_into_select(
             cls.table,
             wheres,
@@ -184,25 +866,128 @@ class BaseManager(metaclass=AppMetaclass):
             assign_field_dict=assign_field_dict,
             to_table=to_table,
             model=cls.model,
+            params=params,
         )
-        return await CursorHandler.sum_row_cnt(sql, cls.rw_conn, logger)
+        return await cls.execute_write(sql, params, batch)
 
     @classmethod
+    @measure
+    @track_writes
     async def bulk_update_from_dicts(
         cls,
-        dicts: List[Dict[str, Any]],
+        dicts: Union[List[Dict[str, Any]], Mapping[str, Sequence]],
         join_fields: List[str],
         update_fields: List[str],
         *,
         merge_fields: Optional[List[str]] = None,
         using_values: bool = True,
+        strategy: str = "join",
+        chunk_rows: Optional[int] = None,
+        chunk_bytes: Optional[int] = None,
+        concurrency: int = 1,
+        batch: Optional[WriteBatch] = None,
     ):
-        sql = SQLizer.bulk_update_from_dicts(
-            cls.table,
+        """
+        Chunking and `batch` work the same as `upsert_on_duplicate`, and strategy `auto` is picked per chunk.
+        See `SQLizer.bulk_update_from_dicts` for other strategies.
+        Strategy `staging` inserts rows by chunks into an indexed temporary table,
+        and updates by joining it in one transaction, which keeps predictable for 100k+ rows.
+        """
+        if batch is not None and (strategy == "staging" or chunk_rows or chunk_bytes):
+            raise WrongParamsError("Parameter `batch` does not work with chunks or strategy `staging`")
+        if strategy == "staging":
+            # NOTE Not by `bulk_update_by_staging`, which would track the write again
+            return await cls.update_by_staging(
+                dicts,
+                join_fields,
+                update_fields,
+                merge_fields=merge_fields,
+                chunk_rows=chunk_rows or 5000,
+                chunk_bytes=chunk_bytes,
+            )
+
+        def render(dicts):
+            params = cls.new_params()
+            sql = SQLizer.bulk_update_from_dicts(
+                cls.table,
+                dicts,
+                join_fields,
+                update_fields,
+                merge_fields=merge_fields,
+                using_values=using_values,
+                strategy=strategy,
+                params=params,
+            )
+            return sql, params
+
+        if chunk_rows or chunk_bytes:
+            fields = join_fields + update_fields + (merge_fields or [])
+            statements = (
+                render(chunk)
+                for chunk in SQLizer.chunk_dicts(dicts, fields, chunk_rows, chunk_bytes)
+            )
+            return await CursorHandler.sum_chunk_row_cnts(statements, cls.rw_conn, logger, concurrency)
+        sql, params = render(dicts)
+        return await cls.execute_write(sql, params, batch)
+
+    @classmethod
+    @measure
+    @track_writes
+    async def bulk_update_by_staging(
+        cls,
+        dicts: Union[List[Dict[str, Any]], Mapping[str, Sequence]],
+        join_fields: List[str],
+        update_fields: List[str],
+        *,
+        merge_fields: Optional[List[str]] = None,
+        chunk_rows: Optional[int] = 5000,
+        chunk_bytes: Optional[int] = None,
+    ) -> Optional[int]:
+        return await cls.update_by_staging(
             dicts,
             join_fields,
             update_fields,
             merge_fields=merge_fields,
-            using_values=using_values,
+            chunk_rows=chunk_rows,
+            chunk_bytes=chunk_bytes,
         )
-        return await CursorHandler.sum_row_cnt(sql, cls.rw_conn, logger)
+
+    @classmethod
+    async def update_by_staging(
+        cls,
+        dicts: Union[List[Dict[str, Any]], Mapping[str, Sequence]],
+        join_fields: List[str],
+        update_fields: List[str],
+        *,
+        merge_fields: Optional[List[str]] = None,
+        chunk_rows: Optional[int] = 5000,
+        chunk_bytes: Optional[int] = None,
+    ) -> Optional[int]:
+        """
+        Works like `bulk_update_by_staging`, but writes are not tracked
+        """
+        fields = join_fields + update_fields + (merge_fields or [])
+        staging_table = f"tmp_{cls.table}"
+        # NOTE A temporary table lives as long as the connection, which may be left by a failed call
+        drop_sql = f"DROP TEMPORARY TABLE IF EXISTS {wrap_backticks(staging_table)}"
+        sql = None
+        try:
+            async with cls.rw_conn._in_transaction() as conn:
+                for sql in [drop_sql, SQLizer.create_staging_table(cls.table, staging_table, fields, join_fields)]:
+                    await conn.execute_script(sql)
+                for chunk in SQLizer.chunk_dicts(dicts, fields, chunk_rows, chunk_bytes):
+                    params = cls.new_params()
+                    sql = SQLizer.upsert_on_duplicate(staging_table, chunk, fields, params=params)
+                    await conn.execute_query(sql, params)
+                sql = SQLizer.bulk_update_from_staging(
+                    cls.table, staging_table, join_fields, update_fields, merge_fields=merge_fields,
+                )
+                st = perf_counter()
+                row_cnt, _ = await conn.execute_query(sql)
+                CursorHandler.observe(sql, conn, st, affected=row_cnt)
+                sql = drop_sql
+                await conn.execute_script(sql)
+            return row_cnt
+        except Exception as e:
+            logger.exception(f"{e} SQL=>{sql}")
+            return None
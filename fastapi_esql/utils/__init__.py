@@ -1,5 +1,18 @@
-from .converter import convert_dicts, wrap_backticks
-from .cursor_handler import CursorHandler
+from .batch_loader import BatchLoader
+from .cache import LRUCache
+from .converter import RowConverter, convert_dicts, wrap_backticks
+from .cursor_handler import ChunkedRowCnt, CursorHandler
 from .decorator import timing
+from .fingerprint import fingerprint_sql
 from .metaclass import Singleton
+from .metrics import MetricsRegistry, add_metrics_route
+from .replica_router import ReplicaRouter
+from .result_cache import ResultCache
+from .single_flight import SingleFlight
+from .slow_query import SlowQueryLog, add_slow_queries_route
+from .serializer import orjson_dumps, register_encoder, set_json_dumps
+from .session import read_your_writes_session
+from .sql_logging import setup_sql_logging, stop_sql_logging
 from .sqlizer import Cases, RawSQL, SQLizer
+from .upsert_buffer import UpsertBuffer, add_flush_on_shutdown, flush_all_buffers
+from .write_batch import WriteBatch
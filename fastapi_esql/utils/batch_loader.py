@@ -0,0 +1,69 @@
+from asyncio import Future, ensure_future, get_event_loop, shield
+from typing import Any, Awaitable, Callable, Dict, Hashable, List
+
+from .result_cache import copy_result
+
+
+class BatchLoader:
+    """
+    Collects keys requested within the same event loop tick, or within `window` seconds if given,
+    and loads them by one call of `load_many`, which returns a mapping of key to value.
+    Missing keys resolve to `None`, and every caller gets its own copy of the value.
+    """
+    def __init__(
+        self,
+        load_many: Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]],
+        window: float = 0,
+        max_batch: int = 1000,
+    ):
+        self.load_many = load_many
+        self.window = window
+        self.max_batch = max_batch
+        self.loads = 0
+        self.batches = 0
+        self._pending: Dict[Hashable, Future] = {}
+        self._scheduled = False
+
+    async def load(self, key: Hashable) -> Any:
+        self.loads += 1
+        future = self._pending.get(key)
+        if future is None:
+            loop = get_event_loop()
+            future = self._pending[key] = loop.create_future()
+            if len(self._pending) >= self.max_batch:
+                self.dispatch()
+            elif not self._scheduled:
+                self._scheduled = True
+                if self.window:
+                    loop.call_later(self.window, self.dispatch)
+                else:
+                    loop.call_soon(self.dispatch)
+        # NOTE Cancelling one caller doesn't cancel the value for others waiting the same key
+        return copy_result(await shield(future))
+
+    def dispatch(self):
+        self._scheduled = False
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        self.batches += 1
+        ensure_future(self._load_batch(pending))
+
+    async def _load_batch(self, pending: Dict[Hashable, Future]):
+        try:
+            values = await self.load_many(list(pending))
+        except Exception as e:
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for key, future in pending.items():
+            if not future.done():
+                future.set_result(values.get(key))
+
+    def info(self) -> Dict[str, int]:
+        return {
+            "loads": self.loads,
+            "batches": self.batches,
+            "pending": len(self._pending),
+        }
@@ -0,0 +1,78 @@
+from typing import Any, Dict, List, Optional, Sequence
+
+from tortoise.fields import (
+    BigIntField,
+    BooleanField,
+    DateField,
+    DatetimeField,
+    Field,
+    FloatField,
+    IntField,
+    SmallIntField,
+)
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+# NOTE Checked in order, since some fields inherit others, like `IntEnumField` from `SmallIntField`
+FIELD_DTYPES = [
+    (BooleanField, "bool"),
+    (SmallIntField, "int16"),
+    (BigIntField, "int64"),
+    (IntField, "int32"),
+    (FloatField, "float64"),
+    (DatetimeField, "datetime64[us]"),
+    (DateField, "datetime64[D]"),
+]
+
+
+def dtype_of(field: Field) -> Optional[str]:
+    """
+    Returns NumPy dtype of a field, or `None` for values kept as objects, like strings, decimals and JSON
+    """
+    for field_class, dtype in FIELD_DTYPES:
+        if isinstance(field, field_class):
+            return dtype
+    return None
+
+
+def to_array(values: Sequence[Any], dtype: Optional[str] = None) -> Any:
+    """
+    Builds a NumPy array of values, which falls back to objects if any value is NULL,
+    except floats and datetimes whose NULL is NaN and NaT
+    """
+    if dtype is not None and (dtype.startswith(("float", "datetime")) or None not in values):
+        return np.array(values, dtype=dtype)
+    # NOTE Assigned by slice, so that sequences like JSON arrays are not unpacked into dimensions
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+
+def to_columns(
+    names: Sequence[str],
+    rows: Sequence[tuple],
+    dtypes: Optional[Dict[str, str]] = None,
+) -> Dict[str, Any]:
+    """
+    Transposes rows into columns, which are NumPy arrays of `dtypes` if NumPy is installed, otherwise lists
+    """
+    columns: List[Sequence[Any]] = list(zip(*rows)) if rows else [() for _ in names]
+    if np is None:
+        return {name: list(column) for name, column in zip(names, columns)}
+    dtypes = dtypes or {}
+    return {name: to_array(column, dtypes.get(name)) for name, column in zip(names, columns)}
+
+
+def to_arrow_table(columns: Dict[str, Any]) -> Any:
+    if pa is None:
+        raise ImportError("Package `pyarrow` is not installed")
+    # NaN and NaT are NULL
+    return pa.table({name: pa.array(column, from_pandas=True) for name, column in columns.items()})
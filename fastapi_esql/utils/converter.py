@@ -1,12 +1,131 @@
+from collections import namedtuple
+from functools import lru_cache
 from logging import getLogger
-from typing import Dict, Callable
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
 
 logger = getLogger(__name__)
 
 
-def convert_dicts(dicts, converters: Dict[str, Callable]):
+def memoize(converter: Callable, maxsize: int = 256) -> Callable:
+    """
+    Caches results of a converter of fields with few distinct values, like enums and bools.
+    Results should be immutable, and values beyond `maxsize` are converted without caching.
+    """
+    cache = {}
+
+    def memoized(value):
+        try:
+            return cache[value]
+        except KeyError:
+            result = converter(value)
+            if len(cache) < maxsize:
+                cache[value] = result
+            return result
+        except TypeError:
+            # Unhashable
+            return converter(value)
+
+    memoized.__name__ = getattr(converter, "__name__", "memoized")
+    return memoized
+
+
+class RowConverter:
+    """
+    Converters of fields compiled into one function converting a row in place.
+    Rows which fail it are converted field by field like `convert_dicts`, with warnings.
+    """
+    def __init__(self, converters: Dict[str, Callable]):
+        self.converters = converters
+        self._convert_row = self.compile(converters)
+        self._tuple_converters: Dict[Tuple[str, ...], Optional[Callable[[tuple], tuple]]] = {}
+
+    def __bool__(self):
+        return bool(self.converters)
+
+    @staticmethod
+    def compile(converters: Dict[str, Callable]) -> Callable[[Dict[str, Any]], None]:
+        fields = list(converters)
+        namespace = {f"c{idx}": converters[f] for idx, f in enumerate(fields)}
+        # NOTE All values are converted before assignment, so a failed row is left untouched
+        lines = ["def convert_row(d):"]
+        lines += [f"    v{idx} = c{idx}(d[{f!r}])" for idx, f in enumerate(fields)]
+        lines += [f"    d[{f!r}] = v{idx}" for idx, f in enumerate(fields)] or ["    pass"]
+        exec("\n".join(lines), namespace)
+        return namespace["convert_row"]
+
+    def __call__(self, dicts: List[Dict[str, Any]]):
+        if not dicts or not self.converters:
+            return
+        # NOTE Rows of a result share the same fields
+        missing = [f for f in self.converters if f not in dicts[0]]
+        if missing:
+            logger.warning(f"Items `{missing}` do not exist in dict `{dicts[0]}`")
+            convert_dicts(dicts, {f: c for f, c in self.converters.items() if f not in missing})
+            return
+        convert_row = self._convert_row
+        for d in dicts:
+            try:
+                convert_row(d)
+            except Exception:
+                convert_dicts([d], self.converters)
+
+    def tuple_converter(self, names: Tuple[str, ...]) -> Optional[Callable[[tuple], tuple]]:
+        """
+        Compiles converters by positions of fields in rows of `names`, or returns `None` if nothing to convert
+        """
+        try:
+            return self._tuple_converters[names]
+        except KeyError:
+            pass
+        positions = {idx: self.converters[n] for idx, n in enumerate(names) if n in self.converters}
+        convert_tuple = None
+        if positions:
+            namespace = {f"c{idx}": c for idx, c in positions.items()}
+            items = "".join(f"c{idx}(r[{idx}]), " if idx in positions else f"r[{idx}], " for idx in range(len(names)))
+            exec(f"def convert_tuple(r):\n    return ({items})", namespace)
+            convert_tuple = namespace["convert_tuple"]
+        self._tuple_converters[names] = convert_tuple
+        return convert_tuple
+
+    def convert_tuples(self, names: Sequence[str], rows: Sequence[tuple]) -> List[tuple]:
+        """
+        Returns new rows, since tuples are immutable
+        """
+        missing = [f for f in self.converters if f not in names]
+        if missing:
+            logger.warning(f"Items `{missing}` do not exist in fields `{names}`")
+        convert_tuple = self.tuple_converter(tuple(names))
+        if convert_tuple is None:
+            return list(rows)
+        try:
+            return [convert_tuple(r) for r in rows]
+        except Exception:
+            pass
+
+        positions = [(idx, self.converters[n]) for idx, n in enumerate(names) if n in self.converters]
+        result = []
+        for r in rows:
+            try:
+                result.append(convert_tuple(r))
+                continue
+            except Exception:
+                pass
+            values = list(r)
+            for idx, converter in positions:
+                try:
+                    values[idx] = converter(values[idx])
+                except Exception as e:
+                    logger.warning(f"Converting value `{values[idx]}` by `{converter.__name__}` failed => {e}")
+            result.append(tuple(values))
+        return result
+
+
+def convert_dicts(dicts, converters: Union[Dict[str, Callable], RowConverter]):
     if not converters:
         return
+    if isinstance(converters, RowConverter):
+        converters(dicts)
+        return
     for d in dicts:
         for field, converter in converters.items():
             if field not in d:
@@ -20,6 +139,27 @@ def convert_dicts(dicts, converters: Dict[str, Callable]):
                 logger.warning(f"Converting value `{value}` by `{converter.__name__}` failed => {e}")
 
 
+def convert_tuples(
+    names: Sequence[str],
+    rows: Sequence[tuple],
+    converters: Union[Dict[str, Callable], RowConverter, None],
+) -> List[tuple]:
+    """
+    Converts rows of a cursor by positions of fields in `names`
+    """
+    if not converters:
+        return list(rows)
+    if not isinstance(converters, RowConverter):
+        converters = RowConverter(converters)
+    return converters.convert_tuples(names, rows)
+
+
+@lru_cache(maxsize=256)
+def namedtuple_of(names: Tuple[str, ...]) -> type:
+    # Invalid identifiers like `COUNT(1)` are renamed to positional names like `_0`
+    return namedtuple("Row", names, rename=True)
+
+
 def wrap_backticks(identifier: str):
     assert isinstance(identifier, str), f"identifier({identifier}) must be instance of `str`"
     return f"`{str(identifier).strip('`')}`"
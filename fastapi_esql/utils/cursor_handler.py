@@ -1,12 +1,111 @@
+from asyncio import Semaphore, ensure_future, gather
 from logging import Logger
-from typing import Any, Dict, List, Optional, Callable
+from time import perf_counter
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Callable, Sequence, Tuple, Union
 
 from tortoise import BaseDBAsyncClient
 
-from .converter import convert_dicts
+from ..const.error import WrongParamsError
+from .columnar import to_columns
+from .converter import RowConverter, convert_dicts, convert_tuples, namedtuple_of
+from .metrics import record_pool_wait, record_query
+from .slow_query import SlowQueryLog
+
+try:
+    from aiomysql import SSDictCursor
+except ImportError:
+    SSDictCursor = None
+
+try:
+    from tortoise.backends.mysql.client import translate_exceptions
+except ImportError:
+    def translate_exceptions(func):
+        return func
+
+
+class ChunkedRowCnt:
+    """
+    Aggregated result of statements executed chunk by chunk,
+    `row_cnts` and `timings`(ms) are recorded per chunk, and `None` stands for a failed chunk.
+    """
+    def __init__(self):
+        self.row_cnt = 0
+        self.row_cnts: List[Optional[int]] = []
+        self.timings: List[float] = []
+
+    def __repr__(self):
+        return f"ChunkedRowCnt(row_cnt={self.row_cnt}, chunks={len(self.row_cnts)}, failed={self.failed})"
+
+    @property
+    def failed(self) -> int:
+        return self.row_cnts.count(None)
+
+    def record(self, idx: int, row_cnt: Optional[int], cost: float):
+        while len(self.row_cnts) <= idx:
+            self.row_cnts.append(None)
+            self.timings.append(0.0)
+        self.row_cnts[idx] = row_cnt
+        self.timings[idx] = 1000 * cost
+        self.row_cnt += row_cnt or 0
 
 
 class CursorHandler:
+    """
+    Executes SQL and swallows exceptions after logging them.
+    `args` are bound by the driver to the `%s` placeholders of parameterized SQL.
+    """
+
+    # Records statements slower than its threshold if set
+    slow_query_log: Optional[SlowQueryLog] = None
+
+    @classmethod
+    def observe(
+        cls,
+        sql: str,
+        conn: BaseDBAsyncClient,
+        st: float,
+        args: Optional[List[Any]] = None,
+        *,
+        rows: Optional[int] = None,
+        affected: Optional[int] = None,
+        failed: bool = False,
+    ):
+        """
+        Records metrics of a statement started at `st` of `perf_counter`, and checks if it is slow
+        """
+        record_query(sql, conn, st, rows=rows, affected=affected, failed=failed)
+        if cls.slow_query_log is not None and not failed:
+            cls.slow_query_log.check(sql, args, conn, perf_counter() - st, affected if rows is None else rows)
+
+    @classmethod
+    def get_errno(cls, e: BaseException) -> Optional[int]:
+        """
+        Finds the MySQL error number of a driver error, which may be wrapped by tortoise
+        """
+        while e is not None and e.args:
+            if isinstance(e.args[0], int):
+                return e.args[0]
+            e = e.args[0] if isinstance(e.args[0], BaseException) else None
+        return None
+
+    @classmethod
+    async def query_dicts(
+        cls,
+        sql: str,
+        conn: BaseDBAsyncClient,
+        args: Optional[List[Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Returns rows as dicts, and re-raises exceptions after recording them
+        """
+        st = perf_counter()
+        try:
+            dicts = await conn.execute_query_dict(sql, args)
+        except Exception:
+            cls.observe(sql, conn, st, args, failed=True)
+            raise
+        cls.observe(sql, conn, st, args, rows=len(dicts))
+        return dicts
 
     @classmethod
     async def fetch_dicts(
@@ -14,30 +113,202 @@ class CursorHandler:
         sql: str,
         conn: BaseDBAsyncClient,
         logger: Logger,
-        converters: Dict[str, Callable] = None,
+        converters: Union[Dict[str, Callable], RowConverter, None] = None,
+        args: Optional[List[Any]] = None,
     ) -> Optional[List[Dict[str, Any]]]:
         try:
-            dicts = await conn.execute_query_dict(sql)
+            dicts = await cls.query_dicts(sql, conn, args)
             convert_dicts(dicts, converters)
             return dicts
         except Exception as e:
             logger.exception(f"{e} SQL=>{sql}")
             return None
 
+    @classmethod
+    async def stream_dicts(
+        cls,
+        sql: str,
+        conn: BaseDBAsyncClient,
+        logger: Logger,
+        converters: Union[Dict[str, Callable], RowConverter, None] = None,
+        args: Optional[List[Any]] = None,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Yields batches of rows read by an unbuffered server-side cursor, so memory keeps bounded regardless of result size.
+        A connection is held only during the iteration, and the rest of result is drained if the iteration breaks.
+        Unlike other methods, exceptions are re-raised after logging, since a partial result looks the same as a complete one.
+        """
+        if SSDictCursor is None:
+            raise ImportError("Package `aiomysql` is not installed")
+        st = perf_counter()
+        rows = 0
+        failed = False
+        try:
+            async with conn.acquire_connection() as connection:
+                record_pool_wait(conn, st)
+                async with connection.cursor(SSDictCursor) as cursor:
+                    await cursor.execute(sql, args)
+                    while True:
+                        dicts = await cursor.fetchmany(batch_size)
+                        if not dicts:
+                            break
+                        rows += len(dicts)
+                        convert_dicts(dicts, converters)
+                        yield dicts
+        except Exception as e:
+            failed = True
+            logger.exception(f"{e} SQL=>{sql}")
+            raise
+        finally:
+            # Recorded once, even if the iteration breaks
+            cls.observe(sql, conn, st, args, rows=rows, failed=failed)
+
     @classmethod
     async def fetch_one(
         cls,
         sql: str,
         conn: BaseDBAsyncClient,
         logger: Logger,
-        converters: Dict[str, Callable] = None,
+        converters: Union[Dict[str, Callable], RowConverter, None] = None,
+        args: Optional[List[Any]] = None,
     ) -> Optional[Dict[str, Any]]:
+        st = perf_counter()
         try:
-            dicts = await conn.execute_query_dict(sql)
+            dicts = await conn.execute_query_dict(sql, args)
+            cls.observe(sql, conn, st, args, rows=len(dicts))
             convert_dicts(dicts, converters)
             if dicts:
                 return dicts[0]
             return {}
+        except Exception as e:
+            cls.observe(sql, conn, st, args, failed=True)
+            logger.exception(f"{e} SQL=>{sql}")
+            return None
+
+    @classmethod
+    async def query_tuples(
+        cls,
+        sql: str,
+        conn: BaseDBAsyncClient,
+        args: Optional[List[Any]] = None,
+    ) -> Tuple[List[str], Sequence[tuple]]:
+        """
+        Returns names of fields and rows read by a plain cursor, without building a dict per row like `execute_query_dict`
+        """
+        st = perf_counter()
+        try:
+            names, rows = await cls.read_tuples(conn, sql, args, st)
+        except Exception:
+            cls.observe(sql, conn, st, args, failed=True)
+            raise
+        cls.observe(sql, conn, st, args, rows=len(rows))
+        return names, rows
+
+    @staticmethod
+    @translate_exceptions
+    async def read_tuples(
+        conn: BaseDBAsyncClient,
+        sql: str,
+        args: Optional[List[Any]],
+        st: float,
+    ) -> Tuple[List[str], Sequence[tuple]]:
+        # NOTE Driver errors are translated like `execute_query` of tortoise, since the cursor is used directly
+        async with conn.acquire_connection() as connection:
+            record_pool_wait(conn, st)
+            async with connection.cursor() as cursor:
+                await cursor.execute(sql, args)
+                rows = await cursor.fetchall()
+                names = [d[0] for d in cursor.description or ()]
+        return names, rows
+
+    @classmethod
+    async def fetch_tuples(
+        cls,
+        sql: str,
+        conn: BaseDBAsyncClient,
+        logger: Logger,
+        converters: Union[Dict[str, Callable], RowConverter, None] = None,
+        args: Optional[List[Any]] = None,
+    ) -> Optional[List[tuple]]:
+        try:
+            names, rows = await cls.query_tuples(sql, conn, args)
+            return convert_tuples(names, rows, converters)
+        except Exception as e:
+            logger.exception(f"{e} SQL=>{sql}")
+            return None
+
+    @classmethod
+    async def fetch_namedtuples(
+        cls,
+        sql: str,
+        conn: BaseDBAsyncClient,
+        logger: Logger,
+        converters: Union[Dict[str, Callable], RowConverter, None] = None,
+        args: Optional[List[Any]] = None,
+    ) -> Optional[List[tuple]]:
+        try:
+            names, rows = await cls.query_tuples(sql, conn, args)
+            row_class = namedtuple_of(tuple(names))
+            return list(map(row_class._make, convert_tuples(names, rows, converters)))
+        except Exception as e:
+            logger.exception(f"{e} SQL=>{sql}")
+            return None
+
+    @classmethod
+    async def fetch_column(
+        cls,
+        sql: str,
+        conn: BaseDBAsyncClient,
+        logger: Logger,
+        converters: Union[Dict[str, Callable], RowConverter, None] = None,
+        args: Optional[List[Any]] = None,
+    ) -> Optional[List[Any]]:
+        """
+        Returns values of the first field
+        """
+        try:
+            names, rows = await cls.query_tuples(sql, conn, args)
+            return [r[0] for r in convert_tuples(names, rows, converters)]
+        except Exception as e:
+            logger.exception(f"{e} SQL=>{sql}")
+            return None
+
+    @classmethod
+    async def fetch_scalar(
+        cls,
+        sql: str,
+        conn: BaseDBAsyncClient,
+        logger: Logger,
+        converters: Union[Dict[str, Callable], RowConverter, None] = None,
+        args: Optional[List[Any]] = None,
+    ) -> Any:
+        """
+        Returns the first field of the first row, and `None` if no row or failed
+        """
+        try:
+            names, rows = await cls.query_tuples(sql, conn, args)
+            return convert_tuples(names, rows[:1], converters)[0][0] if rows else None
+        except Exception as e:
+            logger.exception(f"{e} SQL=>{sql}")
+            return None
+
+    @classmethod
+    async def fetch_columns(
+        cls,
+        sql: str,
+        conn: BaseDBAsyncClient,
+        logger: Logger,
+        converters: Union[Dict[str, Callable], RowConverter, None] = None,
+        args: Optional[List[Any]] = None,
+        dtypes: Optional[Dict[str, str]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Returns values per field, which are NumPy arrays of `dtypes` if NumPy is installed, see `to_columns`
+        """
+        try:
+            names, rows = await cls.query_tuples(sql, conn, args)
+            return to_columns(names, convert_tuples(names, rows, converters), dtypes)
         except Exception as e:
             logger.exception(f"{e} SQL=>{sql}")
             return None
@@ -48,11 +319,15 @@ class CursorHandler:
         sql: str,
         conn: BaseDBAsyncClient,
         logger: Logger,
+        args: Optional[List[Any]] = None,
     ) -> Optional[int]:
+        st = perf_counter()
         try:
-            row_cnt, _ = await conn.execute_query(sql)
+            row_cnt, _ = await conn.execute_query(sql, args)
+            cls.observe(sql, conn, st, args, affected=row_cnt)
             return row_cnt
         except Exception as e:
+            cls.observe(sql, conn, st, args, failed=True)
             logger.exception(f"{e} SQL=>{sql}")
             return None
 
@@ -63,9 +338,123 @@ class CursorHandler:
         conn: BaseDBAsyncClient,
         logger: Logger,
     ) -> bool:
+        st = perf_counter()
         try:
             await conn.execute_script(sql)
+            cls.observe(sql, conn, st)
             return True
         except Exception as e:
+            cls.observe(sql, conn, st, failed=True)
             logger.exception(f"{e} SQL=>{sql}")
             return False
+
+    @classmethod
+    async def multi_row_cnts(
+        cls,
+        statements: Sequence[Tuple[str, Optional[List[Any]]]],
+        conn: BaseDBAsyncClient,
+        logger: Logger,
+        transaction: bool = False,
+    ) -> Optional[List[Optional[int]]]:
+        """
+        Sends (sql, args) pairs as one multi-statement request in a single round trip, and returns row counts per statement.
+        MySQL stops at the first failed statement, so row counts of it and the following ones are `None`.
+        If `transaction` is True, statements are applied all or nothing, and `None` is returned on failure.
+        """
+        row_cnts: List[Optional[int]] = [None] * len(statements)
+        if not statements:
+            return row_cnts
+        sql = None
+        st = perf_counter()
+
+        async def execute(client: BaseDBAsyncClient):
+            nonlocal sql
+            async with client.acquire_connection() as connection:
+                record_pool_wait(conn, st)
+                async with connection.cursor() as cursor:
+                    # NOTE Args are bound per statement, since literal `%` of statements without args must be kept
+                    sql = ";\n".join(s if a is None else cursor.mogrify(s, a) for s, a in statements)
+                    await cursor.execute(sql)
+                    row_cnts[0] = cursor.rowcount
+                    for idx in range(1, len(statements)):
+                        if not await cursor.nextset():
+                            break
+                        row_cnts[idx] = cursor.rowcount
+
+        try:
+            if transaction:
+                async with conn._in_transaction() as tx_conn:
+                    await execute(tx_conn)
+            else:
+                await execute(conn)
+            cls.observe(sql, conn, st, affected=sum(r or 0 for r in row_cnts))
+            return row_cnts
+        except Exception as e:
+            sql = sql or ";\n".join(s for s, _ in statements)
+            cls.observe(sql, conn, st, failed=True)
+            logger.exception(f"{e} SQL=>{sql}")
+            return None if transaction else row_cnts
+
+    @classmethod
+    async def sum_chunk_row_cnts(
+        cls,
+        statements: Iterable[Tuple[str, Optional[List[Any]]]],
+        conn: BaseDBAsyncClient,
+        logger: Logger,
+        concurrency: int = 1,
+    ) -> Optional[ChunkedRowCnt]:
+        """
+        Executes (sql, args) pairs sequentially inside one transaction if `concurrency` is 1,
+        otherwise concurrently across the pool of `conn` without a transaction.
+        Statements are consumed lazily, so at most `concurrency` chunks are rendered ahead.
+        `WrongParamsError` of rendering a chunk is raised like unchunked writes,
+        after rolling back the transaction, or cancelling chunks in progress if concurrent.
+        """
+        result = ChunkedRowCnt()
+        if concurrency <= 1:
+            sql = None
+            st = perf_counter()
+            try:
+                async with conn._in_transaction() as tx_conn:
+                    for idx, (sql, args) in enumerate(statements):
+                        st = perf_counter()
+                        row_cnt, _ = await tx_conn.execute_query(sql, args)
+                        cls.observe(sql, conn, st, args, affected=row_cnt)
+                        result.record(idx, row_cnt, perf_counter() - st)
+                return result
+            except WrongParamsError:
+                raise
+            except Exception as e:
+                if sql is not None:
+                    cls.observe(sql, conn, st, args, failed=True)
+                logger.exception(f"{e} SQL=>{sql}")
+                return None
+
+        semaphore = Semaphore(concurrency)
+
+        async def execute(idx: int, sql: str, args: Optional[List[Any]]):
+            st = perf_counter()
+            try:
+                row_cnt, _ = await conn.execute_query(sql, args)
+                cls.observe(sql, conn, st, args, affected=row_cnt)
+                result.record(idx, row_cnt, perf_counter() - st)
+            except Exception as e:
+                cls.observe(sql, conn, st, args, failed=True)
+                logger.exception(f"{e} SQL=>{sql}")
+                result.record(idx, None, perf_counter() - st)
+            finally:
+                semaphore.release()
+
+        tasks = []
+        try:
+            for idx, (sql, args) in enumerate(statements):
+                await semaphore.acquire()
+                tasks.append(ensure_future(execute(idx, sql, args)))
+        except BaseException:
+            # NOTE Chunks in progress are awaited, instead of left running after returning
+            for task in tasks:
+                task.cancel()
+            await gather(*tasks, return_exceptions=True)
+            raise
+        await gather(*tasks)
+        return result
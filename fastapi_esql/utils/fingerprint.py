@@ -0,0 +1,21 @@
+import re
+
+SQL_FINGERPRINT_SUBS = [
+    (re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.|\"\")*\""), "?"),
+    (re.compile(r"/\*.*?\*/|--[^\n]*|#[^\n]*", re.S), " "),
+    (re.compile(r"\b0x[0-9a-fA-F]+\b|(?<![\w`])-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?\b|%s"), "?"),
+    (re.compile(r"\s+"), " "),
+    # Lists and rows of values like `IN (?, ?)` and `VALUES (?, ?), (?, ?)`
+    (re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)"), "(?+)"),
+    (re.compile(r"((?:ROW)?\(\?\+\))(?:\s*,\s*(?:ROW)?\(\?\+\))+"), r"\1, ..."),
+]
+
+
+def fingerprint_sql(sql: str) -> str:
+    """
+    Normalizes SQL into its shape, with literals replaced by `?`, and lists of values collapsed,
+    so that statements differing only in values share a fingerprint
+    """
+    for pattern, repl in SQL_FINGERPRINT_SUBS:
+        sql = pattern.sub(repl, sql)
+    return sql.strip()
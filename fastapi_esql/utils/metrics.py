@@ -0,0 +1,215 @@
+from bisect import bisect_left
+from contextvars import ContextVar
+from functools import wraps
+from inspect import isasyncgenfunction
+from time import perf_counter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .metaclass import Singleton
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf"))
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, float("inf"))
+
+# Manager method, table and manager class of queries in the current task
+metric_labels: ContextVar[Optional[Tuple[str, str, type]]] = ContextVar("metric_labels", default=None)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        # The first bucket whose upper bound is not less than the value
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "buckets": dict(zip(self.buckets, self.counts)),
+        }
+
+
+class MetricsRegistry(metaclass=Singleton):
+    """
+    Counters and histograms of manager methods and queries, labeled by method, table and connection,
+    which are exported as a snapshot or in Prometheus text format. Recording stops if `enabled` is False.
+    """
+    def __init__(self):
+        self.enabled = True
+        self._metrics: Dict[str, Tuple[str, str, Optional[Sequence[float]]]] = {}
+        self._series: Dict[str, Dict[Labels, Any]] = {}
+        self.register("esql_method_duration_seconds", "histogram", "Latency of manager methods", LATENCY_BUCKETS)
+        self.register("esql_query_duration_seconds", "histogram", "Latency of queries", LATENCY_BUCKETS)
+        self.register("esql_query_sql_bytes", "histogram", "Size of SQL of queries", BYTES_BUCKETS)
+        self.register("esql_query_errors_total", "counter", "Failed queries")
+        self.register("esql_rows_returned_total", "counter", "Rows returned by queries")
+        self.register("esql_rows_affected_total", "counter", "Rows affected by statements")
+        self.register("esql_pool_wait_seconds", "histogram", "Waiting time for a connection of the pool", LATENCY_BUCKETS)
+
+    def register(self, name: str, kind: str, doc: str, buckets: Optional[Sequence[float]] = None):
+        self._metrics[name] = (kind, doc, buckets)
+        self._series.setdefault(name, {})
+
+    def inc(self, name: str, labels: Labels, value: float = 1):
+        series = self._series[name]
+        series[labels] = series.get(labels, 0) + value
+
+    def observe(self, name: str, labels: Labels, value: float):
+        series = self._series[name]
+        histogram = series.get(labels)
+        if histogram is None:
+            histogram = series[labels] = Histogram(self._metrics[name][2])
+        histogram.observe(value)
+
+    def clear(self):
+        for series in self._series.values():
+            series.clear()
+
+    def snapshot(self) -> Dict[str, List[Dict[str, Any]]]:
+        return {
+            name: [
+                {
+                    "labels": dict(labels),
+                    **(value.info() if isinstance(value, Histogram) else {"value": value}),
+                }
+                for labels, value in series.items()
+            ]
+            for name, series in self._series.items()
+        }
+
+    def to_prometheus(self) -> str:
+        lines = []
+        for name, (kind, doc, _) in self._metrics.items():
+            lines.append(f"# HELP {name} {doc}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in self._series[name].items():
+                if not isinstance(value, Histogram):
+                    lines.append(f"{name}{format_labels(labels)} {value}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(value.buckets, value.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{name}_bucket{format_labels(labels + (('le', le),))} {cumulative}")
+                lines.append(f"{name}_sum{format_labels(labels)} {value.sum}")
+                lines.append(f"{name}_count{format_labels(labels)} {value.count}")
+        return "\n".join(lines) + "\n"
+
+
+def format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in labels
+    )
+    return f"{{{pairs}}}"
+
+
+def query_labels(conn: Any) -> Labels:
+    method, table, _ = metric_labels.get() or ("", "", None)
+    return (("method", method), ("table", table), ("conn", getattr(conn, "connection_name", None) or ""))
+
+
+def record_query(
+    sql: str,
+    conn: Any,
+    st: float,
+    *,
+    rows: Optional[int] = None,
+    affected: Optional[int] = None,
+    failed: bool = False,
+):
+    """
+    Records a query started at `st` of `perf_counter`
+    """
+    registry = MetricsRegistry()
+    if not registry.enabled:
+        return
+    labels = query_labels(conn)
+    registry.observe("esql_query_duration_seconds", labels, perf_counter() - st)
+    # NOTE Characters are counted, which equal bytes of ASCII SQL, without encoding large statements again
+    registry.observe("esql_query_sql_bytes", labels, len(sql))
+    if failed:
+        registry.inc("esql_query_errors_total", labels)
+    if rows is not None:
+        registry.inc("esql_rows_returned_total", labels, rows)
+    if affected is not None:
+        registry.inc("esql_rows_affected_total", labels, affected)
+
+
+def record_pool_wait(conn: Any, st: float):
+    registry = MetricsRegistry()
+    if registry.enabled:
+        name = getattr(conn, "connection_name", None) or ""
+        registry.observe("esql_pool_wait_seconds", (("conn", name),), perf_counter() - st)
+
+
+def measure(func):
+    """
+    Labels queries of a manager method by its name and table, and records its latency.
+    Calls nested in another method of the same table are attributed to the outer one.
+    """
+    if isasyncgenfunction(func):
+        @wraps(func)
+        async def gen_wrapper(cls, *args, **kwargs):
+            labels = (func.__name__, cls.table, cls)
+            agen = func(cls, *args, **kwargs)
+            try:
+                while True:
+                    # NOTE Labels are set around every step, since an async generator shares the context of its consumer
+                    token = metric_labels.set(labels)
+                    try:
+                        item = await agen.__anext__()
+                    except StopAsyncIteration:
+                        return
+                    finally:
+                        metric_labels.reset(token)
+                    yield item
+            finally:
+                await agen.aclose()
+
+        return gen_wrapper
+
+    @wraps(func)
+    async def wrapper(cls, *args, **kwargs):
+        current = metric_labels.get()
+        if current is not None and current[1] == cls.table:
+            return await func(cls, *args, **kwargs)
+
+        labels = (func.__name__, cls.table, cls)
+        token = metric_labels.set(labels)
+        st = perf_counter()
+        try:
+            return await func(cls, *args, **kwargs)
+        finally:
+            metric_labels.reset(token)
+            registry = MetricsRegistry()
+            if registry.enabled:
+                registry.observe(
+                    "esql_method_duration_seconds", (("method", labels[0]), ("table", labels[1])), perf_counter() - st,
+                )
+
+    return wrapper
+
+
+def add_metrics_route(app: Any, path: str = "/metrics"):
+    """
+    Adds a route exporting metrics in Prometheus text format to a FastAPI app or router
+    """
+    from fastapi.responses import PlainTextResponse
+
+    @app.get(path, response_class=PlainTextResponse, include_in_schema=False)
+    async def metrics_view():
+        return MetricsRegistry().to_prometheus()
+
+    return metrics_view
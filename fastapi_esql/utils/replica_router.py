@@ -0,0 +1,263 @@
+from asyncio import CancelledError, TimeoutError, get_running_loop, sleep
+from itertools import count
+from logging import getLogger
+from time import monotonic, perf_counter
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from tortoise import BaseDBAsyncClient
+from tortoise.exceptions import DBConnectionError
+
+from ..const.error import WrongParamsError
+from .cursor_handler import CursorHandler
+
+logger = getLogger(__name__)
+
+BALANCERS = ("round_robin", "least_outstanding", "ewma")
+CONNECTION_ERRORS = (DBConnectionError, OSError, TimeoutError)
+# ER_CON_COUNT_ERROR and ER_SERVER_SHUTDOWN, besides client errors like CR_SERVER_GONE_ERROR and CR_SERVER_LOST
+CONNECTION_ERRNOS = {1040, 1053}
+
+
+def is_connection_error(e: BaseException) -> bool:
+    """
+    Tells errors of the replica itself from errors of queries, like syntax, integrity or privilege errors
+    """
+    if isinstance(e, CONNECTION_ERRORS):
+        return True
+    errno = CursorHandler.get_errno(e)
+    return errno is not None and (errno in CONNECTION_ERRNOS or 2000 <= errno < 3000)
+
+
+class Replica:
+    """
+    State of a read connection, like outstanding requests, EWMA latency(ms), failures and replication lag(s)
+    """
+    def __init__(self, conn: BaseDBAsyncClient, name: str):
+        self.conn = conn
+        self.name = name
+        self.outstanding = 0
+        self.ewma = 0.0
+        self.picks = 0
+        self.failures = 0
+        self.ejected_until = 0.0
+        self.probed = False
+        self.lag: Optional[float] = None
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "picks": self.picks,
+            "outstanding": self.outstanding,
+            "ewma_ms": round(self.ewma, 3),
+            "failures": self.failures,
+            "ejected": self.ejected_until > monotonic(),
+            "lag": self.lag,
+        }
+
+
+class RoutedConnection:
+    """
+    Proxy of a replica connection, which reports latency and failures of its queries back to the router
+    """
+    def __init__(self, replica: Replica, router: "ReplicaRouter"):
+        self._replica = replica
+        self._router = router
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._replica.conn, name)
+
+    async def execute_query(self, query: str, values: Optional[list] = None):
+        return await self._router.track(self._replica, self._replica.conn.execute_query(query, values))
+
+    async def execute_query_dict(self, query: str, values: Optional[list] = None):
+        return await self._router.track(self._replica, self._replica.conn.execute_query_dict(query, values))
+
+    def acquire_connection(self) -> "TrackedAcquire":
+        return TrackedAcquire(self._replica, self._router)
+
+
+class TrackedAcquire:
+    """
+    Acquires a raw connection of a replica, like for cursors of `CursorHandler`, tracked as one query while it is held
+    """
+    def __init__(self, replica: Replica, router: "ReplicaRouter"):
+        self._replica = replica
+        self._router = router
+        self._context = None
+        self._st = 0.0
+
+    async def __aenter__(self):
+        self._context = self._replica.conn.acquire_connection()
+        self._st = self._router.begin(self._replica)
+        try:
+            return await self._context.__aenter__()
+        except BaseException as e:
+            self._router.end(self._replica, self._st, e)
+            raise
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        try:
+            return await self._context.__aexit__(exc_type, exc_val, exc_tb)
+        finally:
+            self._router.end(self._replica, self._st, exc_val)
+
+
+class ReplicaRouter:
+    """
+    Routes reads among replicas returned by `get_conns` with a balancer, which is one of
+    `round_robin`, `least_outstanding` and `ewma` (latency weighted by outstanding requests).
+    A replica is ejected for `eject_seconds` after `max_failures` consecutive failures,
+    and skipped while its replication lag probed every `probe_interval` seconds exceeds `max_lag` if given.
+    The fallback, like `rw_conn`, is used if no replica is available.
+    """
+    def __init__(
+        self,
+        get_conns: Callable[[], List[BaseDBAsyncClient]],
+        balancer: str = "round_robin",
+        *,
+        max_failures: int = 3,
+        eject_seconds: float = 30.0,
+        ewma_alpha: float = 0.3,
+        max_lag: Optional[float] = None,
+        probe_interval: float = 5.0,
+    ):
+        if balancer not in BALANCERS:
+            raise WrongParamsError(f"Parameter `balancer` should be one of {BALANCERS}")
+        self.get_conns = get_conns
+        self.balancer = balancer
+        self.max_failures = max_failures
+        self.eject_seconds = eject_seconds
+        self.ewma_alpha = ewma_alpha
+        self.max_lag = max_lag
+        self.probe_interval = probe_interval
+        self.fallbacks = 0
+        self._replicas: Optional[List[Replica]] = None
+        self._counter = count()
+        self._probing = None
+
+    @property
+    def replicas(self) -> List[Replica]:
+        # NOTE Connections are only available after `Tortoise.init`
+        if self._replicas is None:
+            self._replicas = [
+                Replica(conn, getattr(conn, "connection_name", None) or str(idx))
+                for idx, conn in enumerate(self.get_conns())
+            ]
+        return self._replicas
+
+    def is_available(self, replica: Replica, now: float) -> bool:
+        if replica.ejected_until > now:
+            return False
+        # NOTE Replicas are trusted until probed
+        if self.max_lag is not None and replica.probed and (replica.lag is None or replica.lag > self.max_lag):
+            return False
+        return True
+
+    def pick(self, fallback: Callable[[], BaseDBAsyncClient]) -> BaseDBAsyncClient:
+        if self.max_lag is not None and self._probing is None:
+            try:
+                self._probing = get_running_loop().create_task(self.probe_forever())
+            except RuntimeError:
+                # Probing starts with the first pick in an event loop
+                pass
+
+        now = monotonic()
+        replicas = [r for r in self.replicas if self.is_available(r, now)]
+        if not replicas:
+            self.fallbacks += 1
+            return fallback()
+
+        if self.balancer == "round_robin":
+            replica = replicas[next(self._counter) % len(replicas)]
+        else:
+            # Rotating the start breaks ties evenly
+            offset = next(self._counter) % len(replicas)
+            replicas = replicas[offset:] + replicas[:offset]
+            if self.balancer == "least_outstanding":
+                replica = min(replicas, key=lambda r: r.outstanding)
+            else:
+                replica = min(replicas, key=lambda r: r.ewma * (r.outstanding + 1))
+        replica.picks += 1
+        return RoutedConnection(replica, self)
+
+    async def track(self, replica: Replica, query: Awaitable[Any]) -> Any:
+        st = self.begin(replica)
+        try:
+            result = await query
+        except BaseException as e:
+            self.end(replica, st, e)
+            raise
+        self.end(replica, st)
+        return result
+
+    def begin(self, replica: Replica) -> float:
+        replica.outstanding += 1
+        return perf_counter()
+
+    def end(self, replica: Replica, st: float, error: Optional[BaseException] = None):
+        """
+        Records a query started at `st`, and only connection errors count as failures of the replica
+        """
+        replica.outstanding -= 1
+        if error is None:
+            cost = 1000 * (perf_counter() - st)
+            replica.ewma = cost if not replica.ewma else self.ewma_alpha * cost + (1 - self.ewma_alpha) * replica.ewma
+            replica.failures = 0
+        elif not isinstance(error, CancelledError) and is_connection_error(error):
+            self.record_failure(replica)
+
+    def record_failure(self, replica: Replica):
+        replica.failures += 1
+        if replica.failures >= self.max_failures:
+            logger.warning(f"Replica `{replica.name}` is ejected for {self.eject_seconds}s after {replica.failures} failures")
+            replica.ejected_until = monotonic() + self.eject_seconds
+            replica.failures = 0
+
+    async def probe_lag(self, replica: Replica):
+        try:
+            try:
+                rows = await replica.conn.execute_query_dict("SHOW REPLICA STATUS")
+            except Exception as e:
+                if is_connection_error(e):
+                    raise
+                # NOTE `SHOW REPLICA STATUS` is supported since MySQL 8.0.22
+                rows = await replica.conn.execute_query_dict("SHOW SLAVE STATUS")
+        except Exception as e:
+            if is_connection_error(e):
+                logger.warning(f"Probing lag of replica `{replica.name}` failed => {e}")
+                replica.probed = True
+                replica.lag = None
+                self.record_failure(replica)
+            else:
+                # NOTE Lag is unknown without privilege like `REPLICATION CLIENT`, so the replica is trusted like before probing
+                if replica.probed or replica.lag is None:
+                    logger.warning(f"Lag of replica `{replica.name}` is unknown => {e}")
+                replica.probed = False
+            return
+        replica.probed = True
+        if not rows:
+            # Not a replica at all
+            replica.lag = 0.0
+            return
+        row = rows[0]
+        lag = row.get("Seconds_Behind_Source", row.get("Seconds_Behind_Master"))
+        # NOTE Lag is NULL if replication is stopped
+        replica.lag = None if lag is None else float(lag)
+
+    async def probe_forever(self):
+        while True:
+            for replica in self.replicas:
+                await self.probe_lag(replica)
+            await sleep(self.probe_interval)
+
+    def close(self):
+        if self._probing is not None:
+            self._probing.cancel()
+            self._probing = None
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "balancer": self.balancer,
+            "fallbacks": self.fallbacks,
+            "replicas": [r.info() for r in self.replicas],
+        }
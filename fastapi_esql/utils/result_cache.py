@@ -0,0 +1,88 @@
+from collections import OrderedDict
+from copy import copy
+from time import monotonic
+from typing import Any, Dict, Hashable, Optional
+
+
+def copy_result(result: Any) -> Any:
+    """
+    Copies rows, values or model of a result, so that callers can't mutate each other's rows.
+    Nested values like JSON objects are still shared.
+    """
+    if isinstance(result, list):
+        # Tuples and scalars are immutable
+        return [dict(d) for d in result] if result and isinstance(result[0], dict) else list(result)
+    if isinstance(result, dict):
+        return dict(result)
+    return copy(result)
+
+
+class ResultCache:
+    """
+    Results of selects keyed by rendered SQL, args and converted fields, evicted by TTL and LRU.
+    Every table has a version as invalidation tag, which is shared by all caches,
+    and results filled before the version of their table was bumped are stale.
+    """
+
+    versions: Dict[str, int] = {}
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.stales = 0
+        self._data = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    @classmethod
+    def bump(cls, table: str):
+        cls.versions[table] = cls.versions.get(table, 0) + 1
+
+    @classmethod
+    def version(cls, table: str) -> int:
+        return cls.versions.get(table, 0)
+
+    def get(self, key: Hashable, table: str) -> Optional[Any]:
+        try:
+            expire_at, version, result = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return None
+        if expire_at < monotonic() or version != self.version(table):
+            del self._data[key]
+            self.stales += 1
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return copy_result(result)
+
+    def put(self, key: Hashable, version: int, result: Any):
+        """
+        `version` of the table should be taken before querying, in case of writes during the query
+        """
+        self._data[key] = (monotonic() + self.ttl, version, copy_result(result))
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+        self.hits = 0
+        self.misses = 0
+        self.stales = 0
+
+    def info(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stales": self.stales,
+            "hit_ratio": self.hits / total if total else 0.0,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+        }
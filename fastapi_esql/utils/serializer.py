@@ -0,0 +1,225 @@
+import os
+from datetime import date, datetime, time
+from decimal import Decimal
+from enum import Enum
+from json import JSONEncoder
+from re import compile
+from tempfile import NamedTemporaryFile
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+from uuid import UUID
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Same escaping as MySQL string literals, but leaves `"` alone to keep JSON readable
+search_escaped = compile(r"[\\'\0\n\r\x1a]").search
+ESCAPE_TABLE = str.maketrans({
+    "\\": "\\\\",
+    "'": "\\'",
+    "\0": "\\0",
+    "\n": "\\n",
+    "\r": "\\r",
+    "\x1a": "\\Z",
+})
+
+# Escaping of `LOAD DATA` with `FIELDS ESCAPED BY '\\'`, where `\N` stands for NULL
+search_tsv_escaped = compile(r"[\\\t\n\r\0]").search
+TSV_ESCAPE_TABLE = str.maketrans({
+    "\\": "\\\\",
+    "\t": "\\t",
+    "\n": "\\n",
+    "\r": "\\r",
+    "\0": "\\0",
+})
+sub_tsv_unescaped = compile(r"\\(.)").sub
+TSV_UNESCAPES = {"t": "\t", "n": "\n", "r": "\r", "0": "\0"}
+TSV_NULL = "\\N"
+# Undecodable bytes as escaped by `surrogateescape`
+search_surrogate = compile("[\udc80-\udcff]").search
+
+NON_FINITE_FLOATS = frozenset(["nan", "inf", "-inf"])
+
+# Stands in for `%s` while rendering, so that literal `%` of the statement can be escaped afterwards
+PLACEHOLDER = "\x00?\x00"
+
+# NOTE `json.dumps` with any keyword argument creates a new encoder on every call
+default_json_dumps: Callable[[Any], str] = JSONEncoder(ensure_ascii=False).encode
+json_dumps = default_json_dumps
+
+
+def set_json_dumps(func: Callable[[Any], str] = None):
+    """
+    Replaces the JSON backend for dict/list/tuple values, like `set_json_dumps(orjson_dumps)`.
+    The default `json.dumps` is restored if `func` is None.
+    """
+    global json_dumps
+    json_dumps = func or default_json_dumps
+
+
+def orjson_dumps(value: Any) -> str:
+    if orjson is None:
+        raise ImportError("Package `orjson` is not installed")
+    return orjson.dumps(value).decode()
+
+
+def quote_str(value: str) -> str:
+    if search_escaped(value) is None:
+        return f"'{value}'"
+    return f"'{value.translate(ESCAPE_TABLE)}'"
+
+
+def encode_float(value: float) -> str:
+    # NOTE Subclasses like `numpy.float64` are rendered as plain floats, instead of their own repr like `np.float64(2.5)`
+    sqlized = float.__repr__(value)
+    # MySQL has no literal for NaN or infinity
+    return "NULL" if sqlized in NON_FINITE_FLOATS else sqlized
+
+
+def encode_decimal(value: Decimal) -> str:
+    return str(value) if value.is_finite() else "NULL"
+
+
+def encode_enum(value: Enum) -> str:
+    return sqlize(value._value_)
+
+
+def encode_json(value: Any) -> str:
+    return quote_str(json_dumps(value))
+
+
+ENCODERS: Dict[type, Callable[[Any], str]] = {
+    type(None): lambda _: "NULL",
+    bool: str,
+    int: str,
+    float: encode_float,
+    Decimal: encode_decimal,
+    str: quote_str,
+    bytes: lambda v: f"X'{v.hex()}'",
+    bytearray: lambda v: f"X'{v.hex()}'",
+    datetime: lambda v: f"'{v.isoformat(' ')}'",
+    date: lambda v: f"'{v.isoformat()}'",
+    time: lambda v: f"'{v.isoformat()}'",
+    UUID: lambda v: f"'{v}'",
+    dict: encode_json,
+    list: encode_json,
+    tuple: encode_json,
+}
+
+
+# Types whose encoders are looked up along MRO and cached in `ENCODERS`
+RESOLVED_TYPES = set()
+
+
+def register_encoder(type_: type, encoder: Callable[[Any], str]):
+    """
+    Registers how values of `type_` and its subclasses are rendered as SQL literals
+    """
+    for t in RESOLVED_TYPES:
+        ENCODERS.pop(t, None)
+    RESOLVED_TYPES.clear()
+    ENCODERS[type_] = encoder
+
+
+def resolve_encoder(type_: type) -> Callable[[Any], str]:
+    # NOTE Mixed enums like IntEnum have `int` before `Enum` in MRO
+    if issubclass(type_, Enum):
+        if issubclass(type_, int):
+            encoder = int.__repr__
+        elif issubclass(type_, str):
+            encoder = lambda v: quote_str(v._value_)
+        else:
+            encoder = encode_enum
+    else:
+        encoder = next(
+            (ENCODERS[t] for t in type_.__mro__ if t in ENCODERS),
+            lambda v: quote_str(str(v)),
+        )
+    ENCODERS[type_] = encoder
+    RESOLVED_TYPES.add(type_)
+    return encoder
+
+
+def sqlize(value: Any) -> str:
+    """
+    Renders a value as SQL literal by an encoder looked up with its type
+    """
+    try:
+        encoder = ENCODERS[value.__class__]
+    except KeyError:
+        encoder = resolve_encoder(value.__class__)
+    return encoder(value)
+
+
+def to_param(value: Any) -> Any:
+    """
+    Adapts a value for the driver's parameter binding
+    """
+    if isinstance(value, Enum):
+        value = value.value
+    if isinstance(value, (dict, list, tuple)):
+        return json_dumps(value)
+    if isinstance(value, float) and float.__repr__(value) in NON_FINITE_FLOATS:
+        return None
+    if isinstance(value, Decimal) and not value.is_finite():
+        return None
+    return value
+
+
+def to_tsv_field(value: Any) -> str:
+    """
+    Renders a value as a field of `LOAD DATA` file, bytes are kept by `surrogateescape` of the file
+    """
+    value = to_param(value)
+    if value is None:
+        return TSV_NULL
+    if value is True or value is False:
+        return "1" if value else "0"
+    if isinstance(value, datetime):
+        value = value.isoformat(" ")
+    elif isinstance(value, (bytes, bytearray)):
+        value = bytes(value).decode("utf-8", "surrogateescape")
+    else:
+        value = str(value)
+    if search_tsv_escaped(value) is None:
+        return value
+    return value.translate(TSV_ESCAPE_TABLE)
+
+
+def to_tsv_line(values: Iterable[Any]) -> str:
+    return "\t".join(map(to_tsv_field, values)) + "\n"
+
+
+def parse_tsv_field(field: str) -> Union[str, bytes, None]:
+    if field == TSV_NULL:
+        return None
+    value = sub_tsv_unescaped(lambda m: TSV_UNESCAPES.get(m[1], m[1]), field)
+    # Bytes, which are not valid UTF-8, have been kept as surrogates by `surrogateescape` of the file
+    if search_surrogate(value) is not None:
+        return value.encode("utf-8", "surrogateescape")
+    return value
+
+
+def parse_tsv_line(line: str) -> List[Union[str, bytes, None]]:
+    """
+    Reverses `to_tsv_line`, but all values except NULL and bytes are left as strings
+    """
+    return [parse_tsv_field(field) for field in line.rstrip("\n").split("\t")]
+
+
+def write_tsv(rows: Iterable[Iterable[Any]], tmp_dir: Optional[str] = None) -> str:
+    """
+    Writes rows into a TSV temp file for `LOAD DATA`, and returns its path
+    """
+    with NamedTemporaryFile(
+        "w", suffix=".tsv", dir=tmp_dir, delete=False,
+        encoding="utf-8", errors="surrogateescape", newline="\n",
+    ) as f:
+        try:
+            f.writelines(map(to_tsv_line, rows))
+        except BaseException:
+            f.close()
+            os.remove(f.name)
+            raise
+    return f.name
@@ -0,0 +1,45 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import monotonic
+from typing import Dict, Iterator, Optional, Tuple
+
+# Deadline and GTID set of the last write per table, shared by tasks created within a session
+written_tables: ContextVar[Optional[Dict[str, Tuple[float, Optional[str]]]]] = ContextVar("written_tables", default=None)
+
+
+@contextmanager
+def read_your_writes_session() -> Iterator[None]:
+    """
+    Starts a session like a request, so that writes of any task within it route reads of written tables to primary.
+    Without a session, writes only affect the current task and tasks created after them.
+    """
+    token = written_tables.set({})
+    try:
+        yield
+    finally:
+        written_tables.reset(token)
+
+
+def mark_written(table: str, window: float, gtid: Optional[str] = None):
+    marks = written_tables.get()
+    if marks is None:
+        marks = {}
+        written_tables.set(marks)
+    marks[table] = (monotonic() + window, gtid)
+
+
+def get_write_mark(table: str) -> Optional[Tuple[float, Optional[str]]]:
+    marks = written_tables.get()
+    if not marks or table not in marks:
+        return None
+    mark = marks[table]
+    if mark[0] < monotonic():
+        marks.pop(table, None)
+        return None
+    return mark
+
+
+def clear_write_mark(table: str):
+    marks = written_tables.get()
+    if marks:
+        marks.pop(table, None)
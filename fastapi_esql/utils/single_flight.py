@@ -0,0 +1,37 @@
+from asyncio import Future, ensure_future, shield
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from .result_cache import copy_result
+
+
+class SingleFlight:
+    """
+    Coalesces identical calls in flight, so that later callers await the call of the first one instead of issuing their own.
+    Every caller gets its own copy of the result, and `saved` counts calls avoided.
+    """
+    def __init__(self):
+        self.calls = 0
+        self.saved = 0
+        self._futures: Dict[Hashable, Future] = {}
+
+    def __len__(self):
+        return len(self._futures)
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._futures.get(key)
+        if future is None:
+            self.calls += 1
+            # NOTE The call runs as a task, so cancelling any caller doesn't cancel it for others
+            future = ensure_future(func())
+            self._futures[key] = future
+            future.add_done_callback(lambda _: self._futures.pop(key, None))
+        else:
+            self.saved += 1
+        return copy_result(await shield(future))
+
+    def info(self) -> Dict[str, int]:
+        return {
+            "calls": self.calls,
+            "saved": self.saved,
+            "in_flight": len(self._futures),
+        }
@@ -0,0 +1,171 @@
+from asyncio import ensure_future
+from collections import deque
+from json import loads
+from logging import getLogger
+from time import monotonic, time
+from typing import Any, Deque, Dict, List, Optional
+
+from tortoise import BaseDBAsyncClient
+
+from .fingerprint import fingerprint_sql
+from .metrics import metric_labels
+
+logger = getLogger(__name__)
+
+EXPLAINABLE_PREFIXES = ("SELECT", "WITH")
+
+
+class SlowQueryLog:
+    """
+    Bounded ring of the latest `maxlen` statements slower than `threshold` seconds,
+    with fingerprint, duration, rows and manager method of each one.
+    `EXPLAIN FORMAT=JSON` of slow selects is captured in background on `ro_conn` of their manager,
+    one at a time and at most once per fingerprint every `explain_interval` seconds, unless `explain` is False.
+    """
+    def __init__(
+        self,
+        threshold: float = 1.0,
+        maxlen: int = 100,
+        *,
+        explain: bool = True,
+        explain_interval: float = 60.0,
+        max_sql_chars: int = 4096,
+    ):
+        self.threshold = threshold
+        self.explain = explain
+        self.explain_interval = explain_interval
+        self.max_sql_chars = max_sql_chars
+        self.total = 0
+        self.explained = 0
+        self._entries: Deque[Dict[str, Any]] = deque(maxlen=maxlen)
+        self._explained_at: Dict[str, float] = {}
+        self._explaining = False
+
+    def __len__(self):
+        return len(self._entries)
+
+    def check(
+        self,
+        sql: str,
+        args: Optional[List[Any]],
+        conn: BaseDBAsyncClient,
+        cost: float,
+        rows: Optional[int] = None,
+    ):
+        if cost < self.threshold:
+            return
+        self.total += 1
+        method, table, manager = metric_labels.get() or ("", "", None)
+        # NOTE Bulk statements can be megabytes, whose beginning is enough to tell their shape
+        truncated = sql[:self.max_sql_chars]
+        entry = {
+            "fingerprint": fingerprint_sql(truncated),
+            "sql": truncated,
+            "duration_ms": round(1000 * cost, 3),
+            "rows": rows,
+            "manager": manager.__name__ if manager else "",
+            "method": method,
+            "table": table,
+            "conn": getattr(conn, "connection_name", None) or "",
+            "at": time(),
+            "explain": None,
+        }
+        self._entries.append(entry)
+        logger.warning(f"Slow query of {entry['duration_ms']}ms by {entry['manager']}.{method} SQL=>{truncated}")
+
+        if self.should_explain(sql, entry["fingerprint"]):
+            explain_conn = manager.ro_conn if manager else conn
+            ensure_future(self.capture_explain(entry, sql, args, explain_conn))
+
+    def should_explain(self, sql: str, fingerprint: str) -> bool:
+        if not self.explain or self._explaining:
+            return False
+        if not sql.lstrip().upper().startswith(EXPLAINABLE_PREFIXES):
+            return False
+        now = monotonic()
+        if now - self._explained_at.get(fingerprint, float("-inf")) < self.explain_interval:
+            return False
+        if len(self._explained_at) >= 1024:
+            self._explained_at = {
+                k: v for k, v in self._explained_at.items() if now - v < self.explain_interval
+            }
+        self._explained_at[fingerprint] = now
+        # NOTE Set once scheduled, so that slow queries finished in the same tick don't schedule their own
+        self._explaining = True
+        return True
+
+    async def capture_explain(
+        self,
+        entry: Dict[str, Any],
+        sql: str,
+        args: Optional[List[Any]],
+        conn: BaseDBAsyncClient,
+    ):
+        try:
+            rows = await conn.execute_query_dict(f"EXPLAIN FORMAT=JSON {sql}", args)
+            entry["explain"] = loads(rows[0]["EXPLAIN"]) if rows else None
+            self.explained += 1
+        except Exception as e:
+            logger.warning(f"Explaining slow query failed => {e}")
+            entry["explain"] = {"error": str(e)}
+        finally:
+            self._explaining = False
+
+    def entries(
+        self,
+        *,
+        fingerprint: Optional[str] = None,
+        min_duration_ms: Optional[float] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Returns copies of entries from the latest, filtered by fingerprint and duration
+        """
+        result = []
+        for entry in reversed(self._entries):
+            if fingerprint is not None and entry["fingerprint"] != fingerprint:
+                continue
+            if min_duration_ms is not None and entry["duration_ms"] < min_duration_ms:
+                continue
+            result.append(dict(entry))
+            if limit is not None and len(result) >= limit:
+                break
+        return result
+
+    def clear(self):
+        self._entries.clear()
+        self._explained_at.clear()
+        self.total = 0
+        self.explained = 0
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "threshold": self.threshold,
+            "total": self.total,
+            "explained": self.explained,
+            "size": len(self._entries),
+            "maxlen": self._entries.maxlen,
+        }
+
+
+def add_slow_queries_route(app: Any, path: str = "/slow_queries"):
+    """
+    Adds a route returning entries of `CursorHandler.slow_query_log` to a FastAPI app or router
+    """
+    from .cursor_handler import CursorHandler
+
+    @app.get(path, include_in_schema=False)
+    async def slow_queries_view(
+        fingerprint: Optional[str] = None,
+        min_duration_ms: Optional[float] = None,
+        limit: int = 20,
+    ):
+        log = CursorHandler.slow_query_log
+        if log is None:
+            return {"info": None, "entries": []}
+        return {
+            "info": log.info(),
+            "entries": log.entries(fingerprint=fingerprint, min_duration_ms=min_duration_ms, limit=limit),
+        }
+
+    return slow_queries_view
@@ -0,0 +1,140 @@
+import atexit
+import sys
+from logging import DEBUG, Formatter, Handler, Logger, StreamHandler, getLogger
+from logging.handlers import QueueHandler, QueueListener
+from queue import Queue
+from time import monotonic
+from typing import Dict, List, Optional, Tuple
+
+from .fingerprint import fingerprint_sql
+from .metrics import metric_labels
+
+SQL_LOGGERS = ["fastapi_esql.utils.sqlizer"]
+DEFAULT_FORMAT = "[%(asctime)s] %(levelname)s %(name)s:%(funcName)s:+%(lineno)d %(message)s"
+# Records the caller of `debug_sql` as the origin, which is supported since Python 3.8
+STACKLEVEL = {"stacklevel": 2} if sys.version_info >= (3, 8) else {}
+
+
+class SQLSampler:
+    """
+    Allows at most `limit` statements per fingerprint every `interval` seconds, and counts suppressed ones
+    """
+    def __init__(self, limit: int = 10, interval: float = 60.0):
+        self.limit = limit
+        self.interval = interval
+        # Fingerprint => [start of window, allowed, suppressed]
+        self._windows: Dict[str, List] = {}
+
+    def allow(self, fingerprint: str) -> Tuple[bool, int]:
+        """
+        Returns whether to log, and how many were suppressed since the last logged one
+        """
+        if self.limit <= 0:
+            return True, 0
+        now = monotonic()
+        window = self._windows.get(fingerprint)
+        if window is None or now - window[0] >= self.interval:
+            if len(self._windows) >= 4096:
+                self._windows = {k: w for k, w in self._windows.items() if now - w[0] < self.interval}
+            suppressed = window[2] if window else 0
+            self._windows[fingerprint] = [now, 1, 0]
+            return True, suppressed
+        if window[1] < self.limit:
+            window[1] += 1
+            suppressed, window[2] = window[2], 0
+            return True, suppressed
+        window[2] += 1
+        return False, 0
+
+
+class SQLLogging:
+    """
+    Settings of SQL logging, see `setup_sql_logging`
+    """
+    max_chars = 2048
+    # Installed by `setup_sql_logging` only, so that other logging configuration gets every statement
+    sampler: Optional[SQLSampler] = None
+    listener: Optional[QueueListener] = None
+    queue_handler: Optional[QueueHandler] = None
+    loggers: List[str] = []
+
+
+def debug_sql(logger: Logger, sql: str, table: Optional[str] = None):
+    """
+    Logs a generated statement at DEBUG level, truncated to `max_chars` and sampled per fingerprint,
+    with structured fields `sql_fingerprint`, `sql_table`, `sql_method`, `sql_bytes` and `sql_suppressed`.
+    Nothing is done if DEBUG is disabled for the logger.
+    """
+    if not logger.isEnabledFor(DEBUG):
+        return
+    max_chars = SQLLogging.max_chars
+    size = len(sql)
+    head = sql if size <= max_chars else sql[:max_chars]
+    fingerprint = fingerprint_sql(head)
+    allowed, suppressed = SQLLogging.sampler.allow(fingerprint) if SQLLogging.sampler else (True, 0)
+    if not allowed:
+        return
+    method, labeled_table, _ = metric_labels.get() or ("", "", None)
+    message = head if size <= max_chars else f"{head}\n    ... truncated {size - max_chars} of {size} chars"
+    if suppressed:
+        message = f"{message}\n    ({suppressed} similar statements suppressed)"
+    logger.debug(message, **STACKLEVEL, extra={
+        "sql_fingerprint": fingerprint,
+        "sql_table": table or labeled_table,
+        "sql_method": method,
+        "sql_bytes": size,
+        "sql_suppressed": suppressed,
+    })
+
+
+def setup_sql_logging(
+    handler: Optional[Handler] = None,
+    *,
+    level: int = DEBUG,
+    max_chars: int = 2048,
+    sample_limit: int = 10,
+    sample_interval: float = 60.0,
+    loggers: Optional[List[str]] = None,
+) -> QueueListener:
+    """
+    Logs generated SQL through a queue, which `handler` (a StreamHandler by default) drains in a background thread,
+    so that the event loop never waits for formatting and writing. At most `sample_limit` statements of the same
+    fingerprint are logged every `sample_interval` seconds, and 0 disables sampling.
+    Nothing is configured on import, so SQL is not logged until this or other logging configuration enables it.
+    """
+    stop_sql_logging()
+    if handler is None:
+        handler = StreamHandler()
+        handler.setFormatter(Formatter(DEFAULT_FORMAT))
+    SQLLogging.max_chars = max_chars
+    SQLLogging.sampler = SQLSampler(sample_limit, sample_interval) if sample_limit > 0 else None
+
+    queue = Queue(-1)
+    SQLLogging.queue_handler = QueueHandler(queue)
+    SQLLogging.loggers = list(loggers or SQL_LOGGERS)
+    for name in SQLLogging.loggers:
+        logger = getLogger(name)
+        logger.addHandler(SQLLogging.queue_handler)
+        logger.setLevel(level)
+        logger.propagate = False
+
+    SQLLogging.listener = QueueListener(queue, handler, respect_handler_level=True)
+    SQLLogging.listener.start()
+    return SQLLogging.listener
+
+
+def stop_sql_logging():
+    """
+    Detaches the queue from loggers and removes the sampler, then flushes queued records and stops the background thread
+    """
+    SQLLogging.sampler = None
+    if SQLLogging.queue_handler is not None:
+        for name in SQLLogging.loggers:
+            getLogger(name).removeHandler(SQLLogging.queue_handler)
+        SQLLogging.queue_handler = None
+    if SQLLogging.listener is not None:
+        SQLLogging.listener.stop()
+        SQLLogging.listener = None
+
+
+atexit.register(stop_sql_logging)
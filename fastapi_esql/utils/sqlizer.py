@@ -1,15 +1,21 @@
 from logging import getLogger
-from json import dumps
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
 
 from tortoise import Model, __version__ as tortoise_version
 from tortoise.queryset import Q
 from tortoise.query_utils import QueryModifier
 
 from ..const.error import QsParsingError, WrongParamsError
+from .cache import LRUCache
 from .converter import wrap_backticks
+from .serializer import PLACEHOLDER, register_encoder, sqlize, to_param
+from .sql_logging import debug_sql
+from .where_compiler import WhereCompiler
 
 logger = getLogger(__name__)
+# NOTE Method `Q.resolve` changed since version 0.18.0
+# https://github.com/tortoise/tortoise-orm/commit/37178e175bc12bc4767b93142dab0209f9240c55
+Q_RESOLVE_WITHOUT_JOINS = tuple(int(i) for i in tortoise_version.split(".")[:2]) >= (0, 18)
 # To ensure the functionality of the RawSQL
 try:
     from tortoise.expressions import RawSQL
@@ -42,20 +48,217 @@ class Cases:
         return f"CASE {self.field} {whens}{else_} END"
 
 
+register_encoder(Cases, lambda v: v.sql)
+register_encoder(RawSQL, lambda v: v.sql)
+
+
+BULK_UPDATE_STRATEGIES = ("join", "case", "auto")
+
+
 class SQLizer:
 
+    # Max rows for strategy `auto` of `bulk_update_from_dicts` to pick `case`, see `benchmarks/bulk_update.py`
+    case_max_rows = 100
+    case_max_rows_without_values = 1000
+    # Statement skeletons keyed by the shape of the call, so only values are rendered on hits
+    plan_cache = LRUCache(maxsize=512)
+
+    @classmethod
+    def get_plan(cls, key: Hashable, compile_plan: Callable[[], Any]) -> Any:
+        plan = cls.plan_cache.get(key)
+        if plan is None:
+            plan = compile_plan()
+            cls.plan_cache.put(key, plan)
+        return plan
+
+    @classmethod
+    def get_columns(cls, data: Any, fields: List[str]) -> Optional[List[Sequence]]:
+        """
+        Returns columns of `fields` if `data` is columnar, like a mapping of column name to sequence or NumPy array,
+        or a pandas/pyarrow-like table. Otherwise `None` is returned for rows of dicts.
+        """
+        if isinstance(data, Mapping):
+            names = data
+        elif hasattr(data, "column_names"):
+            names = data.column_names
+        elif hasattr(data, "columns"):
+            names = data.columns
+        else:
+            return None
+
+        columns = [cls.to_array(data[f]) if f in names else None for f in fields]
+        sizes = {len(c) for c in columns if c is not None}
+        if len(sizes) > 1:
+            raise WrongParamsError(f"Columns of `{fields}` have different lengths {sizes}")
+        size = sizes.pop() if sizes else 0
+        return [[None] * size if c is None else c for c in columns]
+
+    @classmethod
+    def to_array(cls, column: Any) -> Sequence:
+        # pyarrow Array or ChunkedArray
+        if hasattr(column, "null_count"):
+            return column.to_pylist() if column.null_count else column.to_numpy(zero_copy_only=False)
+        # pandas Series
+        if hasattr(column, "to_numpy"):
+            return column.to_numpy()
+        return column
+
+    @classmethod
+    def to_pylist(cls, column: Sequence) -> List[Any]:
+        dtype = getattr(column, "dtype", None)
+        if dtype is None:
+            return column
+        # NOTE datetime64 in nanoseconds turns into int by `tolist`
+        if dtype.kind == "M":
+            column = column.astype("datetime64[us]")
+        return column.tolist()
+
+    @classmethod
+    def iter_values(cls, data: Any, fields: List[str]) -> Iterator[Sequence[Any]]:
+        """
+        Yields values of `fields` row by row, from columnar data or any iterable of dicts
+        """
+        columns = cls.get_columns(data, fields)
+        if columns is not None:
+            yield from zip(*map(cls.to_pylist, columns))
+        else:
+            for d in data:
+                yield [d.get(f) for f in fields]
+
+    @classmethod
+    def count_rows(cls, data: Any) -> int:
+        if isinstance(data, Mapping):
+            return max((len(c) for c in data.values()), default=0)
+        return len(data)
+
+    @classmethod
+    def sqlize_column(cls, column: Sequence) -> List[str]:
+        """
+        Renders a column at a time, and numeric NumPy arrays are rendered vectorized
+        """
+        dtype = getattr(column, "dtype", None)
+        if dtype is not None and dtype.kind in "biuf":
+            import numpy as np
+
+            if dtype.kind == "b":
+                return np.where(column, "True", "False").tolist()
+            sqlized = column.astype(str)
+            if dtype.kind == "f":
+                sqlized = np.where(np.isfinite(column), sqlized, "NULL")
+            return sqlized.tolist()
+        return [sqlize(v) for v in cls.to_pylist(column)]
+
+    @classmethod
+    def sqlize_rows(
+        cls,
+        dicts: Union[List[Dict[str, Any]], Mapping[str, Sequence]],
+        fields: List[str],
+        params: Optional[List[Any]] = None,
+    ) -> List[Sequence[str]]:
+        columns = cls.get_columns(dicts, fields)
+        if columns is not None:
+            if params is not None:
+                sqlize_value = cls.sqlize_value
+                return [
+                    [sqlize_value(v, params=params) for v in row]
+                    for row in zip(*map(cls.to_pylist, columns))
+                ]
+            return list(zip(*map(cls.sqlize_column, columns)))
+
+        if params is not None:
+            sqlize_value = cls.sqlize_value
+            return [[sqlize_value(d.get(f), params=params) for f in fields] for d in dicts]
+        return [[sqlize(d.get(f)) for f in fields] for d in dicts]
+
+    @classmethod
+    def estimate_row_bytes(cls, values: Iterable[Any]) -> int:
+        """
+        Cheap estimation of the rendered size of a row, 4 bytes are counted per value for quotes and separators
+        """
+        size = 0
+        for value in values:
+            if isinstance(value, str):
+                size += 4 + (len(value) if value.isascii() else len(value.encode()))
+            else:
+                size += 4 + len(str(value))
+        return size
+
+    @classmethod
+    def chunk_dicts(
+        cls,
+        dicts: Union[Iterable[Dict[str, Any]], Mapping[str, Sequence]],
+        fields: List[str],
+        max_rows: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ) -> Iterator[Union[List[Dict[str, Any]], Dict[str, Sequence]]]:
+        """
+        Splits dicts or columns into chunks bounded by row count and estimated byte size,
+        a single row larger than `max_bytes` still makes up a chunk by itself
+        """
+        if not any([max_rows, max_bytes]):
+            raise WrongParamsError("At least one no empty parameter is required between `max_rows` and `max_bytes`")
+
+        columns = cls.get_columns(dicts, fields)
+        if columns is not None:
+            size = len(columns[0])
+            rows = zip(*map(cls.to_pylist, columns)) if max_bytes else None
+            st, chunk_bytes = 0, 0
+            for idx in range(size):
+                row_bytes = cls.estimate_row_bytes(next(rows)) if max_bytes else 0
+                if idx > st and (
+                    (max_rows and idx - st >= max_rows)
+                    or (max_bytes and chunk_bytes + row_bytes > max_bytes)
+                ):
+                    yield {f: c[st:idx] for (f, c) in zip(fields, columns)}
+                    st, chunk_bytes = idx, 0
+                chunk_bytes += row_bytes
+            if size > st:
+                yield {f: c[st:] for (f, c) in zip(fields, columns)}
+            return
+
+        chunk, chunk_bytes = [], 0
+        for d in dicts:
+            row_bytes = cls.estimate_row_bytes(map(d.get, fields)) if max_bytes else 0
+            if chunk and (
+                (max_rows and len(chunk) >= max_rows)
+                or (max_bytes and chunk_bytes + row_bytes > max_bytes)
+            ):
+                yield chunk
+                chunk, chunk_bytes = [], 0
+            chunk.append(d)
+            chunk_bytes += row_bytes
+        if chunk:
+            yield chunk
+
+    @classmethod
+    def bind_placeholders(cls, sql: str, params: Optional[List[Any]] = None) -> str:
+        """
+        Turns placeholders into `%s` and escapes other `%` for the driver's parameter binding
+        """
+        if params is None:
+            return sql
+        return sql.replace("%", "%%").replace(PLACEHOLDER, "%s")
+
     @classmethod
     def resolve_wheres(
         cls,
         wheres: Union[str, Q, Dict[str, Any], List[Q]],
         model: Optional[Model] = None,
+        params: Optional[List[Any]] = None,
     ) -> str:
+        """
+        Compiles common lookups natively, and falls back to tortoise for the others
+        """
         if not model and not isinstance(wheres, str):
             raise WrongParamsError("Parameter `wheres` only supports `str` if no model exists")
 
         if isinstance(wheres, str):
             return wheres
-        elif isinstance(wheres, Q):
+        criterion = WhereCompiler.compile(wheres, model, params)
+        if criterion is not None:
+            return criterion
+
+        if isinstance(wheres, Q):
             qs = [wheres]
         elif isinstance(wheres, dict):
             qs = [Q(**{key: value}) for (key, value) in wheres.items()]
@@ -69,9 +272,7 @@ class SQLizer:
 
         modifier = QueryModifier()
         for q in qs:
-            # NOTE Method `Q.resolve` changed since version 0.18.0
-            # https://github.com/tortoise/tortoise-orm/commit/37178e175bc12bc4767b93142dab0209f9240c55
-            if tortoise_version >= "0.18.0":
+            if Q_RESOLVE_WITHOUT_JOINS:
                 modifier &= q.resolve(model, model._meta.basetable)
             else:
                 modifier &= q.resolve(model, {}, {}, model._meta.basetable)
@@ -89,25 +290,45 @@ class SQLizer:
         return ", ".join(orders_)
 
     @classmethod
-    def sqlize_value(cls, value, to_json=False) -> str:
+    def resolve_seek(
+        cls,
+        keys: List[str],
+        values: List[Any],
+        params: Optional[List[Any]] = None,
+    ) -> str:
+        """
+        Renders the criterion of keyset pagination, which seeks rows after `values` in the order of `keys`
+        """
+        descs = {k.startswith("-") for k in keys}
+        if len(descs) > 1:
+            raise WrongParamsError("Parameter `keys` should be in the same direction")
+        if len(keys) != len(values):
+            raise WrongParamsError("Parameters `keys` and `values` should have the same length")
+
+        op = "<" if descs.pop() else ">"
+        columns = [k.strip("-") for k in keys]
+        sqlizeds = [cls.sqlize_value(v, params=params) for v in values]
+        if len(columns) == 1:
+            return f"{columns[0]}{op}{sqlizeds[0]}"
+        # NOTE Row constructor comparison is optimized to range scan since MySQL 5.7.3
+        return f"({', '.join(columns)}){op}({', '.join(sqlizeds)})"
+
+    @classmethod
+    def sqlize_value(cls, value, to_json=False, params: Optional[List[Any]] = None) -> str:
         """
-        Works like aiomysql.connection.Connection.escape
+        Works like aiomysql.connection.Connection.escape,
+        or appends the value to `params` and returns a placeholder if `params` is given
         """
-        if value is None:
-            return "NULL"
-        elif isinstance(value, (Cases, RawSQL)):
-            return value.sql
-        elif isinstance(value, (int, float, bool)):
-            return f"{value}"
-        elif isinstance(value, (dict, list, tuple)):
-            dumped = dumps(value, ensure_ascii=False)
-            if to_json:
-                return f"CAST('{dumped}' AS JSON)"
-                # Same with above line
-                # return f"JSON_EXTRACT('{dumped}', '$')"
-            return f"'{dumped}'"
+        if params is not None and not isinstance(value, (Cases, RawSQL)):
+            params.append(to_param(value))
+            sqlized = PLACEHOLDER
         else:
-            return f"'{value}'"
+            sqlized = sqlize(value)
+        if to_json and isinstance(value, (dict, list, tuple)):
+            return f"CAST({sqlized} AS JSON)"
+            # Same with above line
+            # return f"JSON_EXTRACT({sqlized}, '$')"
+        return sqlized
 
     @classmethod
     def select_custom_fields(
@@ -123,32 +344,39 @@ class SQLizer:
         offset: Optional[int] = None,
         limit: Optional[int] = None,
         model: Optional[Model] = None,
+        params: Optional[List[Any]] = None,
     ) -> Optional[str]:
         if not all([table, fields, wheres]):
             raise WrongParamsError("Parameters `table`, `fields`, `wheres` are required")
         if having and not groups:
             raise WrongParamsError("Parameter `groups` shoud not be empty if `having` exists")
 
-        group_by = f"    GROUP BY {', '.join(groups)}" if groups else ""
-        having_ = f"    HAVING {having}" if having else ""
-        order_by = f"    ORDER BY {cls.resolve_orders(orders)}" if orders else ""
-        offset_ = "" if offset is None else f"{offset}, "
-        limit_ = f"    LIMIT {offset_}{limit}" if limit else ""
-        extras = [group_by, having_, order_by, limit_]
-
-        sql = """
+        def compile_plan():
+            group_by = f"    GROUP BY {', '.join(groups)}" if groups else ""
+            having_ = f"    HAVING {having}" if having else ""
+            order_by = f"    ORDER BY {cls.resolve_orders(orders)}" if orders else ""
+            head = """
     SELECT
       {}
     FROM {}{}
-    WHERE {}
-{}""".format(
-        ", ".join(fields),
-        wrap_backticks(table),
-        f" FORCE INDEX (`{index}`)" if index else "",
-        cls.resolve_wheres(wheres, model),
-        "\n".join(i for i in extras if i),
-    )
-        logger.debug(sql)
+    WHERE """.format(
+            ", ".join(fields),
+            wrap_backticks(table),
+            f" FORCE INDEX (`{index}`)" if index else "",
+        )
+            return head, [i for i in [group_by, having_, order_by] if i]
+
+        head, extras = cls.get_plan(
+            ("select", table, tuple(fields), index, tuple(groups or ()), having, tuple(orders or ())),
+            compile_plan,
+        )
+        if limit:
+            offset_ = "" if offset is None else f"{offset}, "
+            extras = [*extras, f"    LIMIT {offset_}{limit}"]
+
+        sql = "{}{}\n{}".format(head, cls.resolve_wheres(wheres, model, params), "\n".join(extras))
+        sql = cls.bind_placeholders(sql, params)
+        debug_sql(logger, sql, table)
         return sql
 
     @classmethod
@@ -164,6 +392,7 @@ class SQLizer:
         json_type: type = dict,
         assign_field_dict: Dict[str, Any] = None,
         model: Optional[Model] = None,
+        params: Optional[List[Any]] = None,
     ) -> Optional[str]:
         if not all([table, json_field, wheres]):
             raise WrongParamsError("Parameters `table`, `json_field`, `wheres` are required")
@@ -178,17 +407,17 @@ class SQLizer:
             json_obj = f"JSON_REMOVE({json_obj}, {rps})"
         if path_value_dict:
             pvs = [
-                f"'{path}',{cls.sqlize_value(value, to_json=True)}"
+                f"'{path}',{cls.sqlize_value(value, to_json=True, params=params)}"
                 for (path, value) in path_value_dict.items()
             ]
             json_obj = f"JSON_SET({json_obj}, {', '.join(pvs)})"
         if merge_dict:
-            json_obj = f"JSON_MERGE_PATCH({json_obj}, {cls.sqlize_value(merge_dict)})"
+            json_obj = f"JSON_MERGE_PATCH({json_obj}, {cls.sqlize_value(merge_dict, params=params)})"
 
         assign_field_dict = assign_field_dict or {}
         assign_fields = []
         for k, v in assign_field_dict.items():
-            assign_fields.append(f"{k}={cls.sqlize_value(v)}")
+            assign_fields.append(f"{k}={cls.sqlize_value(v, params=params)}")
         assign_field = ", ".join(assign_fields) if assign_fields else None
 
         sql = """
@@ -200,61 +429,69 @@ class SQLizer:
         json_field,
         json_obj,
         "\n    , " + assign_field if assign_field else "",
-        cls.resolve_wheres(wheres, model),
+        cls.resolve_wheres(wheres, model, params),
     )
-        logger.debug(sql)
+        sql = cls.bind_placeholders(sql, params)
+        debug_sql(logger, sql, table)
         return sql
 
     @classmethod
     def upsert_on_duplicate(
         cls,
         table: str,
-        dicts: List[Dict[str, Any]],
+        dicts: Union[List[Dict[str, Any]], Mapping[str, Sequence]],
         insert_fields: List[str],
         *,
         upsert_fields: Optional[List[str]] = None,
         merge_fields: Optional[List[str]] = None,
         using_values: bool = False,
+        ignore: bool = False,
+        params: Optional[List[Any]] = None,
     ) -> Optional[str]:
-        if not all([table, dicts, insert_fields]):
+        if not all([table, insert_fields]) or not cls.count_rows(dicts):
             raise WrongParamsError("Parameters `table`, `dicts`, `insert_fields` are required")
 
-        values = [
-            f"      ({', '.join(cls.sqlize_value(d.get(f)) for f in insert_fields)})"
-            for d in dicts
-        ]
-        # NOTE Beginning with MySQL 8.0.19, it is possible to use an alias for the row
-        # https://dev.mysql.com/doc/refman/8.0/en/insert-on-duplicate.html
-        on_duplicate = ""
-        if upsert_fields or merge_fields:
-            upsert_fields = upsert_fields or []
-            merge_fields = merge_fields or []
-            if using_values:
-                upserts = [f"{field}=VALUES({field})" for field in upsert_fields]
-                for mf in merge_fields:
-                    dict_obj = f"COALESCE({wrap_backticks(table)}.{mf}, '{{}}')"
-                    upserts.append(f"{mf}=JSON_MERGE_PATCH({dict_obj}, VALUES({mf}))")
-                on_duplicate = f"ON DUPLICATE KEY UPDATE {', '.join(upserts)}"
-            else:
-                new_table = f"`new_{table}`"
-                upserts = [f"{field}={new_table}.{field}" for field in upsert_fields]
-                for mf in merge_fields:
-                    dict_obj = f"COALESCE({wrap_backticks(table)}.{mf}, '{{}}')"
-                    upserts.append(f"{mf}=JSON_MERGE_PATCH({dict_obj}, {new_table}.{mf})")
-                on_duplicate = f"AS {new_table} ON DUPLICATE KEY UPDATE {', '.join(upserts)}"
-
-        sql = """
-    INSERT INTO {}
+        def compile_plan():
+            # NOTE Beginning with MySQL 8.0.19, it is possible to use an alias for the row
+            # https://dev.mysql.com/doc/refman/8.0/en/insert-on-duplicate.html
+            on_duplicate = ""
+            if upsert_fields or merge_fields:
+                if using_values:
+                    upserts = [f"{field}=VALUES({field})" for field in upsert_fields or []]
+                    for mf in merge_fields or []:
+                        dict_obj = f"COALESCE({wrap_backticks(table)}.{mf}, '{{}}')"
+                        upserts.append(f"{mf}=JSON_MERGE_PATCH({dict_obj}, VALUES({mf}))")
+                    on_duplicate = f"ON DUPLICATE KEY UPDATE {', '.join(upserts)}"
+                else:
+                    new_table = f"`new_{table}`"
+                    upserts = [f"{field}={new_table}.{field}" for field in upsert_fields or []]
+                    for mf in merge_fields or []:
+                        dict_obj = f"COALESCE({wrap_backticks(table)}.{mf}, '{{}}')"
+                        upserts.append(f"{mf}=JSON_MERGE_PATCH({dict_obj}, {new_table}.{mf})")
+                    on_duplicate = f"AS {new_table} ON DUPLICATE KEY UPDATE {', '.join(upserts)}"
+
+            head = """
+    INSERT {}INTO {}
       ({})
     VALUES
-{}{}
-""".format(
-        wrap_backticks(table),
-        ", ".join(insert_fields),
-        ",\n".join(values),
-        f"\n    {on_duplicate}" if on_duplicate else "",
-    )
-        logger.debug(sql)
+""".format("IGNORE " if ignore else "", wrap_backticks(table), ", ".join(insert_fields))
+            tail = f"\n    {on_duplicate}\n" if on_duplicate else "\n"
+            return head, tail
+
+        head, tail = cls.get_plan(
+            (
+                "upsert", table, tuple(insert_fields),
+                tuple(upsert_fields or ()), tuple(merge_fields or ()), using_values, ignore,
+            ),
+            compile_plan,
+        )
+        values = ",\n".join(
+            f"      ({', '.join(row)})"
+            for row in cls.sqlize_rows(dicts, insert_fields, params)
+        )
+
+        sql = cls.bind_placeholders(f"{head}{values}{tail}", params)
+        debug_sql(logger, sql, table)
         return sql
 
     @classmethod
@@ -267,6 +504,7 @@ class SQLizer:
         assign_field_dict: Dict[str, Any] = None,
         to_table: Optional[str] = None,
         model: Optional[Model] = None,
+        params: Optional[List[Any]] = None,
     ) -> Optional[str]:
         if not all([table, wheres]):
             raise WrongParamsError("Parameters `table`, `wheres` are required")
@@ -275,82 +513,291 @@ class SQLizer:
 
         remain_fields = remain_fields or []
         assign_field_dict = assign_field_dict or {}
-        fields = [*remain_fields]
-        assign_fields = []
-        for k, v in assign_field_dict.items():
-            fields.append(k)
-            assign_fields.append(f"{cls.sqlize_value(v)} {k}")
 
-        sql = f"""
+        def compile_plan():
+            head = f"""
     INSERT INTO {wrap_backticks(to_table or table)}
-      ({", ".join(fields)})
-    SELECT {", ".join(remain_fields + assign_fields)}
+      ({", ".join([*remain_fields, *assign_field_dict])})
+    SELECT """
+            from_ = f"""
     FROM {wrap_backticks(table)}
-    WHERE {cls.resolve_wheres(wheres, model)}
-"""
-        logger.debug(sql)
+    WHERE """
+            return head, from_
+
+        head, from_ = cls.get_plan(
+            ("insert_select", table, tuple(remain_fields), tuple(assign_field_dict), to_table),
+            compile_plan,
+        )
+        assign_fields = [f"{cls.sqlize_value(v, params=params)} {k}" for k, v in assign_field_dict.items()]
+
+        sql = "{}{}{}{}\n".format(
+            head,
+            ", ".join(remain_fields + assign_fields),
+            from_,
+            cls.resolve_wheres(wheres, model, params),
+        )
+        sql = cls.bind_placeholders(sql, params)
+        debug_sql(logger, sql, to_table or table)
+        return sql
+
+    @classmethod
+    def load_data_infile(
+        cls,
+        table: str,
+        path: str,
+        insert_fields: List[str],
+        *,
+        mode: Optional[str] = None,
+    ) -> Optional[str]:
+        """
+        Loads a file written by `to_tsv_line`, and `mode` is `replace` or `ignore` for rows with duplicate keys
+        """
+        if not all([table, path, insert_fields]):
+            raise WrongParamsError("Parameters `table`, `path`, `insert_fields` are required")
+        if mode not in (None, "replace", "ignore"):
+            raise WrongParamsError("Parameter `mode` only supports `replace` and `ignore`")
+
+        sql = """
+    LOAD DATA LOCAL INFILE {}
+    {}INTO TABLE {}
+    CHARACTER SET utf8mb4
+    FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\'
+    LINES TERMINATED BY '\\n'
+    ({})
+""".format(
+        sqlize(path),
+        f"{mode.upper()} " if mode else "",
+        wrap_backticks(table),
+        ", ".join(insert_fields),
+    )
+        debug_sql(logger, sql, table)
         return sql
 
     @classmethod
     def build_fly_table(
         cls,
-        dicts: List[Dict[str, Any]],
+        dicts: Union[List[Dict[str, Any]], Mapping[str, Sequence]],
         fields: List[str],
         using_values: bool = True,
         log_sql: bool = True,
+        params: Optional[List[Any]] = None,
     ) -> Optional[str]:
-        if not all([dicts, fields]):
+        if not fields or not cls.count_rows(dicts):
             raise WrongParamsError("Parameters `dicts`, `fields` are required")
 
+        sql = cls.bind_placeholders(cls._render_fly_table(dicts, fields, using_values, params), params)
+        if log_sql:
+            debug_sql(logger, sql)
+        return sql
+
+    @classmethod
+    def _render_fly_table(
+        cls,
+        dicts: Union[List[Dict[str, Any]], Mapping[str, Sequence]],
+        fields: List[str],
+        using_values: bool,
+        params: Optional[List[Any]],
+    ) -> str:
+        def compile_plan():
+            if using_values:
+                head = """
+        SELECT * FROM (
+          VALUES
+"""
+                tail = f"""
+        ) AS fly_table ({', '.join(fields)})"""
+            else:
+                head = """
+        SELECT * FROM (
+          """
+                tail = """
+        ) AS fly_table"""
+            return head, tail
+
+        head, tail = cls.get_plan(("fly_table", tuple(fields), using_values), compile_plan)
+        rows = cls.sqlize_rows(dicts, fields, params)
         if using_values:
-            rows = [
-                f"          ROW({', '.join(cls.sqlize_value(d.get(f)) for f in fields)})"
-                for d in dicts
-            ]
-            values = "VALUES\n" + ",\n".join(rows)
-            table = f"fly_table ({', '.join(fields)})"
+            values = ",\n".join(f"          ROW({', '.join(row)})" for row in rows)
         else:
-            rows = [
-                f"SELECT {', '.join(f'{cls.sqlize_value(d.get(f))} {f}' for f in fields)}"
-                for d in dicts
-            ]
-            values = "\n            UNION\n          ".join(rows)
-            table = "fly_table"
+            values = "\n            UNION\n          ".join(
+                f"SELECT {', '.join(f'{v} {f}' for (v, f) in zip(row, fields))}"
+                for row in rows
+            )
 
-        sql = f"""
-        SELECT * FROM (
-          {values}
-        ) AS {table}"""
-        if log_sql:
-            logger.debug(sql)
-        return sql
+        return f"{head}{values}{tail}"
 
     @classmethod
     def bulk_update_from_dicts(
         cls,
         table: str,
-        dicts: List[Dict[str, Any]],
+        dicts: Union[List[Dict[str, Any]], Mapping[str, Sequence]],
         join_fields: List[str],
         update_fields: List[str],
         *,
         merge_fields: Optional[List[str]] = None,
         using_values: bool = True,
+        strategy: str = "join",
+        params: Optional[List[Any]] = None,
     ) -> Optional[str]:
-        if not all([table, dicts, join_fields, update_fields]):
+        """
+        Strategy `join` joins the table with a fly table, and `case` sets fields by CASE statements on one join field.
+        Strategy `auto` picks `case` for a single join field and a batch up to `case_max_rows`,
+        or up to `case_max_rows_without_values` if `using_values` is False, where the UNION fly table is slow.
+        """
+        if not all([table, join_fields, update_fields]) or not cls.count_rows(dicts):
             raise WrongParamsError("Parameters `table`, `dicts`, `join_fields`, `update_fields` are required")
+        if strategy not in BULK_UPDATE_STRATEGIES:
+            raise WrongParamsError(f"Parameter `strategy` should be one of {BULK_UPDATE_STRATEGIES}")
+
+        merge_fields = merge_fields or []
+        if strategy == "auto":
+            strategy = cls.choose_bulk_update_strategy(cls.count_rows(dicts), join_fields, using_values)
+        if strategy == "case":
+            return cls._bulk_update_by_case(table, dicts, join_fields, update_fields, merge_fields, params)
+
+        def compile_plan():
+            joins, updates = cls.resolve_joined_updates(table, join_fields, update_fields, merge_fields)
+            head = f"""
+    UPDATE {wrap_backticks(table)}
+    JOIN ("""
+            tail = f"""
+    ) tmp ON {joins}
+    SET {updates}
+"""
+            return head, tail, [*join_fields, *update_fields, *merge_fields]
 
+        head, tail, fields = cls.get_plan(
+            ("bulk_update", table, tuple(join_fields), tuple(update_fields), tuple(merge_fields), using_values),
+            compile_plan,
+        )
+
+        sql = f"{head}{cls._render_fly_table(dicts, fields, using_values, params)}{tail}"
+        sql = cls.bind_placeholders(sql, params)
+        debug_sql(logger, sql, table)
+        return sql
+
+    @classmethod
+    def resolve_joined_updates(
+        cls,
+        table: str,
+        join_fields: List[str],
+        update_fields: List[str],
+        merge_fields: List[str],
+    ) -> Tuple[str, str]:
+        """
+        Renders join conditions and assignments of `table` updated from a joined table aliased as `tmp`
+        """
         joins = [f"{wrap_backticks(table)}.{jf}=tmp.{jf}" for jf in join_fields]
         updates = [f"{wrap_backticks(table)}.{uf}=tmp.{uf}" for uf in update_fields]
-        merge_fields = merge_fields or []
         for mf in merge_fields:
             dict_obj = f"COALESCE({wrap_backticks(table)}.{mf}, '{{}}')"
             updates.append(f"{wrap_backticks(table)}.{mf}=JSON_MERGE_PATCH({dict_obj}, tmp.{mf})")
+        return " AND ".join(joins), ", ".join(updates)
+
+    @classmethod
+    def create_staging_table(
+        cls,
+        table: str,
+        staging_table: str,
+        fields: List[str],
+        index_fields: List[str],
+    ) -> Optional[str]:
+        """
+        Creates an empty temporary table with `fields` shaped like those of `table`, and indexed by `index_fields`
+        """
+        if not all([table, staging_table, fields, index_fields]):
+            raise WrongParamsError("Parameters `table`, `staging_table`, `fields`, `index_fields` are required")
+
+        sql = """
+    CREATE TEMPORARY TABLE {} (INDEX ({}))
+    SELECT {} FROM {} LIMIT 0
+""".format(
+        wrap_backticks(staging_table),
+        ", ".join(index_fields),
+        ", ".join(fields),
+        wrap_backticks(table),
+    )
+        debug_sql(logger, sql, staging_table)
+        return sql
+
+    @classmethod
+    def bulk_update_from_staging(
+        cls,
+        table: str,
+        staging_table: str,
+        join_fields: List[str],
+        update_fields: List[str],
+        *,
+        merge_fields: Optional[List[str]] = None,
+    ) -> Optional[str]:
+        if not all([table, staging_table, join_fields, update_fields]):
+            raise WrongParamsError("Parameters `table`, `staging_table`, `join_fields`, `update_fields` are required")
 
+        joins, updates = cls.resolve_joined_updates(table, join_fields, update_fields, merge_fields or [])
         sql = f"""
     UPDATE {wrap_backticks(table)}
-    JOIN ({SQLizer.build_fly_table(dicts, join_fields + update_fields + merge_fields, using_values, log_sql=False)}
-    ) tmp ON {" AND ".join(joins)}
-    SET {", ".join(updates)}
+    JOIN {wrap_backticks(staging_table)} tmp ON {joins}
+    SET {updates}
 """
-        logger.debug(sql)
+        debug_sql(logger, sql, table)
+        return sql
+
+    @classmethod
+    def choose_bulk_update_strategy(cls, row_cnt: int, join_fields: List[str], using_values: bool = True) -> str:
+        max_rows = cls.case_max_rows if using_values else cls.case_max_rows_without_values
+        return "case" if len(join_fields) == 1 and row_cnt <= max_rows else "join"
+
+    @classmethod
+    def _bulk_update_by_case(
+        cls,
+        table: str,
+        dicts: Union[List[Dict[str, Any]], Mapping[str, Sequence]],
+        join_fields: List[str],
+        update_fields: List[str],
+        merge_fields: List[str],
+        params: Optional[List[Any]],
+    ) -> str:
+        if len(join_fields) != 1:
+            raise WrongParamsError("Strategy `case` only supports one join field")
+
+        key = join_fields[0]
+
+        def compile_plan():
+            cases = [(f"{uf}=CASE {key} ", " END") for uf in update_fields]
+            for mf in merge_fields:
+                cases.append((f"{mf}=JSON_MERGE_PATCH(COALESCE({mf}, '{{}}'), CASE {key} ", " END)"))
+            head = f"""
+    UPDATE {wrap_backticks(table)}
+    SET """
+            return head, cases, f"\n    WHERE {key} IN (", [*update_fields, *merge_fields]
+
+        head, cases, where, fields = cls.get_plan(
+            ("bulk_update_case", table, key, tuple(update_fields), tuple(merge_fields)),
+            compile_plan,
+        )
+        columns = cls.get_columns(dicts, [key, *fields])
+        if columns is None:
+            columns = [[d.get(f) for d in dicts] for f in [key, *fields]]
+        keys, *columns = columns
+
+        sets = []
+        if params is None:
+            sqlized_keys = cls.sqlize_column(keys)
+            for (prefix, suffix), column in zip(cases, columns):
+                whens = " ".join(f"WHEN {k} THEN {v}" for k, v in zip(sqlized_keys, cls.sqlize_column(column)))
+                sets.append(f"{prefix}{whens}{suffix}")
+        else:
+            # NOTE Values are appended to `params` in the same order as their placeholders
+            keys = cls.to_pylist(keys)
+            for (prefix, suffix), column in zip(cases, columns):
+                whens = " ".join(
+                    f"WHEN {cls.sqlize_value(k, params=params)} THEN {cls.sqlize_value(v, params=params)}"
+                    for k, v in zip(keys, cls.to_pylist(column))
+                )
+                sets.append(f"{prefix}{whens}{suffix}")
+            sqlized_keys = [cls.sqlize_value(k, params=params) for k in keys]
+
+        sql = f"{head}{', '.join(sets)}{where}{','.join(sqlized_keys)})\n"
+        sql = cls.bind_placeholders(sql, params)
+        debug_sql(logger, sql, table)
         return sql
@@ -0,0 +1,166 @@
+from asyncio import Future, TimerHandle, ensure_future, gather, get_event_loop, shield
+from collections import deque
+from itertools import count
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, List, Optional, Set
+from weakref import WeakSet
+
+
+def merge_patches(patch: Dict[str, Any], other: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Returns a JSON merge patch equal to applying `patch` and then `other`, which keeps `None` to remove keys
+    """
+    merged = dict(patch)
+    for k, v in other.items():
+        if isinstance(v, dict) and isinstance(merged.get(k), dict):
+            merged[k] = merge_patches(merged[k], v)
+        else:
+            merged[k] = v
+    return merged
+
+
+class UpsertBuffer:
+    """
+    Write-behind buffer collecting rows of concurrent callers, which are flushed by one call of `flush_rows`
+    once `max_rows` rows are buffered, or `window` seconds after the first one.
+    Rows with the same `key_fields` are collapsed before flushing, where later values of `update_fields` win
+    and dicts of `merge_fields` are merge-patched, like `ON DUPLICATE KEY UPDATE` would do one by one.
+    Every caller gets the result of the flush including its rows, and waits before buffering
+    if `max_pending` rows are buffered or being flushed.
+    """
+    # NOTE Buffers are held by their owners, and tracked here only to be flushed all on shutdown
+    instances: "WeakSet[UpsertBuffer]" = WeakSet()
+
+    def __init__(
+        self,
+        flush_rows: Callable[[List[Dict[str, Any]]], Awaitable[Any]],
+        key_fields: Optional[List[str]] = None,
+        *,
+        update_fields: Optional[List[str]] = None,
+        merge_fields: Optional[List[str]] = None,
+        window: float = 0.05,
+        max_rows: int = 1000,
+        max_pending: int = 10000,
+    ):
+        self.flush_rows = flush_rows
+        self.key_fields = list(key_fields or [])
+        self.update_fields = set(update_fields or [])
+        self.merge_fields = set(merge_fields or [])
+        self.window = window
+        self.max_rows = max_rows
+        self.max_pending = max_pending
+        self.adds = 0
+        self.collapsed = 0
+        self.flushes = 0
+        self._rows: Dict[Hashable, Dict[str, Any]] = {}
+        self._seq = count()
+        self._future: Optional[Future] = None
+        self._timer: Optional[TimerHandle] = None
+        self._buffered = 0
+        self._pending = 0
+        self._tasks: Set[Future] = set()
+        self._waiters: Deque[Future] = deque()
+        UpsertBuffer.instances.add(self)
+
+    def __len__(self):
+        return len(self._rows)
+
+    async def add(self, dicts: List[Dict[str, Any]]) -> Any:
+        loop = get_event_loop()
+        # NOTE Rows are always accepted if nothing is pending, even if they are more than `max_pending`
+        while self._pending and self._pending + len(dicts) > self.max_pending:
+            waiter = loop.create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+
+        self.adds += 1
+        for row in dicts:
+            self.put(row)
+        self._buffered += len(dicts)
+        self._pending += len(dicts)
+        if self._future is None:
+            self._future = loop.create_future()
+        future = self._future
+        if len(self._rows) >= self.max_rows:
+            self.dispatch()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self.dispatch)
+        # NOTE Cancelling one caller doesn't cancel the flush for others
+        return await shield(future)
+
+    def put(self, row: Dict[str, Any]):
+        key = tuple(row.get(f) for f in self.key_fields) if self.key_fields else next(self._seq)
+        existing = self._rows.get(key)
+        if existing is None:
+            self._rows[key] = dict(row)
+            return
+        self.collapsed += 1
+        for f, v in row.items():
+            if f in self.merge_fields:
+                old = existing.get(f)
+                existing[f] = merge_patches(old, v) if isinstance(old, dict) and isinstance(v, dict) else v
+            elif f in self.update_fields:
+                existing[f] = v
+
+    def dispatch(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._rows:
+            return
+        rows, self._rows = list(self._rows.values()), {}
+        future, self._future = self._future, None
+        buffered, self._buffered = self._buffered, 0
+        self.flushes += 1
+        task = ensure_future(self._flush(rows, future, buffered))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _flush(self, rows: List[Dict[str, Any]], future: Future, buffered: int):
+        try:
+            result = await self.flush_rows(rows)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+        else:
+            if not future.done():
+                future.set_result(result)
+        finally:
+            self._pending -= buffered
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                if not waiter.done():
+                    waiter.set_result(None)
+
+    async def flush(self):
+        """
+        Flushes buffered rows at once, and waits for all flushes in progress
+        """
+        self.dispatch()
+        if self._tasks:
+            await gather(*self._tasks)
+
+    def info(self) -> Dict[str, int]:
+        return {
+            "adds": self.adds,
+            "collapsed": self.collapsed,
+            "flushes": self.flushes,
+            "buffered": len(self._rows),
+            "pending": self._pending,
+        }
+
+
+async def flush_all_buffers():
+    await gather(*(buffer.flush() for buffer in list(UpsertBuffer.instances)))
+
+
+def add_flush_on_shutdown(app: Any):
+    """
+    Flushes all upsert buffers on shutdown of a FastAPI app,
+    which should be added before connections are closed, like by `register_tortoise`
+    """
+    app.on_event("shutdown")(flush_all_buffers)
+    return flush_all_buffers
@@ -0,0 +1,193 @@
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from tortoise import Model, fields
+from tortoise.queryset import Q
+
+from .cache import LRUCache
+from .converter import wrap_backticks
+from .serializer import PLACEHOLDER, sqlize, to_param
+
+# NOTE Enum fields are subclasses of `SmallIntField` and `CharField`
+NATIVE_FIELDS = (
+    fields.IntField, fields.BigIntField, fields.SmallIntField,
+    fields.CharField, fields.TextField, fields.BooleanField,
+    fields.FloatField, fields.DecimalField, fields.UUIDField,
+    fields.DatetimeField, fields.DateField,
+)
+TEXT_FIELDS = (fields.CharField, fields.TextField)
+# Types of values after `Field.to_db_value`, which are rendered the same as pypika,
+# except that datetimes are joined by a space instead of `T`, which MySQL reads the same
+NATIVE_VALUES = (bool, int, float, str, Decimal, datetime, date)
+COMPARATORS = {"gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+LOOKUPS = {"exact", "in", "range", "isnull", "contains", *COMPARATORS}
+# Escapes wildcards of LIKE pattern, with backslash as the default escape character
+LIKE_ESCAPE_TABLE = str.maketrans({"\\": "\\\\", "%": "\\%", "_": "\\_"})
+
+
+class WhereCompiler:
+    """
+    Renders `wheres` of AND-joined common lookups into criterion directly, without building pypika terms.
+    `None` is returned for anything else, like OR, negation, relations or other lookups,
+    which should be resolved by tortoise instead.
+    """
+
+    # Compiled columns and lookups keyed by model and filter keys, `False` for unsupported shapes
+    shape_cache = LRUCache(maxsize=1024)
+
+    @classmethod
+    def flatten(
+        cls,
+        wheres: Union[Q, Dict[str, Any], List[Q]],
+    ) -> Optional[List[Tuple[str, Any]]]:
+        if isinstance(wheres, dict):
+            return list(wheres.items()) or None
+        if isinstance(wheres, Q):
+            qs = [wheres]
+        elif isinstance(wheres, list):
+            qs = [q for q in wheres if isinstance(q, Q)]
+        else:
+            return None
+
+        filters = []
+        for q in qs:
+            if not cls.flatten_q(q, filters):
+                return None
+        return filters or None
+
+    @classmethod
+    def flatten_q(cls, q: Q, filters: List[Tuple[str, Any]]) -> bool:
+        if q._is_negated or getattr(q, "_custom_filters", None):
+            return False
+        if q.children:
+            if q.join_type != Q.AND and len(q.children) > 1:
+                return False
+            return all(cls.flatten_q(c, filters) for c in q.children)
+        if q.join_type != Q.AND and len(q.filters) > 1:
+            return False
+        filters.extend(q.filters.items())
+        return True
+
+    @classmethod
+    def compile_shape(cls, model: Model, keys: Tuple[str, ...]) -> Optional[List[Tuple[str, str, fields.Field]]]:
+        meta = model._meta
+        shape = []
+        for key in keys:
+            name, _, lookup = key.partition("__")
+            lookup = lookup or "exact"
+            if name == "pk":
+                name = meta.pk_attr
+            field = meta.fields_map.get(name)
+            if (
+                lookup not in LOOKUPS
+                or not isinstance(field, NATIVE_FIELDS)
+                or name not in meta.fields_db_projection
+                or (lookup == "contains" and not isinstance(field, TEXT_FIELDS))
+            ):
+                return None
+            shape.append((wrap_backticks(meta.fields_db_projection[name]), lookup, field))
+        return shape
+
+    @classmethod
+    def compile(
+        cls,
+        wheres: Union[Q, Dict[str, Any], List[Q]],
+        model: Model,
+        params: Optional[List[Any]] = None,
+    ) -> Optional[str]:
+        filters = cls.flatten(wheres)
+        if not filters:
+            return None
+
+        keys = tuple(k for k, _ in filters)
+        shape = cls.shape_cache.get((model, keys))
+        if shape is None:
+            shape = cls.compile_shape(model, keys) or False
+            cls.shape_cache.put((model, keys), shape)
+        if not shape:
+            return None
+
+        # NOTE Values are collected apart, so `params` stays untouched when falling back
+        values = [] if params is not None else None
+        criteria = []
+        for (column, lookup, field), (_, value) in zip(shape, filters):
+            criterion = cls.render(column, lookup, field, value, model, values)
+            if criterion is None:
+                return None
+            criteria.append(criterion)
+        if params is not None:
+            params.extend(values)
+        return " AND ".join(criteria)
+
+    @classmethod
+    def render(
+        cls,
+        column: str,
+        lookup: str,
+        field: fields.Field,
+        value: Any,
+        model: Model,
+        params: Optional[List[Any]] = None,
+    ) -> Optional[str]:
+        if lookup == "isnull":
+            return f"{column} IS NULL" if value else f"{column} IS NOT NULL"
+        if lookup == "exact":
+            if value is None:
+                return f"{column} IS NULL"
+            sqlized = cls.sqlize_db_value(field, value, model, params)
+            return None if sqlized is None else f"{column}={sqlized}"
+        if lookup in COMPARATORS:
+            sqlized = cls.sqlize_db_value(field, value, model, params)
+            return None if sqlized is None else f"{column}{COMPARATORS[lookup]}{sqlized}"
+        if lookup == "contains":
+            if not isinstance(value, str):
+                return None
+            pattern = f"%{value.translate(LIKE_ESCAPE_TABLE)}%"
+            return f"{column} LIKE {cls.sqlize_param(pattern, params)}"
+
+        if not isinstance(value, (list, tuple, set, frozenset)):
+            return None
+        sqlizeds = [cls.sqlize_db_value(field, v, model, params) for v in value]
+        if not sqlizeds or None in sqlizeds:
+            return None
+        if lookup == "range":
+            if len(sqlizeds) != 2:
+                return None
+            return f"{column} BETWEEN {sqlizeds[0]} AND {sqlizeds[1]}"
+        return f"{column} IN ({','.join(sqlizeds)})"
+
+    @classmethod
+    def sqlize_db_value(
+        cls,
+        field: fields.Field,
+        value: Any,
+        model: Model,
+        params: Optional[List[Any]] = None,
+    ) -> Optional[str]:
+        if value is None:
+            return None
+        try:
+            db_value = field.to_db_value(value, model)
+        except Exception:
+            # Let tortoise raise its own error
+            return None
+        if not isinstance(db_value, NATIVE_VALUES):
+            return None
+        # Other values of date fields, like strings or dates of datetime fields, are left to tortoise
+        if isinstance(field, fields.DatetimeField) and not isinstance(db_value, datetime):
+            return None
+        if isinstance(field, fields.DateField) and not isinstance(db_value, date):
+            return None
+        # NOTE Aware datetimes, like the ones made by `to_db_value` if `use_tz` is enabled, keep their offsets,
+        # which the driver drops when binding them
+        if params is not None and isinstance(db_value, datetime) and db_value.tzinfo is not None:
+            db_value = db_value.isoformat(" ")
+        return cls.sqlize_param(db_value, params)
+
+    @classmethod
+    def sqlize_param(cls, value: Any, params: Optional[List[Any]] = None) -> str:
+        if params is None:
+            return sqlize(value)
+        params.append(to_param(value))
+        return PLACEHOLDER
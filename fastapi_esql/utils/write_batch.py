@@ -0,0 +1,67 @@
+from logging import getLogger
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+from tortoise import BaseDBAsyncClient
+
+from ..const.error import WrongParamsError
+from .cursor_handler import CursorHandler
+
+logger = getLogger(__name__)
+
+
+class WriteBatch:
+    """
+    Unit of work collecting rendered write statements of managers sharing one connection,
+    which are sent as one multi-statement request by `execute`, or on exit of `async with` without exceptions.
+    Statements are applied all or nothing if `transaction` is True.
+    `row_cnts` are affected rows per statement after execution, see `CursorHandler.multi_row_cnts`.
+    """
+    def __init__(self, conn: Optional[BaseDBAsyncClient] = None, *, transaction: bool = False):
+        self.conn = conn
+        self.transaction = transaction
+        self.statements: List[Tuple[str, Optional[List[Any]]]] = []
+        self.row_cnts: Optional[List[Optional[int]]] = None
+        self.executed = False
+        self._callbacks: List[Callable[[], Awaitable[Any]]] = []
+
+    def __len__(self):
+        return len(self.statements)
+
+    async def __aenter__(self) -> "WriteBatch":
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        # NOTE Nothing has been sent yet, so statements are simply dropped on exceptions
+        if exc_type is None and not self.executed:
+            await self.execute()
+
+    def add(self, sql: str, args: Optional[List[Any]], conn: BaseDBAsyncClient) -> int:
+        """
+        Returns the index of the statement, whose row count is `row_cnts[index]` after execution
+        """
+        if self.executed:
+            raise WrongParamsError("Batch has been executed")
+        if self.conn is None:
+            self.conn = conn
+        elif conn is not self.conn:
+            raise WrongParamsError("Statements of a batch should share one connection")
+        self.statements.append((sql, args))
+        return len(self.statements) - 1
+
+    def on_executed(self, callback: Callable[[], Awaitable[Any]]):
+        self._callbacks.append(callback)
+
+    async def execute(self) -> Optional[List[Optional[int]]]:
+        if self.executed:
+            raise WrongParamsError("Batch has been executed")
+        self.executed = True
+        if not self.statements:
+            self.row_cnts = []
+            return self.row_cnts
+
+        self.row_cnts = await CursorHandler.multi_row_cnts(self.statements, self.conn, logger, self.transaction)
+        # Skipped if rolled back, otherwise statements before a failed one have been applied
+        if self.row_cnts is not None:
+            for callback in self._callbacks:
+                await callback()
+        return self.row_cnts
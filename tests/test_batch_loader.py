@@ -0,0 +1,49 @@
+from asyncio import gather, sleep
+
+import pytest
+
+from fastapi_esql import BatchLoader
+
+
+class Loader:
+
+    def __init__(self):
+        self.batches = []
+
+    async def __call__(self, keys):
+        self.batches.append(keys)
+        return {k: {"id": k} for k in keys if k > 0}
+
+
+@pytest.mark.asyncio
+async def test_same_tick():
+    load_many = Loader()
+    loader = BatchLoader(load_many)
+    results = await gather(*[loader.load(k) for k in [1, 2, -1, 1]])
+    assert results == [{"id": 1}, {"id": 2}, None, {"id": 1}]
+    assert results[0] is not results[3]
+    assert load_many.batches == [[1, 2, -1]]
+    assert loader.info() == {"loads": 4, "batches": 1, "pending": 0}
+
+
+@pytest.mark.asyncio
+async def test_window_and_max_batch():
+    load_many = Loader()
+    loader = BatchLoader(load_many, window=0.1, max_batch=2)
+
+    async def load_later(key):
+        await sleep(0.001)
+        return await loader.load(key)
+
+    await gather(loader.load(1), load_later(2), load_later(3))
+    assert load_many.batches == [[1, 2], [3]]
+
+
+@pytest.mark.asyncio
+async def test_exception():
+    async def load_many(keys):
+        raise ValueError("Error")
+
+    loader = BatchLoader(load_many)
+    with pytest.raises(ValueError):
+        await loader.load(1)
@@ -0,0 +1,30 @@
+from unittest import TestCase
+
+from fastapi_esql import LRUCache
+
+
+class TestLRUCache(TestCase):
+
+    def test_hits_and_misses(self):
+        cache = LRUCache(maxsize=2)
+        assert cache.get("a") is None
+        cache.put("a", 1)
+        assert cache.get("a") == 1
+        assert cache.info() == {"hits": 1, "misses": 1, "size": 1, "maxsize": 2}
+
+    def test_eviction(self):
+        cache = LRUCache(maxsize=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+        assert "a" in cache
+        assert "b" not in cache
+        assert len(cache) == 2
+
+    def test_clear(self):
+        cache = LRUCache()
+        cache.put("a", 1)
+        cache.get("a")
+        cache.clear()
+        assert cache.info() == {"hits": 0, "misses": 0, "size": 0, "maxsize": 256}
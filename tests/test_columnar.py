@@ -0,0 +1,43 @@
+from datetime import datetime
+from unittest import TestCase
+
+import pytest
+from tortoise import fields
+
+from fastapi_esql.utils.columnar import dtype_of, to_arrow_table, to_columns
+
+np = pytest.importorskip("numpy")
+
+
+class TestColumnar(TestCase):
+
+    names = ["id", "active", "score", "created_at", "extend"]
+    rows = [
+        (1, 1, 1.5, datetime(2022, 1, 1), [1, 2]),
+        (None, 0, None, None, {"k": 1}),
+    ]
+    dtypes = {"id": "int32", "active": "bool", "score": "float64", "created_at": "datetime64[us]"}
+
+    def test_dtype_of(self):
+        assert dtype_of(fields.BooleanField()) == "bool"
+        assert dtype_of(fields.BigIntField()) == "int64"
+        assert dtype_of(fields.DatetimeField()) == "datetime64[us]"
+        assert dtype_of(fields.CharField(max_length=8)) is None
+
+    def test_to_columns(self):
+        columns = to_columns(self.names, self.rows, self.dtypes)
+        # Falls back to objects for NULL of integers
+        assert columns["id"].dtype == object
+        assert columns["active"].dtype == bool
+        assert np.isnan(columns["score"][1])
+        assert np.isnat(columns["created_at"][1])
+        assert columns["extend"].shape == (2,)
+
+        empty = to_columns(["id"], [], self.dtypes)
+        assert empty["id"].dtype == np.int32 and len(empty["id"]) == 0
+
+    def test_to_arrow_table(self):
+        pytest.importorskip("pyarrow")
+        table = to_arrow_table(to_columns(self.names[:4], [r[:4] for r in self.rows], self.dtypes))
+        assert table.num_rows == 2
+        assert table.column("score").null_count == 1
@@ -2,7 +2,8 @@ from copy import deepcopy
 from json import loads
 from unittest import TestCase
 
-from fastapi_esql import convert_dicts, escape_string, wrap_backticks
+from fastapi_esql import RowConverter, convert_dicts, escape_string, wrap_backticks
+from fastapi_esql.utils.converter import convert_tuples, memoize, namedtuple_of
 
 
 class TestConvertDicts(TestCase):
@@ -25,6 +26,48 @@ class TestConvertDicts(TestCase):
         assert dicts == [{"id": 1, "value": 1}, {"id": 2, "value": '{"k": [true, null]}'}]
 
 
+class TestRowConverter(TestCase):
+
+    dicts = TestConvertDicts.dicts
+
+    def test_normal(self):
+        dicts = deepcopy(self.dicts)
+        RowConverter({"id": str, "value": loads})(dicts)
+        assert dicts == [{"id": "1", "value": 1}, {"id": "2", "value": {"k": [True, None]}}]
+
+    def test_wrong_field(self):
+        dicts = deepcopy(self.dicts)
+        convert_dicts(dicts, RowConverter({"id": str, "wrong_value": loads}))
+        assert dicts == [{"id": "1", "value": "1"}, {"id": "2", "value": '{"k": [true, null]}'}]
+
+    def test_wrong_converter(self):
+        dicts = deepcopy(self.dicts)
+        RowConverter({"id": str, "value": int})(dicts)
+        # Converted field by field after the failure of a row
+        assert dicts == [{"id": "1", "value": 1}, {"id": "2", "value": '{"k": [true, null]}'}]
+
+    def test_tuples(self):
+        rows = [(1, "1"), (2, '{"k": [true, null]}')]
+        assert convert_tuples(["id", "value"], rows, {"value": loads}) == [(1, 1), (2, {"k": [True, None]})]
+        # Converted field by field after the failure of a row
+        assert convert_tuples(["id", "value"], rows, {"id": str, "value": int}) == [("1", 1), ("2", rows[1][1])]
+        assert convert_tuples(["id", "value"], rows, None) == rows
+
+        row_class = namedtuple_of(("id", "COUNT(1)"))
+        assert row_class._fields == ("id", "_1")
+
+    def test_memoize(self):
+        calls = []
+
+        def to_bool(value):
+            calls.append(value)
+            return bool(value)
+
+        memoized = memoize(to_bool, maxsize=1)
+        assert [memoized(v) for v in (1, 1, 0, 0)] == [True, True, False, False]
+        assert calls == [1, 0, 0]
+
+
 class TestEscapeString(TestCase):
 
     def test_normal(self):
@@ -1,9 +1,10 @@
 from logging import getLogger
 
 from asynctest import TestCase, patch
+from tortoise.exceptions import OperationalError
 
 from . import get_test_conn, init_tortoise
-from fastapi_esql import CursorHandler
+from fastapi_esql import CursorHandler, WrongParamsError
 
 logger = getLogger(__name__)
 
@@ -21,6 +22,18 @@ class TestCursorHandler(TestCase):
         print(f"result => {result}")
         assert result
 
+    async def test_stream_dicts(self):
+        batches = [
+            dicts async for dicts in CursorHandler.stream_dicts(
+                "SELECT 1 idx UNION SELECT 2 UNION SELECT 3", self.conn, logger, {"idx": str}, batch_size=2,
+            )
+        ]
+        assert batches == [[{"idx": "1"}, {"idx": "2"}], [{"idx": "3"}]]
+
+        with self.assertRaises(Exception):
+            async for _ in CursorHandler.stream_dicts("SELECT * FROM no_table", self.conn, logger):
+                ...
+
     async def test_fetch_one(self):
         one = await CursorHandler.fetch_one("SELECT 1 idx", self.conn, logger)
         assert one == {"idx": 1}
@@ -33,6 +46,25 @@ class TestCursorHandler(TestCase):
             print(f"empty => {empty}")
             assert empty == {}
 
+    async def test_fetch_shapes(self):
+        sql = "SELECT 1 idx, 'a' name UNION SELECT 2, 'b'"
+        tuples = await CursorHandler.fetch_tuples(sql, self.conn, logger, {"idx": str})
+        assert tuples == [("1", "a"), ("2", "b")]
+
+        rows = await CursorHandler.fetch_namedtuples(sql, self.conn, logger)
+        assert [(r.idx, r.name) for r in rows] == [(1, "a"), (2, "b")]
+
+        assert await CursorHandler.fetch_column(sql, self.conn, logger) == [1, 2]
+        assert await CursorHandler.fetch_scalar("SELECT COUNT(1)", self.conn, logger) == 1
+        assert await CursorHandler.fetch_scalar("SELECT 1 FROM DUAL WHERE false", self.conn, logger) is None
+        assert await CursorHandler.fetch_tuples("SELECT * FROM no_table", self.conn, logger) is None
+        with self.assertRaises(OperationalError):
+            await CursorHandler.query_tuples("SELECT * FROM no_table", self.conn)
+
+        columns = await CursorHandler.fetch_columns(sql, self.conn, logger, dtypes={"idx": "int64"})
+        assert list(columns["idx"]) == [1, 2]
+        assert list(columns["name"]) == ["a", "b"]
+
     @patch("tortoise.backends.mysql.client_class.execute_query")
     async def test_sum_row_cnt(self, mock_exec):
         mock_exec.return_value = 10, object()
@@ -44,3 +76,33 @@ class TestCursorHandler(TestCase):
         ) as mock_exec:
             mock_exec.side_effect = Exception("Error")
             assert await CursorHandler.exec_if_ok("SELECT true", self.conn, logger) == False
+
+    @patch("tortoise.backends.mysql.client_class.execute_query")
+    async def test_sum_chunk_row_cnts(self, mock_exec):
+        mock_exec.return_value = 10, object()
+        statements = [("SELECT true", None), ("SELECT false", None)]
+        result = await CursorHandler.sum_chunk_row_cnts(statements, self.conn, logger)
+        assert result.row_cnt == 20
+        assert result.row_cnts == [10, 10]
+
+        mock_exec.side_effect = [(10, object()), Exception("Error")]
+        result = await CursorHandler.sum_chunk_row_cnts(statements, self.conn, logger, concurrency=2)
+        assert result.row_cnt == 10
+        assert result.failed == 1
+
+        def render():
+            yield "SELECT true", None
+            raise WrongParamsError("Parameter `dicts` is required")
+
+        mock_exec.side_effect = None
+        for concurrency in (1, 2):
+            with self.assertRaises(WrongParamsError):
+                await CursorHandler.sum_chunk_row_cnts(render(), self.conn, logger, concurrency)
+
+    async def test_multi_row_cnts(self):
+        statements = [("SELECT 1 UNION SELECT 2", None), ("SELECT %s LIKE '%%a'", ["ab"]), ("SELECT '%a'", None)]
+        assert await CursorHandler.multi_row_cnts(statements, self.conn, logger) == [2, 1, 1]
+
+        statements = [("SELECT 1", None), ("SELECT * FROM no_table", None), ("SELECT 2", None)]
+        assert await CursorHandler.multi_row_cnts(statements, self.conn, logger) == [1, None, None]
+        assert await CursorHandler.multi_row_cnts(statements, self.conn, logger, transaction=True) is None
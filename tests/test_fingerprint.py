@@ -0,0 +1,15 @@
+from unittest import TestCase
+
+from fastapi_esql import fingerprint_sql
+
+
+class TestFingerprintSQL(TestCase):
+
+    def test_literals(self):
+        sql = "SELECT id FROM `t_1` /* hint */ WHERE name='a\\'b' AND score>-1.5 AND flag=%s LIMIT 10"
+        assert fingerprint_sql(sql) == "SELECT id FROM `t_1` WHERE name=? AND score>? AND flag=? LIMIT ?"
+
+    def test_lists(self):
+        assert fingerprint_sql("SELECT 1 FROM t WHERE id IN (1, 2, 3)") == fingerprint_sql("SELECT 1 FROM t WHERE id IN (4)")
+        sql = "INSERT INTO t (a, b) VALUES (1, 'x'), (2, 'y')\n  ON DUPLICATE KEY UPDATE b=VALUES(b)"
+        assert fingerprint_sql(sql) == "INSERT INTO t (a, b) VALUES (?+), ... ON DUPLICATE KEY UPDATE b=VALUES(b)"
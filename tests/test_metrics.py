@@ -0,0 +1,81 @@
+from time import perf_counter
+
+import pytest
+
+from fastapi_esql import MetricsRegistry
+from fastapi_esql.utils.metrics import measure, metric_labels, record_query
+
+
+class Conn:
+    connection_name = "demo_ro"
+
+
+class Mgr:
+    table = "account"
+
+    @classmethod
+    @measure
+    async def select(cls):
+        record_query("SELECT 1", Conn(), perf_counter(), rows=3)
+        return await cls.count()
+
+    @classmethod
+    @measure
+    async def count(cls):
+        assert metric_labels.get()[:2] == ("select", "account")
+        return 1
+
+    @classmethod
+    @measure
+    async def stream(cls):
+        for _ in range(2):
+            record_query("SELECT 1", Conn(), perf_counter(), failed=True)
+            yield 1
+
+
+@pytest.fixture
+def registry():
+    registry = MetricsRegistry()
+    registry.clear()
+    yield registry
+    registry.clear()
+
+
+@pytest.mark.asyncio
+async def test_labels(registry):
+    assert await Mgr.select() == 1
+    assert metric_labels.get() is None
+    assert [i async for i in Mgr.stream()] == [1, 1]
+
+    snapshot = registry.snapshot()
+    # Nested calls of the same table are attributed to the outer method
+    assert [s["labels"] for s in snapshot["esql_method_duration_seconds"]] == [{"method": "select", "table": "account"}]
+    assert snapshot["esql_rows_returned_total"] == [
+        {"labels": {"method": "select", "table": "account", "conn": "demo_ro"}, "value": 3},
+    ]
+    assert snapshot["esql_query_errors_total"] == [
+        {"labels": {"method": "stream", "table": "account", "conn": "demo_ro"}, "value": 2},
+    ]
+
+
+def test_prometheus(registry):
+    labels = (("method", "select"), ("table", 'a"b'), ("conn", ""))
+    registry.observe("esql_query_duration_seconds", labels, 0.003)
+    registry.observe("esql_query_duration_seconds", labels, 20)
+    registry.inc("esql_rows_affected_total", labels, 5)
+    text = registry.to_prometheus()
+    assert "# TYPE esql_query_duration_seconds histogram" in text
+    assert 'esql_query_duration_seconds_bucket{method="select",table="a\\"b",conn="",le="0.0025"} 0' in text
+    assert 'esql_query_duration_seconds_bucket{method="select",table="a\\"b",conn="",le="0.005"} 1' in text
+    assert 'esql_query_duration_seconds_bucket{method="select",table="a\\"b",conn="",le="+Inf"} 2' in text
+    assert 'esql_query_duration_seconds_count{method="select",table="a\\"b",conn=""} 2' in text
+    assert 'esql_rows_affected_total{method="select",table="a\\"b",conn=""} 5' in text
+
+
+def test_disabled(registry):
+    registry.enabled = False
+    try:
+        record_query("SELECT 1", Conn(), perf_counter(), rows=1)
+        assert registry.snapshot()["esql_rows_returned_total"] == []
+    finally:
+        registry.enabled = True
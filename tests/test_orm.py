@@ -1,9 +1,12 @@
 from unittest import TestCase
+from unittest.mock import patch
 
+import pytest
 from tortoise import fields
 
 from examples.service.models.demo import Account
-from fastapi_esql import AppMetaclass, BaseManager, BaseModel
+from fastapi_esql import AppMetaclass, BaseManager, BaseModel, WrongParamsError, read_your_writes_session
+from fastapi_esql.utils.session import mark_written
 
 
 class DemoMetaclass(AppMetaclass):
@@ -37,3 +40,227 @@ class TestORM(TestCase):
             class AccountMgr(BaseManager, metaclass=DemoMetaclass):
                 model = Account
             AccountMgr.rw_conn
+
+
+class PagedConn:
+
+    def __init__(self, *pages):
+        self.pages = list(pages)
+        self.sqls = []
+
+    async def execute_query_dict(self, sql, args=None):
+        self.sqls.append(sql)
+        page = self.pages.pop(0)
+        if isinstance(page, Exception):
+            raise page
+        return page
+
+
+@pytest.mark.asyncio
+async def test_iter_custom_fields_failed():
+    class AccountMgr(BaseManager, metaclass=DemoMetaclass):
+        model = Account
+
+    conn = PagedConn([{"id": 1}, {"id": 2}], Exception("Lost connection"))
+    batches = []
+    # A failed page is raised instead of ending the iteration as if it were complete
+    with pytest.raises(Exception, match="Lost connection"):
+        async for dicts in AccountMgr.iter_custom_fields(["id"], "id>0", keys=["id"], batch_size=2, conn=conn):
+            batches.append(dicts)
+    assert batches == [[{"id": 1}, {"id": 2}]]
+
+
+@pytest.mark.asyncio
+async def test_iter_custom_fields_selected_keys():
+    class AccountMgr(BaseManager, metaclass=DemoMetaclass):
+        model = Account
+
+    # Only keys not covered by the projection, like by `*`, are added to the selection and removed from results
+    for fields, selected, row in [
+        (["*"], "*", {"id": 1, "name": "a"}),
+        (["name", "`id`"], "name, `id`", {"id": 1, "name": "a"}),
+        (["name"], "name, id", {"name": "a"}),
+    ]:
+        conn = PagedConn([{"id": 1, "name": "a"}])
+        batches = [dicts async for dicts in AccountMgr.iter_custom_fields(fields, "id>0", batch_size=2, conn=conn)]
+        assert batches == [[row]]
+        assert f"SELECT\n      {selected}\n    FROM" in conn.sqls[0]
+
+
+class StreamConn:
+    connection_name = "demo_ro"
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.released = False
+
+    def acquire_connection(self):
+        return self
+
+    def cursor(self, cursor_cls=None):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        self.released = True
+
+    async def execute(self, sql, args=None):
+        ...
+
+    async def fetchmany(self, size):
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+
+@pytest.mark.asyncio
+async def test_stream_custom_fields_break():
+    class AccountMgr(BaseManager, metaclass=DemoMetaclass):
+        model = Account
+
+    conn = StreamConn([{"id": 1}, {"id": 2}])
+    agen = AccountMgr.stream_custom_fields(["id"], "id>0", batch_size=1, conn=conn)
+    async for dicts in agen:
+        assert dicts == [{"id": 1}]
+        break
+    await agen.aclose()
+    # The connection is released as soon as the iteration is closed
+    assert conn.released
+
+
+class LocalInfileDisabledConn:
+    connection_name = "demo_rw"
+
+    def __init__(self):
+        self.statements = []
+
+    def _in_transaction(self):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        ...
+
+    async def execute_query(self, sql, args=None):
+        if sql.lstrip().startswith("LOAD DATA"):
+            raise Exception(1148, "The used command is not allowed with this MySQL version")
+        self.statements.append(sql)
+        return 1, []
+
+
+LOAD_CONN = LocalInfileDisabledConn()
+
+
+class LoadMetaclass(AppMetaclass):
+
+    def get_rw_conn(self):
+        return LOAD_CONN
+
+
+@pytest.mark.asyncio
+async def test_bulk_load_fallback():
+    class AccountMgr(BaseManager, metaclass=LoadMetaclass):
+        model = Account
+
+    dicts = [{"id": 1, "name": b"\xff"}, {"id": 2, "name": "b"}]
+    assert await AccountMgr.bulk_load_from_dicts(dicts, ["id", "name"]) == 1
+    # Bytes are taken from dicts again, instead of surrogates read back from the file
+    assert "(1, X'ff')" in LOAD_CONN.statements[0]
+
+    LOAD_CONN.statements.clear()
+    assert await AccountMgr.bulk_load_from_dicts(iter(dicts), ["id", "name"]) == 1
+    assert "('1', X'ff')" in LOAD_CONN.statements[0]
+
+
+class UsingDb:
+
+    def __init__(self, used):
+        self.used = used
+
+    def using_db(self, conn):
+        self.used.append(conn)
+        return self
+
+    def __await__(self):
+        yield from ()
+        return None
+
+
+class RoutedMetaclass(AppMetaclass):
+
+    def get_ro_conn(self):
+        return "ro"
+
+    def get_rw_conn(self):
+        return "rw"
+
+
+@pytest.mark.asyncio
+async def test_get_by_pk_after_write():
+    class AccountMgr(BaseManager, metaclass=RoutedMetaclass):
+        model = Account
+        read_your_writes_window = 10
+
+    used = []
+    with patch.object(Account, "get_or_none", lambda **kwargs: UsingDb(used)):
+        with read_your_writes_session():
+            await AccountMgr.get_by_pk(1)
+            mark_written(AccountMgr.table, AccountMgr.read_your_writes_window)
+            await AccountMgr.get_by_pk(1)
+            await AccountMgr.load_by_pk(1)
+    assert used == ["ro", "rw", "rw"]
+
+
+@pytest.mark.asyncio
+async def test_select_scalar_limit():
+    class AccountMgr(BaseManager, metaclass=DemoMetaclass):
+        model = Account
+
+    calls = []
+
+    async def select_shaped(shape, fields, wheres, **kwargs):
+        calls.append(kwargs)
+
+    with patch.object(AccountMgr, "select_shaped", select_shaped):
+        await AccountMgr.select_scalar("id", "id>0", orders=["-id"], limit=10)
+        await AccountMgr.select_scalar("id", "id>0", offset=5)
+    assert calls == [{"orders": ["-id"], "limit": 1, "offset": 0}, {"offset": 5, "limit": 1}]
+
+
+@pytest.mark.asyncio
+async def test_staging_tracked_once():
+    class AccountMgr(BaseManager, metaclass=DemoMetaclass):
+        model = Account
+
+    tables = []
+
+    async def after_write(cls, table):
+        tables.append(table)
+
+    async def update_by_staging(*args, **kwargs):
+        return 2
+
+    with patch("fastapi_esql.orm.base_manager.after_write", after_write), \
+            patch.object(AccountMgr, "update_by_staging", update_by_staging):
+        assert await AccountMgr.bulk_update_from_dicts([{"id": 1, "name": "a"}], ["id"], ["name"], strategy="staging") == 2
+    assert tables == ["account"]
+
+
+@pytest.mark.asyncio
+async def test_failed_write_not_tracked():
+    class AccountMgr(BaseManager, metaclass=DemoMetaclass):
+        model = Account
+
+    tables = []
+
+    async def after_write(cls, table):
+        tables.append(table)
+
+    with patch("fastapi_esql.orm.base_manager.after_write", after_write):
+        # Raised by rendering before anything is sent
+        with pytest.raises(WrongParamsError):
+            await AccountMgr.upsert_on_duplicate([], ["id", "name"])
+    assert tables == []
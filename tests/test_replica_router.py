@@ -0,0 +1,128 @@
+from asyncio import sleep
+
+import pytest
+from tortoise.exceptions import OperationalError
+
+from fastapi_esql import ReplicaRouter, WrongParamsError
+
+
+class FakeConn:
+
+    def __init__(self, name, delay=0.0, lag=0, fail=False, error=None):
+        self.connection_name = name
+        self.delay = delay
+        self.lag = lag
+        self.fail = fail
+        self.error = error
+
+    async def execute_query_dict(self, query, values=None):
+        await sleep(self.delay)
+        if self.fail:
+            raise ConnectionError(f"{self.connection_name} is down")
+        if self.error:
+            raise self.error
+        if query.startswith("SHOW"):
+            return [{"Seconds_Behind_Source": self.lag}]
+        return [{"conn": self.connection_name}]
+
+    def acquire_connection(self):
+        return self
+
+    async def __aenter__(self):
+        if self.fail:
+            raise ConnectionError(f"{self.connection_name} is down")
+        return self
+
+    async def __aexit__(self, *args):
+        ...
+
+
+RW_CONN = FakeConn("rw")
+
+
+def test_wrong_balancer():
+    with pytest.raises(WrongParamsError):
+        ReplicaRouter(lambda: [], balancer="random")
+
+
+def test_round_robin_and_fallback():
+    router = ReplicaRouter(lambda: [FakeConn("ro0"), FakeConn("ro1")])
+    names = [router.pick(lambda: RW_CONN).connection_name for _ in range(4)]
+    assert names == ["ro0", "ro1", "ro0", "ro1"]
+
+    router = ReplicaRouter(lambda: [])
+    assert router.pick(lambda: RW_CONN) is RW_CONN
+    assert router.fallbacks == 1
+
+
+@pytest.mark.asyncio
+async def test_ejection():
+    router = ReplicaRouter(lambda: [FakeConn("ro0", fail=True)], max_failures=2)
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            await router.pick(lambda: RW_CONN).execute_query_dict("SELECT 1")
+    assert router.pick(lambda: RW_CONN) is RW_CONN
+    assert router.info()["replicas"][0]["ejected"]
+
+
+@pytest.mark.asyncio
+async def test_query_errors_not_counted():
+    # Errors of queries, like syntax errors, say nothing about the replica
+    error = OperationalError(Exception(1054, "Unknown column 'x' in 'field list'"))
+    router = ReplicaRouter(lambda: [FakeConn("ro0", error=error)], max_failures=1)
+    for _ in range(2):
+        with pytest.raises(OperationalError):
+            await router.pick(lambda: RW_CONN).execute_query_dict("SELECT x")
+    assert router.info()["replicas"][0]["failures"] == 0
+    assert not router.info()["replicas"][0]["ejected"]
+
+    error = OperationalError(Exception(2013, "Lost connection to MySQL server during query"))
+    router = ReplicaRouter(lambda: [FakeConn("ro0", error=error)], max_failures=1)
+    with pytest.raises(OperationalError):
+        await router.pick(lambda: RW_CONN).execute_query_dict("SELECT 1")
+    assert router.info()["replicas"][0]["ejected"]
+
+
+@pytest.mark.asyncio
+async def test_acquire_connection():
+    router = ReplicaRouter(lambda: [FakeConn("ro0")], max_failures=1)
+    async with router.pick(lambda: RW_CONN).acquire_connection():
+        assert router.info()["replicas"][0]["outstanding"] == 1
+    assert router.info()["replicas"][0]["outstanding"] == 0
+
+    router = ReplicaRouter(lambda: [FakeConn("ro0", fail=True)], max_failures=1)
+    with pytest.raises(ConnectionError):
+        async with router.pick(lambda: RW_CONN).acquire_connection():
+            ...
+    assert router.info()["replicas"][0]["outstanding"] == 0
+    assert router.info()["replicas"][0]["ejected"]
+
+
+@pytest.mark.asyncio
+async def test_ewma():
+    router = ReplicaRouter(lambda: [FakeConn("slow", delay=0.02), FakeConn("fast")], balancer="ewma")
+    for _ in range(2):
+        await router.pick(lambda: RW_CONN).execute_query_dict("SELECT 1")
+    names = [(await router.pick(lambda: RW_CONN).execute_query_dict("SELECT 1"))[0]["conn"] for _ in range(5)]
+    assert names == ["fast"] * 5
+
+
+@pytest.mark.asyncio
+async def test_max_lag():
+    router = ReplicaRouter(lambda: [FakeConn("ro0", lag=30), FakeConn("ro1", lag=1)], max_lag=5, probe_interval=60)
+    router.pick(lambda: RW_CONN)
+    await sleep(0.01)
+    names = {router.pick(lambda: RW_CONN).connection_name for _ in range(4)}
+    assert names == {"ro1"}
+    assert [r["lag"] for r in router.info()["replicas"]] == [30.0, 1.0]
+    router.close()
+
+
+@pytest.mark.asyncio
+async def test_lag_unknown():
+    # Without privilege to show replica status, the replica is trusted instead of skipped forever
+    error = OperationalError(Exception(1227, "Access denied; you need the REPLICATION CLIENT privilege"))
+    router = ReplicaRouter(lambda: [FakeConn("ro0", error=error)], max_lag=5, max_failures=1)
+    await router.probe_lag(router.replicas[0])
+    assert router.pick(lambda: RW_CONN).connection_name == "ro0"
+    assert router.info()["replicas"][0]["failures"] == 0
@@ -0,0 +1,52 @@
+from time import sleep
+from unittest import TestCase
+
+from fastapi_esql import ResultCache
+
+
+class TestResultCache(TestCase):
+
+    table = "account"
+
+    def test_copy_on_hit(self):
+        cache = ResultCache()
+        rows = [{"id": 1, "name": "a"}]
+        cache.put("k", cache.version(self.table), rows)
+        rows[0]["name"] = "b"
+        hit = cache.get("k", self.table)
+        assert hit == [{"id": 1, "name": "a"}]
+        hit[0]["name"] = "c"
+        assert cache.get("k", self.table) == [{"id": 1, "name": "a"}]
+
+    def test_copy_tuples(self):
+        cache = ResultCache()
+        cache.put("k", cache.version(self.table), [(1, "a")])
+        hit = cache.get("k", self.table)
+        hit.append((2, "b"))
+        assert cache.get("k", self.table) == [(1, "a")]
+
+    def test_invalidation(self):
+        cache = ResultCache()
+        version = cache.version(self.table)
+        ResultCache.bump(self.table)
+        # Filled with the version taken before a write
+        cache.put("k", version, {"id": 1})
+        assert cache.get("k", self.table) is None
+
+        cache.put("k", cache.version(self.table), {"id": 1})
+        assert cache.get("k", self.table) == {"id": 1}
+        ResultCache.bump(self.table)
+        assert cache.get("k", self.table) is None
+        assert cache.info()["stales"] == 2
+
+    def test_ttl_and_eviction(self):
+        cache = ResultCache(maxsize=2, ttl=0.01)
+        for key in "abc":
+            cache.put(key, cache.version(self.table), [])
+        assert len(cache) == 2
+        assert cache.get("a", self.table) is None
+        assert cache.get("c", self.table) == []
+        sleep(0.02)
+        assert cache.get("c", self.table) is None
+        info = cache.info()
+        assert (info["hits"], info["misses"], info["hit_ratio"]) == (1, 2, 1 / 3)
@@ -0,0 +1,80 @@
+from datetime import date, datetime, time
+from decimal import Decimal
+from unittest import TestCase
+from uuid import UUID
+
+from examples.service.constants.enums import GenderEnum, LocaleEnum
+from fastapi_esql import register_encoder, set_json_dumps
+from fastapi_esql.utils.serializer import parse_tsv_line, sqlize, to_param, to_tsv_line
+
+
+class Point:
+
+    def __init__(self, x, y):
+        self.x, self.y = x, y
+
+
+class TestSqlize(TestCase):
+
+    def test_scalars(self):
+        assert sqlize(None) == "NULL"
+        assert sqlize(True) == "True"
+        assert sqlize(1024) == "1024"
+        assert sqlize(0.125) == "0.125"
+        assert sqlize(float("nan")) == "NULL"
+        assert sqlize(Decimal("3.14")) == "3.14"
+        assert sqlize(Decimal("NaN")) == "NULL"
+        assert sqlize(Decimal("-Infinity")) == "NULL"
+        assert sqlize(b"\x00\xff") == "X'00ff'"
+
+    def test_datetimes(self):
+        assert sqlize(datetime(2023, 1, 1, 12, 30)) == "'2023-01-01 12:30:00'"
+        assert sqlize(date(2023, 1, 1)) == "'2023-01-01'"
+        assert sqlize(time(12, 30)) == "'12:30:00'"
+
+    def test_enums(self):
+        assert sqlize(GenderEnum.male) == "1"
+        assert sqlize(LocaleEnum.zh_CN) == "'zh_CN'"
+
+    def test_escaping(self):
+        assert sqlize("O'Neil") == "'O\\'Neil'"
+        assert sqlize("a\\b\nc") == "'a\\\\b\\nc'"
+        assert sqlize({"quote": "say \"hi\""}) == """'{"quote": "say \\\\"hi\\\\""}'"""
+
+    def test_fallback_and_register(self):
+        uuid = UUID("fd04f7f2-24fc-4a73-a1d7-b6e99a464c5f")
+        assert sqlize(uuid) == "'fd04f7f2-24fc-4a73-a1d7-b6e99a464c5f'"
+        assert sqlize(Point(1, 2)).startswith("'<")
+
+        register_encoder(Point, lambda p: f"POINT({p.x}, {p.y})")
+        assert sqlize(Point(1, 2)) == "POINT(1, 2)"
+
+    def test_json_dumps(self):
+        try:
+            set_json_dumps(lambda v: "{}")
+            assert sqlize({"a": 1}) == "'{}'"
+        finally:
+            set_json_dumps()
+        assert sqlize({"a": 1}) == """'{"a": 1}'"""
+
+    def test_to_param(self):
+        assert to_param(GenderEnum.female) == 2
+        assert to_param(["a"]) == '["a"]'
+        assert to_param("a") == "a"
+        assert to_param(float("inf")) is None
+        assert to_param(Decimal("Infinity")) is None
+
+
+class TestTSV(TestCase):
+
+    def test_to_tsv_line(self):
+        line = to_tsv_line([
+            None, True, GenderEnum.male, LocaleEnum.zh_CN, float("inf"),
+            datetime(2023, 1, 1, 12, 30), {"tag": "a\tb"}, "C:\\new\nline",
+        ])
+        assert line == '\\N\t1\t1\tzh_CN\t\\N\t2023-01-01 12:30:00\t{"tag": "a\\\\tb"}\tC:\\\\new\\nline\n'
+
+    def test_parse_tsv_line(self):
+        values = [None, "\\N", "a\tb\nc\\d", "\x00"]
+        assert parse_tsv_line(to_tsv_line(values)) == values
+        assert parse_tsv_line(to_tsv_line([b"\xff", "\xff"])) == [b"\xff", "\xff"]
@@ -0,0 +1,33 @@
+from asyncio import ensure_future, sleep
+
+import pytest
+
+from fastapi_esql import read_your_writes_session
+from fastapi_esql.utils.session import clear_write_mark, get_write_mark, mark_written
+
+
+@pytest.mark.asyncio
+async def test_window():
+    with read_your_writes_session():
+        assert get_write_mark("account") is None
+        mark_written("account", 0.01, "uuid:1-5")
+        assert get_write_mark("account")[1] == "uuid:1-5"
+        await sleep(0.02)
+        assert get_write_mark("account") is None
+
+        mark_written("account", 10)
+        clear_write_mark("account")
+        assert get_write_mark("account") is None
+
+
+@pytest.mark.asyncio
+async def test_session():
+    with read_your_writes_session():
+        # Writes of a task created within the session are visible to the session
+        await ensure_future(_write("account"))
+        assert get_write_mark("account") is not None
+    assert get_write_mark("account") is None
+
+
+async def _write(table: str):
+    mark_written(table, 10)
@@ -0,0 +1,53 @@
+from asyncio import ensure_future, gather, sleep
+
+import pytest
+
+from fastapi_esql import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_coalescing():
+    single_flight = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await sleep(0.01)
+        return [{"id": 1}]
+
+    results = await gather(*[single_flight.do("k", fetch) for _ in range(5)])
+    assert len(calls) == 1
+    assert single_flight.info() == {"calls": 1, "saved": 4, "in_flight": 0}
+    results[0][0]["id"] = 2
+    assert results[1] == [{"id": 1}]
+
+    await single_flight.do("k", fetch)
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller():
+    single_flight = SingleFlight()
+
+    async def fetch():
+        await sleep(0.01)
+        return {"id": 1}
+
+    first = ensure_future(single_flight.do("k", fetch))
+    second = ensure_future(single_flight.do("k", fetch))
+    await sleep(0)
+    first.cancel()
+    assert await second == {"id": 1}
+
+
+@pytest.mark.asyncio
+async def test_exception():
+    single_flight = SingleFlight()
+
+    async def fetch():
+        await sleep(0.01)
+        raise ValueError("Error")
+
+    results = await gather(*[single_flight.do("k", fetch) for _ in range(2)], return_exceptions=True)
+    assert all(isinstance(r, ValueError) for r in results)
+    assert len(single_flight) == 0
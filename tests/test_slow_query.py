@@ -0,0 +1,63 @@
+from asyncio import sleep
+
+import pytest
+
+from fastapi_esql import SlowQueryLog
+from fastapi_esql.utils.metrics import metric_labels
+
+
+class Conn:
+    connection_name = "demo_ro"
+
+    def __init__(self):
+        self.explains = []
+
+    async def execute_query_dict(self, sql, args=None):
+        self.explains.append(sql)
+        return [{"EXPLAIN": '{"query_block": {"select_id": 1}}'}]
+
+
+class Mgr:
+    ro_conn = Conn()
+
+
+@pytest.mark.asyncio
+async def test_check():
+    log = SlowQueryLog(threshold=0.1, maxlen=2, explain_interval=60)
+    conn = Conn()
+    log.check("SELECT 1 FROM t WHERE id=1", None, conn, 0.05, 1)
+    assert len(log) == 0
+
+    token = metric_labels.set(("select_custom_fields", "t", Mgr))
+    try:
+        log.check("SELECT 1 FROM t WHERE id=1", None, conn, 0.2, 1)
+        log.check("SELECT 1 FROM t WHERE id=2", None, conn, 0.3, 1)
+    finally:
+        metric_labels.reset(token)
+    log.check("UPDATE t SET a=1", None, conn, 0.4, 5)
+    await sleep(0)
+
+    # Explained once per fingerprint on `ro_conn` of the manager
+    assert Mgr.ro_conn.explains == ["EXPLAIN FORMAT=JSON SELECT 1 FROM t WHERE id=1"]
+    assert conn.explains == []
+    entries = log.entries()
+    assert [e["duration_ms"] for e in entries] == [400.0, 300.0]
+    assert entries[1]["fingerprint"] == "SELECT ? FROM t WHERE id=?"
+    assert entries[1]["method"] == "select_custom_fields"
+    assert log.entries(min_duration_ms=350) == entries[:1]
+    assert log.info()["total"] == 3 and log.info()["explained"] == 1
+
+
+@pytest.mark.asyncio
+async def test_one_explain_in_flight():
+    log = SlowQueryLog(threshold=0.1, explain_interval=60)
+    conn = Conn()
+    # Both finish in the same tick, before the first EXPLAIN starts
+    log.check("SELECT 1 FROM t WHERE id=1", None, conn, 0.2, 1)
+    log.check("SELECT 1 FROM u WHERE id=1", None, conn, 0.2, 1)
+    await sleep(0)
+    assert conn.explains == ["EXPLAIN FORMAT=JSON SELECT 1 FROM t WHERE id=1"]
+
+    log.check("SELECT 1 FROM u WHERE id=1", None, conn, 0.2, 1)
+    await sleep(0)
+    assert len(conn.explains) == 2
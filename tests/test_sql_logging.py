@@ -0,0 +1,81 @@
+from logging import DEBUG, Handler, WARNING, getLogger
+
+import pytest
+
+from fastapi_esql import setup_sql_logging, stop_sql_logging
+from fastapi_esql.utils.metrics import metric_labels
+from fastapi_esql.utils.sql_logging import SQLSampler, debug_sql
+
+logger = getLogger("fastapi_esql.utils.sqlizer")
+
+
+class Collector(Handler):
+
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+@pytest.fixture
+def collector():
+    collector = Collector()
+    setup_sql_logging(collector, max_chars=40, sample_limit=2, sample_interval=60)
+    yield collector
+    stop_sql_logging()
+    logger.setLevel(WARNING)
+
+
+def test_sampler():
+    sampler = SQLSampler(limit=2, interval=60)
+    assert [sampler.allow("a") for _ in range(4)] == [(True, 0), (True, 0), (False, 0), (False, 0)]
+    assert sampler.allow("b") == (True, 0)
+    sampler._windows["a"][0] -= 60
+    assert sampler.allow("a") == (True, 2)
+    assert SQLSampler(limit=0).allow("a") == (True, 0)
+
+
+def test_structured_records(collector):
+    token = metric_labels.set(("select_custom_fields", "account", None))
+    try:
+        for idx in range(3):
+            debug_sql(logger, f"SELECT id FROM `account` WHERE id={idx}")
+        debug_sql(logger, f"INSERT INTO `account` (id) VALUES {', '.join(['(1)'] * 20)}", "account")
+    finally:
+        metric_labels.reset(token)
+    stop_sql_logging()
+
+    records = collector.records
+    assert len(records) == 3
+    assert records[0].sql_fingerprint == "SELECT id FROM `account` WHERE id=?"
+    assert records[0].sql_method == "select_custom_fields"
+    assert records[0].sql_table == "account"
+    assert records[2].sql_bytes == 132
+    assert "truncated 92 of 132 chars" in records[2].getMessage()
+
+
+def test_disabled(collector):
+    logger.setLevel(WARNING)
+    debug_sql(logger, "SELECT 1")
+    stop_sql_logging()
+    assert collector.records == []
+    # Handlers are detached after stopping
+    logger.setLevel(DEBUG)
+    debug_sql(logger, "SELECT 2")
+    assert collector.records == []
+
+
+def test_unsampled_without_setup():
+    collector = Collector()
+    logger.addHandler(collector)
+    logger.setLevel(DEBUG)
+    try:
+        # Logging configured by the application gets every statement
+        for _ in range(12):
+            debug_sql(logger, "SELECT 1")
+    finally:
+        logger.removeHandler(collector)
+        logger.setLevel(WARNING)
+    assert len(collector.records) == 12
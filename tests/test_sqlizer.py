@@ -68,6 +68,15 @@ class TestSQLizer(TestCase):
         orders = SQLizer.resolve_orders(["-created_at", "name"])
         assert orders == "created_at DESC, name ASC"
 
+    def test_resolve_seek(self):
+        assert SQLizer.resolve_seek(["id"], [5]) == "id>5"
+        assert SQLizer.resolve_seek(["-created_at", "-id"], ["2022-10-30", 5]) == "(created_at, id)<('2022-10-30', 5)"
+
+        with self.assertRaises(WrongParamsError):
+            SQLizer.resolve_seek(["created_at", "-id"], ["2022-10-30", 5])
+        with self.assertRaises(WrongParamsError):
+            SQLizer.resolve_seek(["id"], [5, 6])
+
     def test_sqlize_value(self):
         assert SQLizer.sqlize_value(None) == "NULL"
 
@@ -419,6 +428,219 @@ class TestSQLizer(TestCase):
     SET `account`.active=tmp.active, `account`.gender=tmp.gender, `account`.extend=JSON_MERGE_PATCH(COALESCE(`account`.extend, '{}'), tmp.extend)
 """
 
+    def test_load_data_infile(self):
+        with self.assertRaises(WrongParamsError):
+            SQLizer.load_data_infile(self.table, "/tmp/account.tsv", ["id"], mode="update")
+
+        sql = SQLizer.load_data_infile(self.table, "/tmp/account.tsv", ["id", "name"], mode="ignore")
+        assert sql == """
+    LOAD DATA LOCAL INFILE '/tmp/account.tsv'
+    IGNORE INTO TABLE `account`
+    CHARACTER SET utf8mb4
+    FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\'
+    LINES TERMINATED BY '\\n'
+    (id, name)
+"""
+        sql = SQLizer.upsert_on_duplicate(self.table, [{"id": 1, "name": "a"}], ["id", "name"], ignore=True)
+        assert sql.startswith("\n    INSERT IGNORE INTO `account`\n")
+
+    def test_staging(self):
+        with self.assertRaises(WrongParamsError):
+            SQLizer.create_staging_table(self.table, "tmp_account", ["id", "active"], [])
+
+        sql = SQLizer.create_staging_table(self.table, "tmp_account", ["id", "deleted", "active"], ["id", "deleted"])
+        assert sql == """
+    CREATE TEMPORARY TABLE `tmp_account` (INDEX (id, deleted))
+    SELECT id, deleted, active FROM `account` LIMIT 0
+"""
+        sql = SQLizer.bulk_update_from_staging(
+            self.table, "tmp_account", ["id", "deleted"], ["active"], merge_fields=["extend"],
+        )
+        assert sql == """
+    UPDATE `account`
+    JOIN `tmp_account` tmp ON `account`.id=tmp.id AND `account`.deleted=tmp.deleted
+    SET `account`.active=tmp.active, `account`.extend=JSON_MERGE_PATCH(COALESCE(`account`.extend, '{}'), tmp.extend)
+"""
+
+    def test_bulk_update_by_case(self):
+        dicts = [
+            {"id": 7, "active": False, "gender": GenderEnum.male, "extend": {"test": 1}},
+            {"id": 15, "active": True, "gender": GenderEnum.unknown, "extend": {}},
+        ]
+        sql = SQLizer.bulk_update_from_dicts(
+            self.table,
+            dicts,
+            join_fields=["id"],
+            update_fields=["active", "gender"],
+            merge_fields=["extend"],
+            strategy="case",
+        )
+        assert sql == """
+    UPDATE `account`
+    SET active=CASE id WHEN 7 THEN False WHEN 15 THEN True END, gender=CASE id WHEN 7 THEN 1 WHEN 15 THEN 0 END, extend=JSON_MERGE_PATCH(COALESCE(extend, '{}'), CASE id WHEN 7 THEN '{"test": 1}' WHEN 15 THEN '{}' END)
+    WHERE id IN (7,15)
+"""
+        params = []
+        sql = SQLizer.bulk_update_from_dicts(
+            self.table, dicts, ["id"], ["active"], strategy="auto", params=params,
+        )
+        assert "WHERE id IN (%s,%s)" in sql
+        assert params == [7, False, 15, True, 7, 15]
+
+        with self.assertRaises(WrongParamsError):
+            SQLizer.bulk_update_from_dicts(self.table, dicts, ["id", "active"], ["gender"], strategy="case")
+        with self.assertRaises(WrongParamsError):
+            SQLizer.bulk_update_from_dicts(self.table, dicts, ["id"], ["gender"], strategy="unknown")
+
+        assert SQLizer.choose_bulk_update_strategy(SQLizer.case_max_rows, ["id"]) == "case"
+        assert SQLizer.choose_bulk_update_strategy(SQLizer.case_max_rows + 1, ["id"]) == "join"
+        assert SQLizer.choose_bulk_update_strategy(SQLizer.case_max_rows + 1, ["id"], using_values=False) == "case"
+        assert SQLizer.choose_bulk_update_strategy(1, ["id", "deleted"]) == "join"
+
+    def test_plan_cache(self):
+        SQLizer.plan_cache.clear()
+        sqls = [
+            SQLizer.upsert_on_duplicate(
+                self.table,
+                [{"id": aid, "name": f"name{aid}"}],
+                insert_fields=["id", "name"],
+                upsert_fields=["name"],
+            )
+            for aid in (1, 2)
+        ]
+        assert SQLizer.plan_cache.info()["misses"] == 1
+        assert SQLizer.plan_cache.info()["hits"] == 1
+        assert sqls[1] == """
+    INSERT INTO `account`
+      (id, name)
+    VALUES
+      (2, 'name2')
+    AS `new_account` ON DUPLICATE KEY UPDATE name=`new_account`.name
+"""
+
+    def test_parameterized(self):
+        params = []
+        select_sql = SQLizer.select_custom_fields(
+            self.table,
+            fields=["id", "DATE_FORMAT(created_at, '%Y') year"],
+            wheres="name LIKE 'Tara%'",
+            model=self.model,
+            params=params,
+        )
+        assert select_sql == """
+    SELECT
+      id, DATE_FORMAT(created_at, '%%Y') year
+    FROM `account`
+    WHERE name LIKE 'Tara%%'
+"""
+        assert params == []
+
+        params = []
+        upsert_sql = SQLizer.upsert_on_duplicate(
+            self.table,
+            [
+                {"id": 10, "gender": GenderEnum.male, "name": "O'Neil", "extend": {"rdm": 1}},
+                {"id": 11, "gender": GenderEnum.female, "name": None, "extend": {"rdm": 2}},
+            ],
+            insert_fields=["id", "gender", "name", "extend"],
+            upsert_fields=["name"],
+            params=params,
+        )
+        assert upsert_sql == """
+    INSERT INTO `account`
+      (id, gender, name, extend)
+    VALUES
+      (%s, %s, %s, %s),
+      (%s, %s, %s, %s)
+    AS `new_account` ON DUPLICATE KEY UPDATE name=`new_account`.name
+"""
+        assert params == [10, 1, "O'Neil", '{"rdm": 1}', 11, 2, None, '{"rdm": 2}']
+
+        params = []
+        update_sql = SQLizer.update_json_field(
+            self.table,
+            json_field="extend",
+            wheres=Q(id=8),
+            path_value_dict={"$.last_login": {"ipv4": "209.182.101.161"}},
+            assign_field_dict={"name": RawSQL("CONCAT(name, '%')")},
+            model=self.model,
+            params=params,
+        )
+        assert update_sql == """
+    UPDATE `account` SET extend =
+    JSON_SET(COALESCE(extend, '{}'), '$.last_login',CAST(%s AS JSON))
+    , name=CONCAT(name, '%%')
+    WHERE `id`=%s
+"""
+        assert params == ['{"ipv4": "209.182.101.161"}', 8]
+
+    def test_chunk_dicts(self):
+        with self.assertRaises(WrongParamsError):
+            list(SQLizer.chunk_dicts([{"id": 1}], ["id"]))
+
+        dicts = [{"id": idx, "name": f"name{idx}"} for idx in range(10)]
+        assert [len(c) for c in SQLizer.chunk_dicts(dicts, ["id", "name"], max_rows=4)] == [4, 4, 2]
+        # Every row is estimated as 14 bytes
+        assert [len(c) for c in SQLizer.chunk_dicts(dicts, ["id", "name"], max_bytes=30)] == [2, 2, 2, 2, 2]
+        assert [len(c) for c in SQLizer.chunk_dicts(dicts, ["id", "name"], max_rows=3, max_bytes=30)] == [2, 2, 2, 2, 2]
+        assert [len(c) for c in SQLizer.chunk_dicts(dicts, ["id", "name"], max_bytes=1)] == [1] * 10
+
+    def test_columnar(self):
+        with self.assertRaises(WrongParamsError):
+            SQLizer.build_fly_table({"id": [7, 15], "active": [False]}, fields=["id", "active"])
+
+        columns = {
+            "id": [7, 15],
+            "active": [False, True],
+            "gender": [GenderEnum.male, GenderEnum.unknown],
+        }
+        assert SQLizer.build_fly_table(columns, fields=["id", "active", "gender", "extend"]) == """
+        SELECT * FROM (
+          VALUES
+          ROW(7, False, 1, NULL),
+          ROW(15, True, 0, NULL)
+        ) AS fly_table (id, active, gender, extend)"""
+
+        params = []
+        sql = SQLizer.upsert_on_duplicate(
+            self.table,
+            columns,
+            insert_fields=["id", "active"],
+            params=params,
+        )
+        assert sql == """
+    INSERT INTO `account`
+      (id, active)
+    VALUES
+      (%s, %s),
+      (%s, %s)
+"""
+        assert params == [7, False, 15, True]
+
+        assert list(SQLizer.chunk_dicts(columns, ["id", "active"], max_rows=1)) == [
+            {"id": [7], "active": [False]},
+            {"id": [15], "active": [True]},
+        ]
+
+    def test_numpy_scalars(self):
+        try:
+            import numpy as np
+        except ImportError:
+            self.skipTest("Package `numpy` is not installed")
+        dicts = [
+            {"id": 7, "score": np.float64(2.5)},
+            {"id": 15, "score": np.float64("nan")},
+            {"id": 16, "score": np.float64("inf")},
+        ]
+        sql = SQLizer.upsert_on_duplicate(self.table, dicts, insert_fields=["id", "score"])
+        assert "(7, 2.5)" in sql and "(15, NULL)" in sql and "(16, NULL)" in sql
+        sql = SQLizer.build_fly_table(dicts, fields=["id", "score"])
+        assert "ROW(7, 2.5)" in sql and "ROW(15, NULL)" in sql and "ROW(16, NULL)" in sql
+
+        params = []
+        SQLizer.upsert_on_duplicate(self.table, dicts, insert_fields=["id", "score"], params=params)
+        assert params[1] == 2.5 and params[3] is None and params[5] is None
+
     # def test_(self):
     #     sql = SQLizer()
     #     assert sql == """
@@ -0,0 +1,65 @@
+from asyncio import CancelledError, ensure_future, gather, sleep
+
+import pytest
+
+from fastapi_esql import UpsertBuffer, flush_all_buffers
+from fastapi_esql.utils.upsert_buffer import merge_patches
+
+
+class Flusher:
+
+    def __init__(self):
+        self.flushed = []
+
+    async def __call__(self, dicts):
+        await sleep(0.01)
+        self.flushed.append(dicts)
+        return len(dicts)
+
+
+def test_merge_patches():
+    assert merge_patches({"a": 1, "b": {"c": 1}}, {"a": None, "b": {"d": 2}}) == {"a": None, "b": {"c": 1, "d": 2}}
+
+
+@pytest.mark.asyncio
+async def test_collapse():
+    flusher = Flusher()
+    buffer = UpsertBuffer(flusher, ["id"], update_fields=["cnt"], merge_fields=["extend"], window=0.01)
+    results = await gather(
+        buffer.add([{"id": 1, "name": "a", "cnt": 1, "extend": {"x": 1}}]),
+        buffer.add([{"id": 1, "name": "b", "cnt": 2, "extend": {"y": 2}}, {"id": 2, "name": "c", "cnt": 3}]),
+    )
+    # Every caller gets the result of the same flush
+    assert results == [2, 2]
+    assert flusher.flushed == [[
+        {"id": 1, "name": "a", "cnt": 2, "extend": {"x": 1, "y": 2}},
+        {"id": 2, "name": "c", "cnt": 3},
+    ]]
+    assert buffer.info() == {"adds": 2, "collapsed": 1, "flushes": 1, "buffered": 0, "pending": 0}
+
+
+@pytest.mark.asyncio
+async def test_thresholds():
+    flusher = Flusher()
+    buffer = UpsertBuffer(flusher, window=60, max_rows=2, max_pending=3)
+    first = ensure_future(buffer.add([{"id": 1}, {"id": 1}]))
+    await sleep(0)
+    # Flushed by size without collapsing, since there are no key fields
+    assert buffer.flushes == 1
+
+    # Waits for room until the first flush is done
+    second = ensure_future(buffer.add([{"id": 2}, {"id": 3}]))
+    await sleep(0)
+    assert buffer.adds == 1
+    assert await first == 2
+    assert await second == 2
+    assert len(flusher.flushed) == 2
+
+    third = ensure_future(buffer.add([{"id": 4}]))
+    await sleep(0)
+    third.cancel()
+    with pytest.raises(CancelledError):
+        await third
+    # Still flushed for others, like on shutdown
+    await flush_all_buffers()
+    assert flusher.flushed[-1] == [{"id": 4}]
@@ -0,0 +1,91 @@
+import re
+from datetime import date, datetime, timedelta, timezone
+
+from asynctest import TestCase, patch
+
+from tortoise import run_async
+
+from examples.service.models.demo import Account
+from examples.service.constants.enums import GenderEnum, LocaleEnum
+from fastapi_esql import Q, SQLizer
+from fastapi_esql.utils.serializer import PLACEHOLDER
+from fastapi_esql.utils.where_compiler import WhereCompiler
+from . import init_tortoise
+
+run_async(init_tortoise())
+
+
+class TestWhereCompiler(TestCase):
+
+    model = Account
+
+    def test_lookups(self):
+        assert WhereCompiler.compile(
+            {"id__gte": 5, "id__lt": 9, "pk": 3}, self.model
+        ) == "`id`>=5 AND `id`<9 AND `id`=3"
+        assert WhereCompiler.compile(
+            {"name": None, "id__isnull": False}, self.model
+        ) == "`name` IS NULL AND `id` IS NOT NULL"
+        assert WhereCompiler.compile(
+            {"locale": LocaleEnum.zh_CN, "gender__in": [GenderEnum.male, 2]}, self.model
+        ) == "`locale`='zh_CN' AND `gender` IN (1,2)"
+        assert WhereCompiler.compile(
+            Q(name__contains="a%b_c"), self.model
+        ) == r"`name` LIKE '%a\\%b\\_c%'"
+        assert WhereCompiler.compile(
+            Q(Q(id__range=[1, 12]), Q(Q(name="x"), Q(active=True))), self.model
+        ) == "`id` BETWEEN 1 AND 12 AND `name`='x' AND `active`=True"
+
+    def test_fallback(self):
+        for wheres in [
+            Q(id=1) | Q(id=2),
+            ~Q(id=1),
+            {"id__in": []},
+            {"id__not_in": [1, 2]},
+            {"created_at__gte": "2022-10-30"},
+            {"created_at": date(2022, 10, 30)},
+            {"gender__contains": "1"},
+            {"unknown": 1},
+        ]:
+            assert WhereCompiler.compile(wheres, self.model) is None
+        assert SQLizer.resolve_wheres(Q(id=1) | Q(id=2), self.model) == "`id`=1 OR `id`=2"
+
+    def test_datetimes(self):
+        tz = timezone(timedelta(hours=8))
+        for wheres in [
+            {"created_at__gte": datetime(2022, 10, 30, 1, 2, 3)},
+            {"created_at__lt": datetime(2022, 10, 30, 1, 2, 3, 456)},
+            {"created_at__gte": datetime(2022, 10, 30, 1, 2, 3, tzinfo=tz)},
+            {"created_at__range": [datetime(2022, 1, 1), datetime(2022, 2, 1)]},
+            {"created_at__in": [datetime(2022, 1, 1), datetime(2022, 1, 2)]},
+        ]:
+            compiled = WhereCompiler.compile(wheres, self.model)
+            assert compiled is not None
+            with patch.object(WhereCompiler, "compile", return_value=None):
+                # Equivalent to pypika output, which joins date and time by `T`
+                assert compiled == re.sub(r"(\d)T(\d)", r"\1 \2", SQLizer.resolve_wheres(wheres, self.model))
+
+        params = []
+        assert WhereCompiler.compile(
+            {"created_at__gte": datetime(2022, 10, 30, tzinfo=tz), "created_at__lt": datetime(2022, 11, 1)},
+            self.model,
+            params,
+        ) == f"`created_at`>={PLACEHOLDER} AND `created_at`<{PLACEHOLDER}"
+        assert params == ["2022-10-30 00:00:00+08:00", datetime(2022, 11, 1)]
+
+    def test_params(self):
+        params = []
+        assert WhereCompiler.compile(
+            {"id__in": (1, 2), "name": "x"}, self.model, params
+        ) == f"`id` IN ({PLACEHOLDER},{PLACEHOLDER}) AND `name`={PLACEHOLDER}"
+        assert params == [1, 2, "x"]
+
+        params = []
+        assert WhereCompiler.compile({"id": 1, "id__not_in": [1]}, self.model, params) is None
+        assert params == []
+
+    def test_shape_cache(self):
+        WhereCompiler.shape_cache.clear()
+        WhereCompiler.compile({"id": 1}, self.model)
+        WhereCompiler.compile({"id": 2}, self.model)
+        assert WhereCompiler.shape_cache.info()["hits"] == 1
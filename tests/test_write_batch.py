@@ -0,0 +1,94 @@
+import pytest
+
+from fastapi_esql import WriteBatch, WrongParamsError
+
+
+class Cursor:
+
+    def __init__(self, results):
+        self.results = results
+        self.rowcount = -1
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        ...
+
+    def mogrify(self, sql, args):
+        return sql % tuple(repr(a) for a in args)
+
+    async def execute(self, sql):
+        self.results.sql = sql
+        return await self.nextset()
+
+    async def nextset(self):
+        if not self.results.row_cnts:
+            return None
+        row_cnt = self.results.row_cnts.pop(0)
+        if isinstance(row_cnt, Exception):
+            raise row_cnt
+        self.rowcount = row_cnt
+        return True
+
+
+class Conn:
+    connection_name = "demo_rw"
+
+    def __init__(self, *row_cnts):
+        self.row_cnts = list(row_cnts)
+        self.sql = None
+
+    def acquire_connection(self):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        ...
+
+    def cursor(self):
+        return Cursor(self)
+
+
+@pytest.mark.asyncio
+async def test_execute():
+    conn = Conn(1, 2, 0)
+    executed = []
+
+    async def on_executed():
+        executed.append(1)
+
+    async with WriteBatch(conn) as batch:
+        assert batch.add("UPDATE t SET a=%s WHERE id=1", [5], conn) == 0
+        assert batch.add("UPDATE t SET b=1 WHERE name LIKE '%a'", None, conn) == 1
+        batch.add("DELETE FROM t WHERE id=%s", ["x"], conn)
+        batch.on_executed(on_executed)
+        assert conn.sql is None
+
+    # Sent in one request, and args are bound per statement
+    assert conn.sql == "UPDATE t SET a=5 WHERE id=1;\nUPDATE t SET b=1 WHERE name LIKE '%a';\nDELETE FROM t WHERE id='x'"
+    assert batch.row_cnts == [1, 2, 0]
+    assert executed == [1]
+    with pytest.raises(WrongParamsError):
+        batch.add("UPDATE t SET a=1", None, conn)
+    with pytest.raises(WrongParamsError):
+        WriteBatch(conn).add("UPDATE t SET a=1", None, Conn())
+
+
+@pytest.mark.asyncio
+async def test_failed():
+    conn = Conn(1, Exception("Error"))
+    batch = WriteBatch(conn)
+    for _ in range(3):
+        batch.add("UPDATE t SET a=1", None, conn)
+    assert await batch.execute() == [1, None, None]
+
+    with pytest.raises(ValueError):
+        async with WriteBatch(conn) as batch:
+            batch.add("UPDATE t SET a=1", None, conn)
+            raise ValueError
+    # Dropped without being sent
+    assert not batch.executed
+    assert await WriteBatch().execute() == []